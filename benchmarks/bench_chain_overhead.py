@@ -0,0 +1,68 @@
+"""
+Benchmark of per-request chain overhead with a stub LLM.
+
+"per-request build" reproduces the old hot path, which rebuilt ChatPromptTemplate.from_messages
+and re-composed prompt | llm | StrOutputParser() on every call. "registry" is today's hot path,
+_invoke_prompt: the prompt template and the llm | parser runnable the generator built once at
+construction, invoked as two timed stages. The stub LLM answers instantly, so the numbers are
+pure LangChain/composition overhead; "generate_mcqs" adds parsing and validation on top.
+
+Usage:
+    python benchmarks/bench_chain_overhead.py [--requests 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "educhain_mcp_server"))
+
+from langchain_core.output_parsers import StrOutputParser  # noqa: E402
+from langchain_core.prompts import ChatPromptTemplate  # noqa: E402
+
+from educhain_utils import MCQ_PROMPT_MESSAGES, EduChainContentGenerator  # noqa: E402
+from llm_pool import LLMBackendPool, StubBackend  # noqa: E402
+
+CANNED_MCQS = json.dumps([
+    {"question": f"Question {i}?", "options": {"A": "a", "B": "b", "C": "c", "D": "d"}, "correct_answer": "A"}
+    for i in range(5)
+])
+
+
+def time_per_call(func, requests: int) -> float:
+    func()  # warm caches and lazy imports before timing
+    started = time.perf_counter()
+    for _ in range(requests):
+        func()
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--requests", type=int, default=2000, help="Calls per measurement.")
+    args = arg_parser.parse_args()
+
+    stub_llm = LLMBackendPool([StubBackend("stub", response=CANNED_MCQS, max_concurrency=1)], health_check_interval_seconds=0)
+    generator = EduChainContentGenerator(llm=stub_llm, top_up_retries=0)
+    prompt_vars = {"num_questions": 5, "topic": "Python loops"}
+
+    def per_request_build():
+        prompt_template = ChatPromptTemplate.from_messages(MCQ_PROMPT_MESSAGES)
+        chain = prompt_template | stub_llm | StrOutputParser()
+        return chain.invoke(prompt_vars)
+
+    results = {
+        "per-request build": time_per_call(per_request_build, args.requests),
+        "registry": time_per_call(lambda: generator._invoke_prompt("generate_mcqs", prompt_vars, "generate_mcqs"), args.requests),
+        "build only (old)": time_per_call(lambda: ChatPromptTemplate.from_messages(MCQ_PROMPT_MESSAGES) | stub_llm | StrOutputParser(), args.requests),
+        "generate_mcqs": time_per_call(lambda: generator.generate_mcqs("Python loops", 5), args.requests),
+    }
+    for name, micros in results.items():
+        print(f"{name:<20} {micros:>9.1f} us/request")
+    saved = results["per-request build"] - results["registry"]
+    print(f"{'saved per request':<20} {saved:>9.1f} us ({saved / results['per-request build']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Micro-benchmark for the shared LLM output parser.
+
+Compares the old find("[")/rfind("]") + json.loads extraction with llm_parsing.parse_items
+over a corpus of realistic messy LLM outputs, reporting time per response and how many
+valid items each approach recovers. "scan us" is the parser without schema validation.
+
+Usage:
+    python benchmarks/bench_llm_parsing.py [--items 10] [--repeat 200]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "educhain_mcp_server"))
+
+from llm_parsing import JSONArrayStreamParser, parse_items, validate_mcq  # noqa: E402
+
+
+def make_mcqs(count: int) -> list[dict]:
+    return [
+        {
+            "question": f"Which statement about Python loops is true? (Question {i + 1})",
+            "options": {
+                "A": f"A for loop iterates over any iterable {i}",
+                "B": f"A while loop can't use \"break\" {i}",
+                "C": f"range() returns a list [0, n) {i}",
+                "D": f"Loops can't be nested {{braces}} {i}",
+            },
+            "correct_answer": "A",
+        }
+        for i in range(count)
+    ]
+
+
+def build_corpus(num_items: int) -> dict[str, str]:
+    """Realistic shapes of LLM output seen in practice."""
+    clean = json.dumps(make_mcqs(num_items), indent=2)
+    items = [json.dumps(item) for item in make_mcqs(num_items)]
+    broken_item = items[:]
+    broken_item[num_items // 2] = broken_item[num_items // 2].replace('"correct_answer": "A"', '"correct_answer": A')
+    return {
+        "clean": clean,
+        "prose_and_fence": f"Sure! Here are {num_items} questions:\n```json\n{clean}\n```\nLet me know if you need more [or fewer] questions.",
+        "one_malformed_item": "[" + ", ".join(broken_item) + "]",
+        "truncated": clean[: int(len(clean) * 0.8)],
+        "trailing_comma": "[" + ", ".join(items) + ",]",
+        "wrapped_object": json.dumps({"questions": make_mcqs(num_items)}),
+        "schema_drift": json.dumps([{**item, "correct_answer": "B) " + item["options"]["B"]} for item in make_mcqs(num_items)]),
+    }
+
+
+def legacy_parse(text: str) -> list:
+    json_start = text.find("[")
+    json_end = text.rfind("]")
+    if json_start == -1 or json_end == -1 or json_end <= json_start:
+        return []
+    try:
+        parsed = json.loads(text[json_start : json_end + 1])
+    except json.JSONDecodeError:
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--items", type=int, default=10, help="Items per LLM response.")
+    arg_parser.add_argument("--repeat", type=int, default=200, help="Parses per case and parser.")
+    args = arg_parser.parse_args()
+
+    corpus = build_corpus(args.items)
+    print(f"{'case':<20} {'bytes':>7} {'legacy us':>10} {'legacy items':>13} {'scan us':>8} {'parser us':>10} {'parser items':>13} {'salvaged':>9}")
+    for name, text in corpus.items():
+        legacy_us = timeit.timeit(lambda: legacy_parse(text), number=args.repeat) / args.repeat * 1e6
+        scan_us = timeit.timeit(lambda: JSONArrayStreamParser().feed(text), number=args.repeat) / args.repeat * 1e6
+        parser_us = timeit.timeit(lambda: parse_items(text, validate_mcq), number=args.repeat) / args.repeat * 1e6
+        result = parse_items(text, validate_mcq)
+        print(f"{name:<20} {len(text):>7} {legacy_us:>10.1f} {len(legacy_parse(text)):>13} {scan_us:>8.1f} {parser_us:>10.1f} {len(result.items):>13} {result.salvaged:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark of MCP discovery and tool-response serialization.
+
+Discovery: "rebuild + validate" reproduces the old endpoint, which built the ToolDefinition
+objects on every request and re-validated them through response_model. "precomputed" serves
+the bytes encoded once at import, and "304" is a poll that sends the ETag back.
+
+Tool responses: a payload of --items MCQs rendered with the stdlib JSONResponse vs
+FastJSONResponse (orjson when installed), measured as render-only and through the ASGI app.
+
+Usage:
+    python benchmarks/bench_serialization.py [--requests 2000] [--items 50]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "educhain_mcp_server"))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+
+def time_render(func, requests: int) -> float:
+    func()
+    started = time.perf_counter()
+    for _ in range(requests):
+        func()
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+async def time_requests(client: httpx.AsyncClient, path: str, requests: int, headers=None) -> float:
+    await client.get(path, headers=headers)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await client.get(path, headers=headers)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+async def run(args: argparse.Namespace) -> dict[str, float]:
+    import main as server
+    from fast_json import FastJSONResponse, orjson
+
+    payload = {"mcqs": server.edu_generator._generate_mock_mcqs("Python loops", args.items)}
+
+    legacy = FastAPI()
+
+    @legacy.get("/tools", response_model=List[server.ToolDefinition])
+    async def legacy_tools():
+        return [server.ToolDefinition(**tool.model_dump()) for tool in server.MCP_TOOLS]
+
+    @legacy.get("/payload/json")
+    async def payload_json():
+        return JSONResponse(content=payload)
+
+    @legacy.get("/payload/fast")
+    async def payload_fast():
+        return FastJSONResponse(content=payload)
+
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=legacy), base_url="http://bench") as client:
+        results["discovery: rebuild + validate"] = await time_requests(client, "/tools", args.requests)
+        results["payload: JSONResponse (ASGI)"] = await time_requests(client, "/payload/json", args.requests)
+        results["payload: FastJSONResponse (ASGI)"] = await time_requests(client, "/payload/fast", args.requests)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench") as client:
+        results["discovery: precomputed"] = await time_requests(client, "/.well-known/mcp/tools", args.requests)
+        etag = {"If-None-Match": server.MCP_TOOLS_DOCUMENT.etag}
+        results["discovery: 304"] = await time_requests(client, "/.well-known/mcp/tools", args.requests, headers=etag)
+    results["payload: JSONResponse (render)"] = time_render(lambda: JSONResponse(content=payload), args.requests)
+    results["payload: FastJSONResponse (render)"] = time_render(lambda: FastJSONResponse(content=payload), args.requests)
+    print(f"encoder: {'orjson' if orjson is not None else 'stdlib json (install orjson for the fast path)'}")
+    return results
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--requests", type=int, default=2000, help="Requests/renders per measurement.")
+    arg_parser.add_argument("--items", type=int, default=50, help="MCQs in the tool-response payload.")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="educhain-bench-") as directory:
+        # Keep the server's SQLite state out of the source tree while importing main.
+        os.environ.setdefault("EDUCHAIN_JOBS_DB", os.path.join(directory, "jobs.db"))
+        os.environ.setdefault("EDUCHAIN_QUESTION_BANK", "0")
+        logging.disable(logging.INFO)
+        results = asyncio.run(run(args))
+
+    for name, micros in results.items():
+        print(f"{name:<36} {micros:>9.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Startup benchmark: import time, memory and first-request latency of a fresh server process.
+
+Each run starts a new interpreter, imports main, records the import time, RSS and which LLM
+libraries got loaded, then sends the first generate_mcqs request through the ASGI app. Two
+modes are measured: "mock" (no backends configured, the default llm_backends.json) and
+"llm" (a stub backend pool, which loads LangChain). The median over --runs is compared
+against a per-mode budget, and the exit status is 1 if any budget is exceeded or if the
+mock mode loaded the LLM stack.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--modes mock,llm]
+        [--mock-import-ms 1000] [--mock-rss-mb 80] [--llm-import-ms 2500] [--llm-rss-mb 150]
+        [--first-request-ms 500]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "educhain_mcp_server")
+sys.path.insert(0, SERVER_DIR)
+
+# Modules that make up the LLM stack; a mock-only server should load none of them.
+LLM_MODULES = ("langchain_core", "langsmith", "ollama", "openai", "llm_pool")
+MODES = ("mock", "llm")
+
+
+def measure_child() -> None:
+    """Runs inside the child process: import main, then send the first request."""
+    import asyncio
+    import logging
+
+    started = time.perf_counter()
+    import main  # noqa: E402 - the import is what is being measured
+    import_ms = (time.perf_counter() - started) * 1000
+
+    from load_test import rss_mb
+    memory = rss_mb()
+    loaded = sorted(name for name in LLM_MODULES if name in sys.modules)
+
+    import httpx
+    logging.disable(logging.INFO)
+
+    async def first_request() -> float:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            response = await client.post("/tools/generate_mcqs", json={"topic": "Startup", "num_questions": 5})
+            response.raise_for_status()
+            return (time.perf_counter() - started) * 1000
+
+    first_request_ms = asyncio.run(first_request())
+    print(json.dumps({"import_ms": import_ms, "rss_mb": memory.get("rss_mb", memory.get("peak_rss_mb")),
+                      "first_request_ms": first_request_ms, "llm_modules": loaded}))
+
+
+def write_config(directory: str, mode: str) -> str:
+    path = os.path.join(directory, f"{mode}_backends.json")
+    backends = [{"name": "stub-1", "type": "stub", "delay_seconds": 0}] if mode == "llm" else []
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"enabled": mode == "llm", "health_check_interval_seconds": 0, "backends": backends}, f)
+    return path
+
+
+def run_once(directory: str, mode: str) -> dict:
+    env = dict(
+        os.environ,
+        EDUCHAIN_BACKENDS_CONFIG=write_config(directory, mode),
+        EDUCHAIN_JOBS_DB=os.path.join(directory, f"{mode}_jobs.db"),
+        EDUCHAIN_QUESTION_BANK="0",
+        EDUCHAIN_CACHE_MAX_ENTRIES="0",
+    )
+    benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [benchmarks_dir, env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child"],
+        cwd=SERVER_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--runs", type=int, default=5, help="Fresh processes per mode; the median is reported.")
+    arg_parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated modes to measure.")
+    arg_parser.add_argument("--mock-import-ms", type=float, default=1000.0, help="Import-time budget without backends.")
+    arg_parser.add_argument("--mock-rss-mb", type=float, default=80.0, help="RSS budget after import without backends.")
+    arg_parser.add_argument("--llm-import-ms", type=float, default=2500.0, help="Import-time budget with a backend pool.")
+    arg_parser.add_argument("--llm-rss-mb", type=float, default=150.0, help="RSS budget after import with a backend pool.")
+    arg_parser.add_argument("--first-request-ms", type=float, default=500.0, help="Budget for the first request, in either mode.")
+    arg_parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        measure_child()
+        return
+
+    failures = []
+    print(f"{'mode':<6} {'import ms':>10} {'rss MiB':>9} {'1st req ms':>11}  llm modules loaded")
+    with tempfile.TemporaryDirectory(prefix="educhain-startup-") as directory:
+        for mode in args.modes.split(","):
+            if mode not in MODES:
+                arg_parser.error(f"unknown mode '{mode}' (expected one of: {', '.join(MODES)})")
+            runs = [run_once(directory, mode) for _ in range(args.runs)]
+            import_ms = statistics.median(run["import_ms"] for run in runs)
+            rss = statistics.median(run["rss_mb"] for run in runs)
+            first_request_ms = statistics.median(run["first_request_ms"] for run in runs)
+            loaded = runs[-1]["llm_modules"]
+            print(f"{mode:<6} {import_ms:>10.1f} {rss:>9.1f} {first_request_ms:>11.1f}  {', '.join(loaded) or '-'}")
+
+            budgets = {
+                "import_ms": (import_ms, getattr(args, f"{mode}_import_ms")),
+                "rss_mb": (rss, getattr(args, f"{mode}_rss_mb")),
+                "first_request_ms": (first_request_ms, args.first_request_ms),
+            }
+            for metric, (value, budget) in budgets.items():
+                if value > budget:
+                    failures.append(f"{mode} {metric} {value:.1f} > {budget:.1f}")
+            if mode == "mock" and loaded:
+                failures.append(f"mock mode loaded {', '.join(loaded)}")
+
+    if failures:
+        print(f"\nOver budget: {'; '.join(failures)}")
+        sys.exit(1)
+    print("\nAll within budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+Load test of the MCP server against a stub LLM backend.
+
+The server is configured with a stub backend (see StubBackend in llm_pool.py) that answers
+every prompt after --llm-latency-ms with --items MCQs/flashcards or a lesson plan, so runs are
+reproducible and measure the server rather than a model. Traffic is a seeded, weighted mix of
+MCQ, flashcard, lesson-plan and streamed MCQ requests driven at a fixed concurrency, either
+in-process through httpx's ASGI transport or against a real uvicorn process.
+
+Reports RPS, p50/p95/p99 latency overall and per request type, error counts and memory (RSS),
+and can save the results as a JSON baseline or diff a run against one. With --baseline the exit
+status is 1 if any latency grew, or RPS fell, by more than --tolerance.
+
+Usage:
+    python benchmarks/load_test.py [--mode inprocess|uvicorn] [--workers 1] [--requests 2000] [--concurrency 32]
+        [--mix mcqs=50,flashcards=30,lesson_plan=15,mcqs_stream=5] [--llm-latency-ms 50] [--items 5]
+        [--topics 200] [--cache] [--save-baseline benchmarks/baseline.json]
+        [--baseline benchmarks/baseline.json --tolerance 0.15]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Optional
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "educhain_mcp_server")
+sys.path.insert(0, SERVER_DIR)
+
+import httpx  # noqa: E402
+
+REQUEST_TYPES = ("mcqs", "flashcards", "lesson_plan", "mcqs_stream")
+DEFAULT_MIX = "mcqs=50,flashcards=30,lesson_plan=15,mcqs_stream=5"
+# Relative growth of these metrics counts as a regression; for rps, a drop does.
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def stub_responses(items: int) -> dict[str, str]:
+    mcqs = [{"question": f"Stub question {i}?", "options": {"A": "a", "B": "b", "C": "c", "D": "d"}, "correct_answer": "A"}
+            for i in range(items)]
+    flashcards = [{"front": f"Stub term {i}", "back": f"Stub definition {i}"} for i in range(items)]
+    lesson_plan = {
+        "objective": "Stub objective", "materials": ["Whiteboard"], "introduction": "Stub introduction",
+        "main_activities": ["Stub activity"], "assessment": "Stub quiz", "conclusion": "Stub conclusion",
+    }
+    return {
+        "multiple-choice": json.dumps(mcqs),
+        "flashcards": json.dumps(flashcards),
+        "lesson plan": json.dumps(lesson_plan),
+    }
+
+
+def write_stub_config(directory: str, args: argparse.Namespace) -> str:
+    config = {
+        "enabled": True,
+        "health_check_interval_seconds": 0,
+        "backends": [
+            {
+                "name": f"stub-{i + 1}",
+                "type": "stub",
+                "delay_seconds": args.llm_latency_ms / 1000,
+                "max_concurrency": args.backend_concurrency,
+                "responses": stub_responses(args.items),
+            }
+            for i in range(args.backends)
+        ],
+    }
+    path = os.path.join(directory, "llm_backends.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    return path
+
+
+def server_env(directory: str, config_path: str, args: argparse.Namespace) -> dict[str, str]:
+    env = {
+        "EDUCHAIN_BACKENDS_CONFIG": config_path,
+        "EDUCHAIN_JOBS_DB": os.path.join(directory, "jobs.db"),
+        "EDUCHAIN_QUESTION_BANK_DB": os.path.join(directory, "question_bank.db"),
+        # --cache keeps both reuse layers on: the response cache and the question bank.
+        "EDUCHAIN_QUESTION_BANK": "1" if args.cache else "0",
+        # All load comes from one client address, so per-client rate limiting would only measure itself.
+        "EDUCHAIN_RATE_LIMIT_PER_MINUTE": "0",
+        "EDUCHAIN_CACHE_MAX_ENTRIES": "1024" if args.cache else "0",
+        "EDUCHAIN_MAX_CONCURRENT_GENERATIONS": str(args.max_concurrent_generations),
+    }
+    if args.workers > 1:
+        # What run_server.sh sets up: workers share generation locks and, with --cache, generated results.
+        env["EDUCHAIN_SHARED_STATE_DB"] = os.path.join(directory, "shared_state.db")
+        env["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(directory, "metrics")
+        os.makedirs(env["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+        if args.cache:
+            env["EDUCHAIN_CACHE_DB"] = os.path.join(directory, "cache.db")
+    return env
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in REQUEST_TYPES:
+            raise SystemExit(f"Unknown request type '{name}' in --mix (expected one of: {', '.join(REQUEST_TYPES)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def plan_requests(args: argparse.Namespace) -> list[tuple[str, str]]:
+    """Builds the seeded (request type, topic) sequence, so runs with the same flags send the same traffic."""
+    rng = random.Random(args.seed)
+    weights = parse_mix(args.mix)
+    kinds = rng.choices(list(weights), weights=list(weights.values()), k=args.requests)
+    return [(kind, f"Load test topic {rng.randrange(args.topics)}") for kind in kinds]
+
+
+async def send(client: httpx.AsyncClient, kind: str, topic: str, items: int) -> int:
+    if kind == "mcqs":
+        response = await client.post("/tools/generate_mcqs", json={"topic": topic, "num_questions": items})
+    elif kind == "flashcards":
+        response = await client.post("/tools/generate_flashcards", json={"topic": topic, "num_cards": items})
+    elif kind == "lesson_plan":
+        response = await client.get("/resources/lesson_plan", params={"subject": topic})
+    else:
+        async with client.stream("POST", "/tools/generate_mcqs", json={"topic": topic, "num_questions": items, "stream": True}) as response:
+            async for _ in response.aiter_lines():
+                pass
+    return response.status_code
+
+
+async def drive(client: httpx.AsyncClient, plan: list[tuple[str, str]], concurrency: int, items: int) -> tuple[dict, float]:
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    position = 0
+
+    async def worker() -> None:
+        nonlocal position
+        while position < len(plan):
+            kind, topic = plan[position]
+            position += 1
+            started = time.perf_counter()
+            try:
+                status_code = await send(client, kind, topic, items)
+            except httpx.HTTPError:
+                status_code = 0
+            latencies[kind].append(time.perf_counter() - started)
+            if status_code != 200:
+                errors[kind] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"latencies": latencies, "errors": errors}, time.perf_counter() - started
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+    }
+
+
+def rss_mb(pid: Optional[int] = None) -> dict:
+    """Current and peak resident set size in MiB (Linux /proc; falls back to ru_maxrss)."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status", encoding="utf-8") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return {
+            "rss_mb": round(int(fields["VmRSS"].split()[0]) / 1024, 1),
+            "peak_rss_mb": round(int(fields["VmHWM"].split()[0]) / 1024, 1),
+        }
+    except (OSError, KeyError, ValueError):
+        if pid is not None:
+            return {}
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return {"peak_rss_mb": round(peak / (1024 if sys.platform == "darwin" else 1), 1)}
+
+
+def tree_rss_mb(pid: int) -> dict:
+    """RSS of a server process plus its worker processes (uvicorn --workers), in MiB."""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", encoding="utf-8") as f:
+            children = [int(child) for child in f.read().split()]
+    except OSError:
+        children = []
+    memory = rss_mb(pid)
+    if children and "rss_mb" in memory:
+        memory["rss_mb"] = round(memory["rss_mb"] + sum(rss_mb(child).get("rss_mb", 0.0) for child in children), 1)
+        memory["processes"] = 1 + len(children)
+    return memory
+
+
+async def run_inprocess(plan: list[tuple[str, str]], args: argparse.Namespace, env: dict[str, str]) -> dict:
+    os.environ.update(env)
+    import main  # noqa: E402 - imported after the environment is configured
+
+    # The server logs every request; keep that out of the measurement and the report.
+    logging.getLogger().setLevel(logging.WARNING)
+    memory_before = rss_mb()
+    transport = httpx.ASGITransport(app=main.app)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+            await drive(client, plan[: args.warmup], args.concurrency, args.items)
+            outcome, elapsed = await drive(client, plan, args.concurrency, args.items)
+    return {"outcome": outcome, "elapsed": elapsed, "memory": {"before": memory_before, "after": rss_mb()}}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_uvicorn(plan: list[tuple[str, str]], args: argparse.Namespace, env: dict[str, str], log_path: str) -> dict:
+    port = free_port()
+    log = open(log_path, "w", encoding="utf-8")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+         "--workers", str(args.workers)],
+        cwd=SERVER_DIR, env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=log,
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout, limits=limits) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    await client.get("/")
+                    break
+                except httpx.TransportError:
+                    if time.monotonic() > deadline or server.poll() is not None:
+                        with open(log_path, encoding="utf-8") as f:
+                            raise SystemExit(f"uvicorn did not start:\n{f.read()[-2000:]}")
+                    await asyncio.sleep(0.2)
+            memory_before = tree_rss_mb(server.pid)
+            await drive(client, plan[: args.warmup], args.concurrency, args.items)
+            outcome, elapsed = await drive(client, plan, args.concurrency, args.items)
+            memory_after = tree_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        log.close()
+    return {"outcome": outcome, "elapsed": elapsed, "memory": {"before": memory_before, "after": memory_after}}
+
+
+def build_report(run: dict, args: argparse.Namespace) -> dict:
+    latencies, errors, elapsed = run["outcome"]["latencies"], run["outcome"]["errors"], run["elapsed"]
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "config": {
+            "mode": args.mode, "requests": args.requests, "concurrency": args.concurrency, "mix": args.mix,
+            "llm_latency_ms": args.llm_latency_ms, "items": args.items, "topics": args.topics,
+            "backends": args.backends, "cache": args.cache, "seed": args.seed, "workers": args.workers,
+        },
+        "overall": summarize(all_latencies, sum(errors.values()), elapsed),
+        "by_type": {kind: summarize(latencies[kind], errors.get(kind, 0), elapsed) for kind in REQUEST_TYPES if kind in latencies},
+        "memory": run["memory"],
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float, min_samples: int) -> list[str]:
+    """
+    Prints current vs baseline for every tracked metric and returns the regressions. Request types
+    with fewer than min_samples requests are shown but not flagged; their tail percentiles are noise.
+    """
+    regressions = []
+    sections = [("overall", report["overall"], baseline.get("overall", {}))]
+    sections += [(kind, stats, baseline.get("by_type", {}).get(kind, {})) for kind, stats in report["by_type"].items()]
+    print(f"\n{'':<14} {'metric':<8} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, current, previous in sections:
+        for metric in ("rps",) + LATENCY_METRICS:
+            if not previous.get(metric):
+                continue
+            change = (current[metric] - previous[metric]) / previous[metric]
+            worse = -change if metric == "rps" else change
+            flag = ""
+            if worse > tolerance:
+                flag = "  REGRESSION" if current["requests"] >= min_samples else "  (too few samples)"
+            print(f"{name:<14} {metric:<8} {previous[metric]:>10.2f} {current[metric]:>10.2f} {change:>+8.1%}{flag}")
+            if flag == "  REGRESSION":
+                regressions.append(f"{name} {metric}")
+    if report["config"] != baseline.get("config"):
+        print("\nNote: baseline was recorded with a different configuration; the comparison may not be like for like.")
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    print(f"\n{'type':<14} {'requests':>8} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in [("overall", report["overall"])] + list(report["by_type"].items()):
+        print(f"{name:<14} {stats['requests']:>8} {stats['errors']:>7} {stats['rps']:>9.1f} "
+              f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+    memory = report["memory"]
+    print(f"\nmemory (MiB): before {memory['before']}, after {memory['after']}")
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess")
+    arg_parser.add_argument("--requests", type=int, default=2000, help="Measured requests.")
+    arg_parser.add_argument("--warmup", type=int, default=100, help="Unmeasured requests sent first.")
+    arg_parser.add_argument("--concurrency", type=int, default=32, help="Requests kept in flight.")
+    arg_parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted request mix (types: {', '.join(REQUEST_TYPES)}).")
+    arg_parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="Stub LLM latency per call.")
+    arg_parser.add_argument("--items", type=int, default=5, help="MCQs/flashcards per stub response and per request.")
+    arg_parser.add_argument("--topics", type=int, default=200, help="Distinct topics traffic is spread over.")
+    arg_parser.add_argument("--backends", type=int, default=2, help="Stub backends in the pool.")
+    arg_parser.add_argument("--backend-concurrency", type=int, default=16, help="Concurrent calls per stub backend.")
+    arg_parser.add_argument("--max-concurrent-generations", type=int, default=64, help="Server admission limit.")
+    arg_parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (uvicorn mode), sharing state as with run_server.sh.")
+    arg_parser.add_argument("--cache", action="store_true", help="Keep the response cache and question bank on (off by default, so every request reaches the LLM path).")
+    arg_parser.add_argument("--seed", type=int, default=1234)
+    arg_parser.add_argument("--timeout", type=float, default=60.0, help="Per-request client timeout in seconds.")
+    arg_parser.add_argument("--save-baseline", metavar="PATH", help="Write this run's results to PATH.")
+    arg_parser.add_argument("--baseline", metavar="PATH", help="Compare against results previously saved with --save-baseline.")
+    arg_parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression before failing.")
+    arg_parser.add_argument("--min-samples", type=int, default=100, help="Requests a type needs before its regressions count.")
+    args = arg_parser.parse_args()
+
+    if args.workers > 1 and args.mode != "uvicorn":
+        arg_parser.error("--workers needs --mode uvicorn")
+    plan = plan_requests(args)
+    with tempfile.TemporaryDirectory(prefix="educhain-load-") as directory:
+        env = server_env(directory, write_stub_config(directory, args), args)
+        if args.mode == "inprocess":
+            run = asyncio.run(run_inprocess(plan, args, env))
+        else:
+            run = asyncio.run(run_uvicorn(plan, args, env, os.path.join(directory, "server.log")))
+
+    report = build_report(run, args)
+    print_report(report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.min_samples)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from shared_state import SharedStateStore
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed. Carries the HTTP status and a Retry-After hint in seconds."""
+
+    def __init__(self, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class AdmissionLease:
+    """Granted generation slots. `release` is idempotent so every exit path can call it."""
+
+    def __init__(self, controller: "AdmissionController", queue_wait: float, slots: int = 1):
+        self.controller = controller
+        self.queue_wait = queue_wait
+        self.slots = slots
+        self.started = time.monotonic()
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.controller.release(time.monotonic() - self.started, self.slots)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second refill, up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, cost: float = 1.0) -> float:
+        """Takes `cost` tokens if available and returns 0, otherwise returns seconds until they will be."""
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def is_full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+class RateLimiter:
+    """
+    Per-client token-bucket rate limiting. Clients are identified by a caller-supplied key
+    (API key or IP address); idle clients' buckets are pruned once `max_clients` is exceeded.
+    With a SharedStateStore the buckets live there instead, so the limit holds across workers.
+    A request that fans out (a batch) costs one token per generation, capped at the burst size.
+    """
+
+    def __init__(self, requests_per_minute: float = 60.0, burst: float = 20.0, max_clients: int = 10000,
+                 shared: Optional[SharedStateStore] = None):
+        self.rate = requests_per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self.shared = shared
+        self.rejected = 0
+        self._buckets: dict[str, TokenBucket] = {}
+
+    def check(self, client_key: str, cost: int = 1) -> None:
+        cost = min(cost, self.burst)
+        if self.shared is not None:
+            wait_seconds = self.shared.take(f"rate:{client_key}", self.rate, self.burst, cost)
+        else:
+            bucket = self._buckets.get(client_key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_clients:
+                    self._prune()
+                bucket = self._buckets[client_key] = TokenBucket(self.rate, self.burst)
+            wait_seconds = bucket.take(cost)
+        self._reject_if_limited(wait_seconds)
+
+    async def acheck(self, client_key: str, cost: int = 1) -> None:
+        """Async variant of check: the shared store's write runs on a thread, off the event loop."""
+        if self.shared is None:
+            self.check(client_key, cost)
+            return
+        self._reject_if_limited(await self.shared.atake(f"rate:{client_key}", self.rate, self.burst, min(cost, self.burst)))
+
+    def _reject_if_limited(self, wait_seconds: float) -> None:
+        if wait_seconds:
+            self.rejected += 1
+            raise AdmissionRejected(429, max(1, math.ceil(wait_seconds)), "Rate limit exceeded. Retry later.")
+
+    def _prune(self) -> None:
+        for key in [key for key, bucket in self._buckets.items() if bucket.is_full()]:
+            del self._buckets[key]
+
+    def stats(self) -> dict:
+        clients = self.shared.client_count() if self.shared is not None else len(self._buckets)
+        return {"clients": clients, "rejected": self.rejected}
+
+
+class AdmissionController:
+    """
+    Bounds concurrent generations and the queue in front of them.
+
+    Requests beyond `max_concurrent` wait in a bounded priority queue; when it is full, or a
+    request has waited `queue_timeout_seconds`, it is shed with 503 instead of piling up behind
+    the LLM. Queue order favours small jobs: a request's priority is its arrival time plus
+    `cost * seconds_per_cost_unit`, so a 50-question job yields to small requests arriving
+    shortly after it but can't be starved indefinitely.
+
+    A request that runs several generations at once (a batch) takes one slot per generation,
+    up to `max_concurrent`. Slots are granted in queue order: a waiter needing more slots than
+    are free holds back the ones behind it, so wide requests aren't starved by narrow ones.
+    """
+
+    def __init__(self, max_concurrent: int = 32, max_queue: int = 256, queue_timeout_seconds: float = 30.0,
+                 seconds_per_cost_unit: float = 0.05):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.seconds_per_cost_unit = seconds_per_cost_unit
+        self.active = 0
+        self.admitted = 0
+        self.shed = 0
+        self._service_time_ewma = 1.0
+        # Heap of (priority, sequence, slots, future). Timed-out and cancelled entries stay in it
+        # until popped, so the number of live waiters is tracked separately in _queued.
+        self._waiters: list[tuple[float, int, int, asyncio.Future]] = []
+        self._queued = 0
+        self._sequence = itertools.count()
+
+    def _retry_after(self) -> int:
+        backlog = self._queued + 1
+        return max(1, math.ceil(self._service_time_ewma * backlog / self.max_concurrent))
+
+    async def acquire(self, cost: int = 1, slots: int = 1) -> float:
+        """Waits for `slots` generation slots and returns the time spent queued, in seconds."""
+        slots = self.slots_for(slots)
+        if self.active + slots <= self.max_concurrent and not self._queued:
+            self.active += slots
+            self.admitted += 1
+            return 0.0
+
+        if self._queued >= self.max_queue:
+            self.shed += 1
+            raise AdmissionRejected(503, self._retry_after(), "Server is at capacity. Retry later.")
+
+        if len(self._waiters) >= self.max_queue:
+            self._prune_waiters()
+        enqueued = time.monotonic()
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (enqueued + cost * self.seconds_per_cost_unit, next(self._sequence), slots, future))
+        self._queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                self._queued -= 1
+                self.shed += 1
+                raise AdmissionRejected(503, self._retry_after(), "Timed out waiting for a generation slot. Retry later.")
+        except asyncio.CancelledError:
+            # The client went away; hand the slots on if we had already been granted them.
+            if future.done() and not future.cancelled():
+                self.release(slots=slots)
+            else:
+                future.cancel()
+                self._queued -= 1
+            raise
+        self.admitted += 1
+        return time.monotonic() - enqueued
+
+    def release(self, service_seconds: Optional[float] = None, slots: int = 1) -> None:
+        if service_seconds is not None:
+            self._service_time_ewma = 0.9 * self._service_time_ewma + 0.1 * service_seconds
+        self.active -= slots
+        # Hand the freed slots to the highest-priority live waiters, in order, while they fit.
+        while self._waiters:
+            _, _, wanted, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.active + wanted > self.max_concurrent:
+                return
+            heapq.heappop(self._waiters)
+            self.active += wanted
+            self._queued -= 1
+            future.set_result(None)
+
+    def slots_for(self, generations: int) -> int:
+        """Slots a request running `generations` generations at once takes."""
+        return max(1, min(generations, self.max_concurrent))
+
+    def _prune_waiters(self) -> None:
+        """Drops timed-out and cancelled waiters from the heap."""
+        self._waiters = [waiter for waiter in self._waiters if not waiter[3].done()]
+        heapq.heapify(self._waiters)
+
+    async def lease(self, cost: int = 1, slots: int = 1) -> AdmissionLease:
+        """Acquires slots whose lifetime outlives the caller, e.g. for the duration of a streamed response."""
+        queue_wait = await self.acquire(cost, slots)
+        return AdmissionLease(self, queue_wait, self.slots_for(slots))
+
+    @asynccontextmanager
+    async def slot(self, cost: int = 1, slots: int = 1) -> AsyncIterator[AdmissionLease]:
+        lease = await self.lease(cost, slots)
+        try:
+            yield lease
+        finally:
+            lease.release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": self._queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
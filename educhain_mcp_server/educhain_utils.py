@@ -1,13 +1,137 @@
+import asyncio
+import contextvars
+import functools
 import random
 import json
-from typing import Any, Optional, Union   
-
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-import ollama
-
-llm_model: Optional[Union[any, 'ollama', 'ChatOpenAI']] = None # type: ignore 
+import threading
+import time
+from contextlib import aclosing
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Optional, Union
+
+from llm_parsing import JSONArrayStreamParser, Validator, parse_items, parse_object, validate_flashcard, validate_lesson_plan, validate_mcq
+from observability import (
+    BANK_LOOKUPS, CACHE_LOOKUPS, DROPPED_ITEMS, MOCK_FALLBACKS, PARSE_FAILURES,
+    STAGE_LLM_CALL, STAGE_PARSE, STAGE_PROMPT_BUILD, STAGE_TTFT,
+    generation_span, observe_stage, timed_stage,
+)
+from question_bank import QuestionBank
+from response_cache import ResponseCache, prompt_template_hash
+
+llm_model: Optional[Union[any, 'ollama', 'ChatOpenAI']] = None # type: ignore
+
+# Upper bound on threads used to run LLM backends that only expose synchronous calls.
+DEFAULT_SYNC_LLM_WORKERS = 16
+
+# Default and maximum number of topics a batch request sends to the LLM concurrently.
+DEFAULT_BATCH_CONCURRENCY = 4
+MAX_BATCH_CONCURRENCY = 16
+
+# Follow-up LLM calls allowed to fill in items missing from a short or partly broken response.
+DEFAULT_TOP_UP_RETRIES = 2
+# Existing items quoted back to the model in a top-up prompt, so it doesn't repeat them.
+MAX_TOP_UP_CONTEXT_ITEMS = 50
+
+MCQ_PROMPT_MESSAGES = [
+    ("system", "You are an educational content generator. Create multiple-choice questions."),
+    ("user", "Generate {num_questions} multiple-choice questions about '{topic}'. For each question, provide 4 options (A, B, C, D) and specify the correct answer. Format the output as a JSON array of objects, each with 'question', 'options' (an object with A, B, C, D keys), and 'correct_answer' keys.")
+]
+
+MCQ_TOP_UP_PROMPT_MESSAGES = [
+    ("system", "You are an educational content generator. Create multiple-choice questions."),
+    ("user", "Generate {num_questions} more multiple-choice questions about '{topic}'. Do not repeat any of these existing questions:\n{existing}\nFor each question, provide 4 options (A, B, C, D) and specify the correct answer. Format the output as a JSON array of objects, each with 'question', 'options' (an object with A, B, C, D keys), and 'correct_answer' keys.")
+]
+
+LESSON_PLAN_PROMPT_MESSAGES = [
+    ("system", "You are an educational content generator, expert in creating structured lesson plans."),
+    ("user", "Generate a detailed lesson plan for teaching '{subject}'. Include sections like 'Objective', 'Materials', 'Introduction', 'Main Activities', 'Assessment', and 'Conclusion'. Provide it as a JSON object.")
+]
+
+FLASHCARD_PROMPT_MESSAGES = [
+    ("system", "You are an educational content generator. Create flashcards for learning."),
+    ("user", "Generate {num_cards} flashcards about '{topic}'. Each flashcard should have a 'front' (term/question) and a 'back' (definition/answer). Format the output as a JSON array of objects, each with 'front' and 'back' keys.")
+]
+
+FLASHCARD_TOP_UP_PROMPT_MESSAGES = [
+    ("system", "You are an educational content generator. Create flashcards for learning."),
+    ("user", "Generate {num_cards} more flashcards about '{topic}'. Do not repeat any of these existing flashcards:\n{existing}\nEach flashcard should have a 'front' (term/question) and a 'back' (definition/answer). Format the output as a JSON array of objects, each with 'front' and 'back' keys.")
+]
+
+MCQ_TEMPLATE_HASH = prompt_template_hash(MCQ_PROMPT_MESSAGES)
+LESSON_PLAN_TEMPLATE_HASH = prompt_template_hash(LESSON_PLAN_PROMPT_MESSAGES)
+FLASHCARD_TEMPLATE_HASH = prompt_template_hash(FLASHCARD_PROMPT_MESSAGES)
+
+
+# Chain registry: every prompt the generator runs, with the input variables it must declare.
+# Chains are composed once per generator instead of on every request.
+CHAIN_PROMPTS: dict[str, tuple[list, set]] = {
+    "generate_mcqs": (MCQ_PROMPT_MESSAGES, {"num_questions", "topic"}),
+    "generate_mcqs_top_up": (MCQ_TOP_UP_PROMPT_MESSAGES, {"num_questions", "topic", "existing"}),
+    "generate_flashcards": (FLASHCARD_PROMPT_MESSAGES, {"num_cards", "topic"}),
+    "generate_flashcards_top_up": (FLASHCARD_TOP_UP_PROMPT_MESSAGES, {"num_cards", "topic", "existing"}),
+    "generate_lesson_plan": (LESSON_PLAN_PROMPT_MESSAGES, {"subject"}),
+}
+
+# Prompt sent by warm_up() to load the model before the first real request.
+WARM_UP_PROMPT = "Reply with OK."
+
+
+@dataclass(frozen=True)
+class ListToolSpec:
+    """Everything the shared list-generation pipeline needs to know about one tool."""
+    tool: str
+    kind: str
+    count_var: str
+    key_field: str
+    prompt_messages: list
+    top_up_prompt_messages: list
+    template_hash: str
+    validator: Validator
+
+
+MCQ_TOOL = ListToolSpec(
+    tool="generate_mcqs",
+    kind="MCQs",
+    count_var="num_questions",
+    key_field="question",
+    prompt_messages=MCQ_PROMPT_MESSAGES,
+    top_up_prompt_messages=MCQ_TOP_UP_PROMPT_MESSAGES,
+    template_hash=MCQ_TEMPLATE_HASH,
+    validator=validate_mcq,
+)
+
+FLASHCARD_TOOL = ListToolSpec(
+    tool="generate_flashcards",
+    kind="flashcards",
+    count_var="num_cards",
+    key_field="front",
+    prompt_messages=FLASHCARD_PROMPT_MESSAGES,
+    top_up_prompt_messages=FLASHCARD_TOP_UP_PROMPT_MESSAGES,
+    template_hash=FLASHCARD_TEMPLATE_HASH,
+    validator=validate_flashcard,
+)
+
+
+def _llm_has_native_async(llm: Any) -> bool:
+    """
+    Returns True if the LLM implements its own async call path. LangChain models that only
+    override the sync hooks inherit async shims that push work onto the default executor,
+    so those are treated as sync-only and routed through our bounded thread pool instead.
+    """
+    try:
+        from langchain_core.language_models import BaseChatModel, BaseLLM, LLM
+    except ImportError:
+        return False
 
+    llm_cls = type(llm)
+    if isinstance(llm, BaseChatModel):
+        return llm_cls._agenerate is not BaseChatModel._agenerate
+    if isinstance(llm, LLM):
+        return llm_cls._acall is not LLM._acall
+    if isinstance(llm, BaseLLM):
+        return llm_cls._agenerate is not BaseLLM._agenerate
+    return callable(getattr(llm, "ainvoke", None))
 
 
 class EduChainContentGenerator:
@@ -16,51 +140,620 @@ class EduChainContentGenerator:
     In a real scenario, this would wrap the actual educhain functions.
     """
 
-    def __init__(self, llm: Optional[Union[any, 'Ollama', 'ChatOpenAI']] = None): # type: ignore # 
+    def __init__(self, llm: Optional[Union[any, 'Ollama', 'ChatOpenAI']] = None, max_sync_workers: int = DEFAULT_SYNC_LLM_WORKERS, cache: Optional[ResponseCache] = None, top_up_retries: int = DEFAULT_TOP_UP_RETRIES, bank: Optional[QuestionBank] = None): # type: ignore #
         self.llm = llm
-
-    def generate_mcqs(self, topic: str, num_questions: int = 5) -> list[dict]:
+        self.cache = cache
+        self.bank = bank
+        self.top_up_retries = top_up_retries
+        self.native_async = llm is not None and _llm_has_native_async(llm)
+        self.max_sync_workers = max_sync_workers
+        self._sync_executor: Optional[ThreadPoolExecutor] = None
+        self._prompts: dict[str, Any] = {}
+        self._completion: Any = None
+        self._chains: dict[str, Any] = self._build_chains() if llm is not None else {}
+
+    def _build_chains(self) -> dict[str, Any]:
+        """
+        Builds every tool's prompt | llm | parser runnable once, checking each prompt declares
+        exactly the variables its callers pass so template mistakes fail at startup.
+        The prompt and the llm | parser half are also kept apart so single calls can time
+        prompt formatting and the LLM call as separate stages.
+        LangChain is imported here rather than at module level, so mock-only servers never load it.
+        """
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_core.prompts import ChatPromptTemplate
+
+        output_parser = StrOutputParser()
+        self._completion = self.llm | output_parser
+        chains = {}
+        for name, (prompt_messages, expected_vars) in CHAIN_PROMPTS.items():
+            prompt_template = ChatPromptTemplate.from_messages(prompt_messages)
+            if set(prompt_template.input_variables) != expected_vars:
+                raise ValueError(f"Prompt for '{name}' expects {sorted(prompt_template.input_variables)}, but callers pass {sorted(expected_vars)}.")
+            self._prompts[name] = prompt_template
+            chains[name] = prompt_template | self.llm | output_parser
+        return chains
+
+    def warm_up(self) -> None:
+        """
+        Sends one cheap request so the model is loaded before the first real generation.
+        Failures are reported but not raised; the server still starts.
+        """
+        if self.llm is None:
+            return
+        try:
+            self.llm.invoke(WARM_UP_PROMPT)
+            print("LLM warm-up request completed.")
+        except Exception as e:
+            print(f"LLM warm-up request failed: {e}")
+
+    async def awarm_up(self) -> None:
+        """Async variant of warm_up. Backend pools warm every backend, not just one."""
+        if self.llm is None:
+            return
+        if hasattr(self.llm, "awarm_up"):
+            await self.llm.awarm_up(WARM_UP_PROMPT)
+            return
+        if not self.native_async:
+            await self._run_sync(self.warm_up)
+            return
+        try:
+            await self.llm.ainvoke(WARM_UP_PROMPT)
+            print("LLM warm-up request completed.")
+        except Exception as e:
+            print(f"LLM warm-up request failed: {e}")
+
+    async def _run_sync(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Runs a blocking generator call on the bounded LLM thread pool so the event loop stays free.
+        """
+        if self._sync_executor is None:
+            self._sync_executor = ThreadPoolExecutor(max_workers=self.max_sync_workers, thread_name_prefix="educhain-llm")
+        loop = asyncio.get_running_loop()
+        # Carry the caller's context (e.g. the current trace span) into the worker thread.
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._sync_executor, functools.partial(context.run, func, *args))
+
+    def _invoke_prompt(self, name: str, prompt_vars: dict, tool: str) -> str:
+        """Runs one registered prompt through the LLM, timing prompt build and LLM call separately."""
+        with timed_stage(tool, STAGE_PROMPT_BUILD):
+            prompt_value = self._prompts[name].invoke(prompt_vars)
+        with timed_stage(tool, STAGE_LLM_CALL):
+            return self._completion.invoke(prompt_value)
+
+    async def _ainvoke_prompt(self, name: str, prompt_vars: dict, tool: str) -> str:
+        """Async variant of _invoke_prompt."""
+        with timed_stage(tool, STAGE_PROMPT_BUILD):
+            prompt_value = self._prompts[name].invoke(prompt_vars)
+        with timed_stage(tool, STAGE_LLM_CALL):
+            if self.native_async:
+                return await self._completion.ainvoke(prompt_value)
+            return await self._run_sync(self._completion.invoke, prompt_value)
+
+    def close(self) -> None:
+        """Releases the thread pool used for sync-only LLM backends and the cache's disk tier."""
+        if self._sync_executor is not None:
+            self._sync_executor.shutdown(wait=False)
+            self._sync_executor = None
+        if self.cache is not None:
+            self.cache.close()
+        if self.bank is not None:
+            self.bank.close()
+
+    def _cache_get(self, tool: str, subject: str, template_hash: str, count: Optional[int] = None) -> Optional[Any]:
+        if self.cache is None:
+            return None
+        return self._record_cache_lookup(tool, subject, self.cache.get(tool, subject, template_hash, count))
+
+    async def _acache_get(self, tool: str, subject: str, template_hash: str, count: Optional[int] = None) -> Optional[Any]:
+        """Async variant of _cache_get; lookups that reach the SQLite tier run off the event loop."""
+        if self.cache is None:
+            return None
+        return self._record_cache_lookup(tool, subject, await self.cache.aget(tool, subject, template_hash, count))
+
+    @staticmethod
+    def _record_cache_lookup(tool: str, subject: str, cached: Optional[Any]) -> Optional[Any]:
+        CACHE_LOOKUPS.labels(tool, "miss" if cached is None else "hit").inc()
+        if cached is not None:
+            print(f"Cache hit for {tool} on: {subject}")
+        return cached
+
+    def _list_cache_get(self, spec: "ListToolSpec", topic: str, count: int) -> Optional[list[dict]]:
+        # With a question bank, list tools rotate through banked items instead: a cached response
+        # would hand every caller the same quiz for the cache's whole TTL.
+        if self.bank is not None:
+            return None
+        return self._cache_get(spec.tool, topic, spec.template_hash, count)
+
+    async def _alist_cache_get(self, spec: "ListToolSpec", topic: str, count: int) -> Optional[list[dict]]:
+        if self.bank is not None:
+            return None
+        return await self._acache_get(spec.tool, topic, spec.template_hash, count)
+
+    def _cache_set(self, tool: str, subject: str, template_hash: str, value: Any) -> None:
+        if self.cache is not None:
+            self.cache.set(tool, subject, template_hash, value)
+
+    async def _acache_set(self, tool: str, subject: str, template_hash: str, value: Any) -> None:
+        if self.cache is not None:
+            await self.cache.aset(tool, subject, template_hash, value)
+
+    def _bank_sample(self, spec: "ListToolSpec", topic: str, count: int) -> Optional[list[dict]]:
+        if self.bank is None:
+            return None
+        sample = self.bank.sample(spec.tool, topic, count)
+        BANK_LOOKUPS.labels(spec.tool, "miss" if sample is None else "hit").inc()
+        if sample is not None:
+            print(f"Serving {count} {spec.kind} on: {topic} from the question bank")
+        return sample
+
+    def _bank_add(self, spec: "ListToolSpec", topic: str, items: list[dict], served: int = 0) -> None:
+        """Banks items; the first `served` are being returned now and go to the back of the rotation."""
+        if self.bank is not None and items:
+            self.bank.add(spec.tool, topic, items, spec.key_field, served=served)
+
+    def _bank_items(self, spec: "ListToolSpec", topic: str) -> list[dict]:
+        return self.bank.items(spec.tool, topic) if self.bank is not None else []
+
+    def _grow_bank_and_sample(self, spec: "ListToolSpec", topic: str, count: int, existing: list[dict]) -> list[dict]:
         """
-        Generates multiple-choice questions for a given topic. 
-        This function simulates interaction with an LLM or educhain's MCQ generator. 
+        The topic's bank can fill the request but is too small to vary it: ask the LLM once for
+        items it doesn't have yet, then deal from the bank. Never falls back to mock content.
         """
-        print(f"Generating {num_questions} MCQs on: {topic}")
-        mcqs: list[dict] = [] 
-        if self.llm:
-            prompt_template = ChatPromptTemplate.from_messages([
-                ("system", "You are an educational content generator. Create multiple-choice questions."),
-                ("user", "Generate {num_questions} multiple-choice questions about '{topic}'. For each question, provide 4 options (A, B, C, D) and specify the correct answer. Format the output as a JSON array of objects, each with 'question', 'options' (an object with A, B, C, D keys), and 'correct_answer' keys.")
-            ])
+        items = self._top_up(spec, topic, existing, len(existing) + count, attempts=1)
+        return self._bank_add_and_sample(spec, topic, count, items[len(existing):])
 
-            chain = prompt_template | self.llm | StrOutputParser()
+    async def _agrow_bank_and_sample(self, spec: "ListToolSpec", topic: str, count: int, existing: list[dict]) -> list[dict]:
+        """Async variant of _grow_bank_and_sample. Banking runs on the thread pool, off the event loop."""
+        items = await self._atop_up(spec, topic, existing, len(existing) + count, attempts=1)
+        return await self._run_sync(self._bank_add_and_sample, spec, topic, count, items[len(existing):])
 
+    def _bank_add_and_sample(self, spec: "ListToolSpec", topic: str, count: int, new_items: list[dict]) -> list[dict]:
+        self._bank_add(spec, topic, new_items)
+        return self.bank.sample(spec.tool, topic, count, min_bank_multiple=1)  # type: ignore
+
+    # Shared pipeline for list tools (MCQs, flashcards)
+
+    def _parse_list_response(self, llm_response_content: str, spec: ListToolSpec) -> list[dict]:
+        """
+        Extracts every valid item from an LLM response in one pass. Returns an empty list
+        when nothing usable was found.
+        """
+        if not isinstance(llm_response_content, str):
+            print(f"LLM response was not a string, cannot parse JSON for {spec.kind}.")
+            PARSE_FAILURES.labels(spec.tool).inc()
+            return []
+
+        with timed_stage(spec.tool, STAGE_PARSE):
+            result = parse_items(llm_response_content, spec.validator)
+        if result.dropped:
+            DROPPED_ITEMS.labels(spec.tool).inc(result.dropped)
+        if result.salvaged:
+            print(f"Salvaged {result.salvaged} {spec.kind} from a partially malformed LLM response ({result.dropped} dropped).")
+        if not result.items:
+            PARSE_FAILURES.labels(spec.tool).inc()
+            print(f"Warning: LLM response did not contain any valid {spec.kind}. LLM response: {llm_response_content[:200]}...")
+        return result.items
+
+    @staticmethod
+    def _item_key(item: dict, spec: ListToolSpec) -> str:
+        return " ".join(str(item.get(spec.key_field, "")).lower().split())
+
+    def _merge_unique(self, items: list[dict], new_items: list[dict], spec: ListToolSpec, count: int) -> list[dict]:
+        """Appends new items that don't repeat an existing one, up to count."""
+        seen = {self._item_key(item, spec) for item in items}
+        merged = list(items)
+        for item in new_items:
+            if len(merged) >= count:
+                break
+            key = self._item_key(item, spec)
+            if key not in seen:
+                seen.add(key)
+                merged.append(item)
+        return merged
+
+    def _top_up_vars(self, spec: ListToolSpec, topic: str, items: list[dict], missing: int) -> dict:
+        existing = "\n".join(f"- {item.get(spec.key_field, '')}" for item in items[-MAX_TOP_UP_CONTEXT_ITEMS:])
+        return {spec.count_var: missing, "topic": topic, "existing": existing or "- (none yet)"}
+
+    def _top_up(self, spec: ListToolSpec, topic: str, items: list[dict], count: int, attempts: Optional[int] = None) -> list[dict]:
+        """
+        Asks the LLM only for the items still missing, passing the ones already produced as context,
+        until count is reached or the retry budget (attempts, default top_up_retries) is spent.
+        """
+        attempts = self.top_up_retries if attempts is None else attempts
+        for attempt in range(attempts):
+            missing = count - len(items)
+            if missing <= 0:
+                break
+            print(f"Topping up {missing} {spec.kind} on: {topic} (attempt {attempt + 1}/{attempts})")
             try:
-                llm_response_content: str = chain.invoke({"num_questions": num_questions, "topic": topic}) #  Type hint the response
-                
-                if not isinstance(llm_response_content, str):
-                    raise TypeError("LLM response was not a string, cannot parse JSON.")
+                llm_response_content: str = self._invoke_prompt(f"{spec.tool}_top_up", self._top_up_vars(spec, topic, items, missing), spec.tool)
+            except Exception as e:
+                print(f"An error occurred during LLM top-up: {e}.")
+                break
+            items = self._merge_unique(items, self._parse_list_response(llm_response_content, spec), spec, count)
+        return items
+
+    async def _atop_up(self, spec: ListToolSpec, topic: str, items: list[dict], count: int, attempts: Optional[int] = None) -> list[dict]:
+        """Async variant of _top_up. attempts overrides the generator's top_up_retries."""
+        attempts = self.top_up_retries if attempts is None else attempts
+        for attempt in range(attempts):
+            missing = count - len(items)
+            if missing <= 0:
+                break
+            print(f"Topping up {missing} {spec.kind} on: {topic} (attempt {attempt + 1}/{attempts})")
+            try:
+                llm_response_content: str = await self._ainvoke_prompt(f"{spec.tool}_top_up", self._top_up_vars(spec, topic, items, missing), spec.tool)
+            except Exception as e:
+                print(f"An error occurred during LLM top-up: {e}.")
+                break
+            items = self._merge_unique(items, self._parse_list_response(llm_response_content, spec), spec, count)
+        return items
+
+    def _finish_items(self, spec: ListToolSpec, topic: str, items: list[dict], count: int, mock: Callable[[str, int], list[dict]]) -> list[dict]:
+        """
+        Banks the real items (or caches them, without a bank) and returns exactly count of them. Mock content only
+        fills the slots the LLM couldn't provide after top-up, and is never cached. Banking
+        signs every item (MinHash) and writes SQLite, so async callers run this through _run_sync.
+        """
+        if items:
+            if self.bank is None:
+                self._cache_set(spec.tool, topic, spec.template_hash, items)
+            self._bank_add(spec, topic, items, served=count)
+        if len(items) >= count:
+            return items[:count]
+        if items:
+            print(f"Warning: only {len(items)} of {count} {spec.kind} generated. Filling the rest with mock {spec.kind}.")
+            MOCK_FALLBACKS.labels(spec.tool, "short_response").inc()
+        else:
+            print(f"Generating mock {spec.kind}.")
+            MOCK_FALLBACKS.labels(spec.tool, "parse_failure").inc()
+        return items + mock(topic, count)[len(items):]
+
+    def _mock_items(self, spec: ListToolSpec, topic: str, count: int, mock: Callable[[str, int], list[dict]], reason: str) -> list[dict]:
+        MOCK_FALLBACKS.labels(spec.tool, reason).inc()
+        return mock(topic, count)
+
+    def _generate_list(self, spec: ListToolSpec, topic: str, count: int, mock: Callable[[str, int], list[dict]]) -> list[dict]:
+        print(f"Generating {count} {spec.kind} on: {topic}")
+        if not self.llm:
+            return self._mock_items(spec, topic, count, mock, "no_llm")
+
+        with generation_span(spec.tool, topic=topic, count=count):
+            banked = self._bank_sample(spec, topic, count)
+            if banked is not None:
+                return banked
+            cached = self._list_cache_get(spec, topic, count)
+            if cached is not None:
+                return cached
+            # A bank that can fill the request but is too small to vary it grows with items it doesn't have yet.
+            existing = self._bank_items(spec, topic)
+            if len(existing) >= count:
+                return self._grow_bank_and_sample(spec, topic, count, existing)
 
-                json_start = llm_response_content.find("[")
-                json_end = llm_response_content.rfind("]")
+            try:
+                llm_response_content: str = self._invoke_prompt(spec.tool, {spec.count_var: count, "topic": topic}, spec.tool) #  Type hint the response
+            except Exception as e:
+                print(f"An error occurred during LLM interaction: {e}. Generating mock {spec.kind}.")
+                return self._mock_items(spec, topic, count, mock, "llm_error")
+
+            items = self._merge_unique([], self._parse_list_response(llm_response_content, spec), spec, count)
+            items = self._top_up(spec, topic, items, count)
+            return self._finish_items(spec, topic, items, count, mock)
+
+    async def _agenerate_list(self, spec: ListToolSpec, topic: str, count: int, mock: Callable[[str, int], list[dict]]) -> list[dict]:
+        if self.llm and not self.native_async:
+            return await self._run_sync(self._generate_list, spec, topic, count, mock)
+
+        print(f"Generating {count} {spec.kind} on: {topic}")
+        if not self.llm:
+            return self._mock_items(spec, topic, count, mock, "no_llm")
+
+        with generation_span(spec.tool, topic=topic, count=count):
+            banked = self._bank_sample(spec, topic, count)
+            if banked is not None:
+                return banked
+            cached = await self._alist_cache_get(spec, topic, count)
+            if cached is not None:
+                return cached
+            # A bank that can fill the request but is too small to vary it grows with items it doesn't have yet.
+            existing = self._bank_items(spec, topic)
+            if len(existing) >= count:
+                return await self._agrow_bank_and_sample(spec, topic, count, existing)
 
-                if json_start != -1 and json_end != -1 and json_end > json_start:
-                    json_string = llm_response_content[json_start : json_end + 1]
-                    mcqs = json.loads(json_string)
+            try:
+                llm_response_content: str = await self._ainvoke_prompt(spec.tool, {spec.count_var: count, "topic": topic}, spec.tool)
+            except Exception as e:
+                print(f"An error occurred during LLM interaction: {e}. Generating mock {spec.kind}.")
+                return self._mock_items(spec, topic, count, mock, "llm_error")
+
+            items = self._merge_unique([], self._parse_list_response(llm_response_content, spec), spec, count)
+            items = await self._atop_up(spec, topic, items, count)
+            return await self._run_sync(self._finish_items, spec, topic, items, count, mock)
+
+    def _finish_more(self, spec: ListToolSpec, topic: str, existing: list[dict], items: list[dict], target: int,
+                     mock: Callable[[str, int], list[dict]], pad: bool = True) -> list[dict]:
+        """Banks the new real items and returns them, mock-filled up to the requested count unless pad is False."""
+        self._bank_add(spec, topic, items[len(existing):], served=len(items) - len(existing))
+        if len(items) < target and not pad:
+            print(f"Warning: only {len(items) - len(existing)} of {target - len(existing)} new {spec.kind} generated.")
+        elif len(items) < target:
+            print(f"Warning: only {len(items) - len(existing)} of {target - len(existing)} new {spec.kind} generated. Filling the rest with mock {spec.kind}.")
+            MOCK_FALLBACKS.labels(spec.tool, "short_response" if len(items) > len(existing) else "parse_failure").inc()
+            items = items + mock(topic, target)[len(items):]
+        return items[len(existing):]
+
+    def _generate_more(self, spec: ListToolSpec, topic: str, count: int, existing: list[dict],
+                       mock: Callable[[str, int], list[dict]], pad: bool = True) -> list[dict]:
+        """
+        Generates count further items on a topic that don't repeat the existing ones, using the
+        top-up prompt. Used to grow question banks and build large item sets chunk by chunk;
+        returns only the new items. With pad=False, items the LLM couldn't provide are left out
+        instead of being filled with mock content, so the result may be short (mock content is
+        still returned when no LLM is configured).
+        """
+        if not existing and pad:
+            return self._generate_list(spec, topic, count, mock)
+        target = len(existing) + count
+        if not self.llm:
+            return self._mock_items(spec, topic, target, mock, "no_llm")[len(existing):]
+
+        with generation_span(spec.tool, topic=topic, count=count, existing=len(existing)):
+            items = self._top_up(spec, topic, existing, target, attempts=self.top_up_retries + 1)
+            return self._finish_more(spec, topic, existing, items, target, mock, pad)
+
+    async def _agenerate_more(self, spec: ListToolSpec, topic: str, count: int, existing: list[dict],
+                              mock: Callable[[str, int], list[dict]], pad: bool = True) -> list[dict]:
+        """Async variant of _generate_more."""
+        if self.llm and not self.native_async:
+            return await self._run_sync(self._generate_more, spec, topic, count, existing, mock, pad)
+        if not existing and pad:
+            return await self._agenerate_list(spec, topic, count, mock)
+        target = len(existing) + count
+        if not self.llm:
+            return self._mock_items(spec, topic, target, mock, "no_llm")[len(existing):]
+
+        with generation_span(spec.tool, topic=topic, count=count, existing=len(existing)):
+            items = await self._atop_up(spec, topic, existing, target, attempts=self.top_up_retries + 1)
+            return await self._run_sync(self._finish_more, spec, topic, existing, items, target, mock, pad)
+
+    async def _agenerate_batch(
+        self,
+        spec: ListToolSpec,
+        topics: list[str],
+        count: int,
+        mock: Callable[[str, int], list[dict]],
+        result_key: str,
+        max_concurrency: int,
+    ) -> list[dict]:
+        with generation_span(f"{spec.tool}_batch", topics=len(topics), count=count):
+            return await self._run_batch(spec, topics, count, mock, result_key, max_concurrency)
+
+    async def _run_batch(
+        self,
+        spec: ListToolSpec,
+        topics: list[str],
+        count: int,
+        mock: Callable[[str, int], list[dict]],
+        result_key: str,
+        max_concurrency: int,
+    ) -> list[dict]:
+        """
+        Runs many topics through one chain with abatch/batch. Every topic gets its own result entry,
+        either {"topic", result_key} or {"topic", "error"}, so one bad topic doesn't fail the batch.
+        """
+        max_concurrency = max(1, min(max_concurrency, MAX_BATCH_CONCURRENCY))
+        print(f"Generating {spec.tool} batch for {len(topics)} topics (max_concurrency={max_concurrency})")
+        results: list[Optional[dict]] = [None] * len(topics)
+        pending: list[int] = []
+        for index, topic in enumerate(topics):
+            if not topic or not topic.strip():
+                results[index] = {"topic": topic, "error": "Topic must be a non-empty string."}
+            elif not self.llm:
+                results[index] = {"topic": topic, result_key: self._mock_items(spec, topic, count, mock, "no_llm")}
+            else:
+                cached = self._bank_sample(spec, topic, count)
+                if cached is None:
+                    cached = await self._alist_cache_get(spec, topic, count)
+                if cached is not None:
+                    results[index] = {"topic": topic, result_key: cached}
                 else:
-                    print("Warning: LLM response did not contain valid JSON or was not parsed correctly. Generating mock MCQs.")
-                    mcqs = self._generate_mock_mcqs(topic, num_questions)
-
-            except json.JSONDecodeError as e:
-                print(f"JSON decoding error: {e}. LLM response: {llm_response_content[:200]}...") #  Use typed variable
-                mcqs = self._generate_mock_mcqs(topic, num_questions)
+                    pending.append(index)
+
+        if not pending:
+            return results  # type: ignore
+
+        chain = self._chains[spec.tool]
+        inputs = [{spec.count_var: count, "topic": topics[index]} for index in pending]
+        config = {"max_concurrency": max_concurrency}
+        with timed_stage(f"{spec.tool}_batch", STAGE_LLM_CALL):
+            if self.native_async:
+                outputs = await chain.abatch(inputs, config=config, return_exceptions=True)
+            else:
+                outputs = await self._run_sync(lambda: chain.batch(inputs, config=config, return_exceptions=True))
+
+        # Completion-style LLMs send a sub-batch as one request, so one bad prompt surfaces as the same
+        # exception for every topic in it. Re-run those topics individually to isolate the failure.
+        shared_errors = [position for position, output in enumerate(outputs)
+                         if isinstance(output, Exception) and sum(other is output for other in outputs) > 1]
+        for position in shared_errors:
+            try:
+                outputs[position] = await self._ainvoke_prompt(spec.tool, inputs[position], spec.tool)
             except Exception as e:
-                print(f"An error occurred during LLM interaction: {e}. Generating mock MCQs.")
-                mcqs = self._generate_mock_mcqs(topic, num_questions)
+                outputs[position] = e
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def finish_topic(index: int, output: Any) -> None:
+            topic = topics[index]
+            if isinstance(output, Exception):
+                print(f"An error occurred during LLM interaction for topic '{topic}': {output}")
+                results[index] = {"topic": topic, "error": f"LLM call failed: {output}"}
+                return
+            items = self._merge_unique([], self._parse_list_response(output, spec), spec, count)
+            if len(items) < count:
+                async with semaphore:
+                    items = await self._atop_up(spec, topic, items, count)
+            if not items:
+                results[index] = {"topic": topic, "error": "LLM response could not be parsed."}
+                return
+            results[index] = {"topic": topic, result_key: await self._run_sync(self._finish_items, spec, topic, items, count, mock)}
+
+        await asyncio.gather(*(finish_topic(index, output) for index, output in zip(pending, outputs)))
+        return results  # type: ignore
+
+    async def _astream_prompt(self, name: str, prompt_vars: dict, tool: str) -> AsyncIterator[str]:
+        """
+        Streams text chunks for one registered prompt, recording time-to-first-token and the
+        total LLM call time.
+        """
+        with timed_stage(tool, STAGE_PROMPT_BUILD):
+            prompt_value = self._prompts[name].invoke(prompt_vars)
+        started = time.perf_counter()
+        first_chunk = True
+        try:
+            async with aclosing(self._astream_chain(self._completion, prompt_value)) as chunks:
+                async for chunk in chunks:
+                    if first_chunk:
+                        observe_stage(tool, STAGE_TTFT, time.perf_counter() - started)
+                        first_chunk = False
+                    yield chunk
+        finally:
+            observe_stage(tool, STAGE_LLM_CALL, time.perf_counter() - started)
+
+    async def _astream_chain(self, chain, chain_input: Any) -> AsyncIterator[str]:
+        """
+        Streams text chunks from a chain. Sync-only LLMs are streamed on the bounded thread pool
+        and their chunks handed back to the event loop through a queue.
+        """
+        if self.native_async:
+            async with aclosing(chain.astream(chain_input)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+            return
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop_requested = threading.Event()
+        done = object()
+
+        def produce() -> None:
+            try:
+                for chunk in chain.stream(chain_input):
+                    if stop_requested.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        producer = asyncio.ensure_future(self._run_sync(produce))
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is done:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            stop_requested.set()
+            await producer
+
+    async def _astream_items(self, spec: ListToolSpec, topic: str, count: int, mock: Callable[[str, int], list[dict]]) -> AsyncIterator[dict]:
+        """
+        Yields list items one by one as soon as each is complete in the LLM output stream.
+        If the stream fails or ends short, the missing items are topped up; items already sent
+        can't be taken back, so any slots still empty after that are filled with mock items.
+        """
+        print(f"Streaming {count} {spec.kind} on: {topic}")
+        if not self.llm:
+            for item in self._mock_items(spec, topic, count, mock, "no_llm"):
+                yield item
+            return
+
+        # current=False: a span must not stay attached to the context across this generator's yields.
+        with generation_span(spec.tool, current=False, topic=topic, count=count, stream=True):
+            cached = self._bank_sample(spec, topic, count)
+            if cached is None:
+                cached = await self._alist_cache_get(spec, topic, count)
+            if cached is not None:
+                for item in cached:
+                    yield item
+                return
+
+            parser = JSONArrayStreamParser()
+            produced: list[dict] = []
+            parse_seconds = 0.0
+            try:
+                async with aclosing(self._astream_prompt(spec.tool, {spec.count_var: count, "topic": topic}, spec.tool)) as chunks:
+                    async for chunk in chunks:
+                        parse_started = time.perf_counter()
+                        new_items = []
+                        for element in parser.feed(chunk):
+                            item = spec.validator(element)
+                            if item is None:
+                                continue
+                            merged = self._merge_unique(produced, [item], spec, count)
+                            if len(merged) > len(produced):
+                                produced = merged
+                                new_items.append(item)
+                        parse_seconds += time.perf_counter() - parse_started
+                        for item in new_items:
+                            yield item
+                        if len(produced) >= count:
+                            break
+            except Exception as e:
+                print(f"An error occurred during LLM streaming: {e}.")
+            observe_stage(spec.tool, STAGE_PARSE, parse_seconds)
+            if parser.malformed:
+                DROPPED_ITEMS.labels(spec.tool).inc(parser.malformed)
 
-        else:
-            mcqs = self._generate_mock_mcqs(topic, num_questions)
+            if len(produced) < count:
+                streamed = len(produced)
+                produced = await self._atop_up(spec, topic, produced, count)
+                for item in produced[streamed:]:
+                    yield item
 
-        return mcqs
+            for item in (await self._run_sync(self._finish_items, spec, topic, produced, count, mock))[len(produced):]:
+                yield item
+
+    # MCQs
+
+    def generate_mcqs(self, topic: str, num_questions: int = 5) -> list[dict]:
+        """
+        Generates multiple-choice questions for a given topic.
+        This function simulates interaction with an LLM or educhain's MCQ generator.
+        """
+        return self._generate_list(MCQ_TOOL, topic, num_questions, self._generate_mock_mcqs)
+
+    async def agenerate_mcqs(self, topic: str, num_questions: int = 5) -> list[dict]:
+        """
+        Async variant of generate_mcqs. Uses chain.ainvoke when the LLM has a native async path,
+        otherwise runs the sync generator on the bounded thread pool.
+        """
+        return await self._agenerate_list(MCQ_TOOL, topic, num_questions, self._generate_mock_mcqs)
+
+    async def agenerate_mcqs_batch(self, topics: list[str], num_questions: int = 5, max_concurrency: int = DEFAULT_BATCH_CONCURRENCY) -> list[dict]:
+        """
+        Generates MCQs for many topics in one pipeline, returning one result entry per topic.
+        """
+        return await self._agenerate_batch(MCQ_TOOL, topics, num_questions, self._generate_mock_mcqs, "mcqs", max_concurrency)
+
+    def astream_mcqs(self, topic: str, num_questions: int = 5) -> AsyncIterator[dict]:
+        """
+        Streams MCQs for a topic, yielding each question as soon as the LLM has finished it.
+        """
+        return self._astream_items(MCQ_TOOL, topic, num_questions, self._generate_mock_mcqs)
+
+    async def agenerate_more_mcqs(self, topic: str, num_questions: int, existing: list[dict], pad: bool = True) -> list[dict]:
+        """
+        Generates num_questions more MCQs on a topic, avoiding the existing ones. Returns only the new MCQs;
+        with pad=False, fewer when the LLM falls short rather than mock-filled ones.
+        """
+        return await self._agenerate_more(MCQ_TOOL, topic, num_questions, existing, self._generate_mock_mcqs, pad)
 
     def _generate_mock_mcqs(self, topic: str, num_questions: int) -> list[dict]:
         """Generates mock MCQs for demonstration purposes."""
@@ -82,48 +775,79 @@ class EduChainContentGenerator:
             })
         return mock_data
 
+    # Lesson plans
+
     def generate_lesson_plan(self, subject: str) -> dict:
         """
-        Generates a lesson plan for a given subject. 
-        Simulates interaction with an LLM or educhain's lesson plan generator. 
+        Generates a lesson plan for a given subject.
+        Simulates interaction with an LLM or educhain's lesson plan generator.
         """
         print(f"Generating lesson plan for: {subject}")
-        lesson_plan: dict = {} 
-        if self.llm:
-            prompt_template = ChatPromptTemplate.from_messages([
-                ("system", "You are an educational content generator, expert in creating structured lesson plans."),
-                ("user", "Generate a detailed lesson plan for teaching '{subject}'. Include sections like 'Objective', 'Materials', 'Introduction', 'Main Activities', 'Assessment', and 'Conclusion'. Provide it as a JSON object.")
-            ])
+        if not self.llm:
+            return self._mock_lesson_plan(subject, "no_llm")
 
-            chain = prompt_template | self.llm | StrOutputParser()
+        with generation_span("generate_lesson_plan", subject=subject):
+            cached = self._cache_get("generate_lesson_plan", subject, LESSON_PLAN_TEMPLATE_HASH)
+            if cached is not None:
+                return cached
 
             try:
-                llm_response_content: str = chain.invoke({"subject": subject}) 
-                
-                
-                if not isinstance(llm_response_content, str):
-                    raise TypeError("LLM response was not a string, cannot parse JSON.")
-
-                json_start = llm_response_content.find("{")
-                json_end = llm_response_content.rfind("}")
-
-                if json_start != -1 and json_end != -1 and json_end > json_start:
-                    json_string = llm_response_content[json_start : json_end + 1]
-                    lesson_plan = json.loads(json_string)
-                else:
-                    print("Warning: LLM response did not contain valid JSON or was not parsed correctly. Generating mock lesson plan.")
-                    lesson_plan = self._generate_mock_lesson_plan(subject)
-
-            except json.JSONDecodeError as e:
-                print(f"JSON decoding error: {e}. LLM response: {llm_response_content[:200]}...") # 
-                lesson_plan = self._generate_mock_lesson_plan(subject)
+                llm_response_content: str = self._invoke_prompt("generate_lesson_plan", {"subject": subject}, "generate_lesson_plan")
             except Exception as e:
                 print(f"An error occurred during LLM interaction: {e}. Generating mock lesson plan.")
-                lesson_plan = self._generate_mock_lesson_plan(subject)
-        else:
-            lesson_plan = self._generate_mock_lesson_plan(subject)
+                return self._mock_lesson_plan(subject, "llm_error")
 
-        return lesson_plan
+            parsed = self._parse_lesson_plan(llm_response_content)
+            if parsed is None:
+                return self._mock_lesson_plan(subject, "parse_failure")
+            self._cache_set("generate_lesson_plan", subject, LESSON_PLAN_TEMPLATE_HASH, parsed)
+            return parsed
+
+    async def agenerate_lesson_plan(self, subject: str) -> dict:
+        """
+        Async variant of generate_lesson_plan.
+        """
+        if self.llm and not self.native_async:
+            return await self._run_sync(self.generate_lesson_plan, subject)
+
+        print(f"Generating lesson plan for: {subject}")
+        if not self.llm:
+            return self._mock_lesson_plan(subject, "no_llm")
+
+        with generation_span("generate_lesson_plan", subject=subject):
+            cached = await self._acache_get("generate_lesson_plan", subject, LESSON_PLAN_TEMPLATE_HASH)
+            if cached is not None:
+                return cached
+
+            try:
+                llm_response_content: str = await self._ainvoke_prompt("generate_lesson_plan", {"subject": subject}, "generate_lesson_plan")
+            except Exception as e:
+                print(f"An error occurred during LLM interaction: {e}. Generating mock lesson plan.")
+                return self._mock_lesson_plan(subject, "llm_error")
+
+            parsed = self._parse_lesson_plan(llm_response_content)
+            if parsed is None:
+                return self._mock_lesson_plan(subject, "parse_failure")
+            await self._acache_set("generate_lesson_plan", subject, LESSON_PLAN_TEMPLATE_HASH, parsed)
+            return parsed
+
+    def _parse_lesson_plan(self, llm_response_content: str) -> Optional[dict]:
+        if not isinstance(llm_response_content, str):
+            print("LLM response was not a string, cannot parse JSON. Generating mock lesson plan.")
+            PARSE_FAILURES.labels("generate_lesson_plan").inc()
+            return None
+
+        with timed_stage("generate_lesson_plan", STAGE_PARSE):
+            result = parse_object(llm_response_content, validate_lesson_plan)
+        if not result.items:
+            PARSE_FAILURES.labels("generate_lesson_plan").inc()
+            print(f"Warning: LLM response did not contain a valid lesson plan. Generating mock lesson plan. LLM response: {llm_response_content[:200]}...")
+            return None
+        return result.items[0]
+
+    def _mock_lesson_plan(self, subject: str, reason: str) -> dict:
+        MOCK_FALLBACKS.labels("generate_lesson_plan", reason).inc()
+        return self._generate_mock_lesson_plan(subject)
 
     def _generate_mock_lesson_plan(self, subject: str) -> dict:
         """Generates a mock lesson plan for demonstration purposes."""
@@ -141,47 +865,38 @@ class EduChainContentGenerator:
             "conclusion": f"Summarize key takeaways and preview the next topic in {subject}."
         }
 
+    # Flashcards
+
     def generate_flashcards(self, topic: str, num_cards: int = 5) -> list[dict]:
         """
-        Generates flashcards for a given topic (Bonus Task). 
+        Generates flashcards for a given topic (Bonus Task).
         """
-        print(f"Generating {num_cards} flashcards on: {topic}")
-        flashcards: list[dict] = [] 
-        if self.llm:
-            prompt_template = ChatPromptTemplate.from_messages([
-                ("system", "You are an educational content generator. Create flashcards for learning."),
-                ("user", "Generate {num_cards} flashcards about '{topic}'. Each flashcard should have a 'front' (term/question) and a 'back' (definition/answer). Format the output as a JSON array of objects, each with 'front' and 'back' keys.")
-            ])
+        return self._generate_list(FLASHCARD_TOOL, topic, num_cards, self._generate_mock_flashcards)
 
-            chain = prompt_template | self.llm | StrOutputParser()
+    async def agenerate_flashcards(self, topic: str, num_cards: int = 5) -> list[dict]:
+        """
+        Async variant of generate_flashcards.
+        """
+        return await self._agenerate_list(FLASHCARD_TOOL, topic, num_cards, self._generate_mock_flashcards)
 
-            try:
-                llm_response_content: str = chain.invoke({"num_cards": num_cards, "topic": topic}) #  Type hint the response
-                
-                #  Ensure llm_response_content is a string before calling .find()
-                if not isinstance(llm_response_content, str):
-                    raise TypeError("LLM response was not a string, cannot parse JSON.")
-
-                json_start = llm_response_content.find("[")
-                json_end = llm_response_content.rfind("]")
-
-                if json_start != -1 and json_end != -1 and json_end > json_start:
-                    json_string = llm_response_content[json_start : json_end + 1]
-                    flashcards = json.loads(json_string)
-                else:
-                    print("Warning: LLM response did not contain valid JSON or was not parsed correctly. Generating mock flashcards.")
-                    flashcards = self._generate_mock_flashcards(topic, num_cards)
+    async def agenerate_flashcards_batch(self, topics: list[str], num_cards: int = 5, max_concurrency: int = DEFAULT_BATCH_CONCURRENCY) -> list[dict]:
+        """
+        Generates flashcards for many topics in one pipeline, returning one result entry per topic.
+        """
+        return await self._agenerate_batch(FLASHCARD_TOOL, topics, num_cards, self._generate_mock_flashcards, "flashcards", max_concurrency)
 
-            except json.JSONDecodeError as e:
-                print(f"JSON decoding error: {e}. LLM response: {llm_response_content[:200]}...") # 
-                flashcards = self._generate_mock_flashcards(topic, num_cards)
-            except Exception as e:
-                print(f"An error occurred during LLM interaction: {e}. Generating mock flashcards.")
-                flashcards = self._generate_mock_flashcards(topic, num_cards)
-        else:
-            flashcards = self._generate_mock_flashcards(topic, num_cards)
+    def astream_flashcards(self, topic: str, num_cards: int = 5) -> AsyncIterator[dict]:
+        """
+        Streams flashcards for a topic, yielding each card as soon as the LLM has finished it.
+        """
+        return self._astream_items(FLASHCARD_TOOL, topic, num_cards, self._generate_mock_flashcards)
 
-        return flashcards
+    async def agenerate_more_flashcards(self, topic: str, num_cards: int, existing: list[dict], pad: bool = True) -> list[dict]:
+        """
+        Generates num_cards more flashcards on a topic, avoiding the existing ones. Returns only the new cards;
+        with pad=False, fewer when the LLM falls short rather than mock-filled ones.
+        """
+        return await self._agenerate_more(FLASHCARD_TOOL, topic, num_cards, existing, self._generate_mock_flashcards, pad)
 
     def _generate_mock_flashcards(self, topic: str, num_cards: int) -> list[dict]:
         """Generates mock flashcards for demonstration purposes."""
@@ -198,7 +913,7 @@ if __name__ == "__main__":
     # To test with a real LLM, uncomment and configure one of the LLM options above.
     # edu_gen = EduChainContentGenerator(llm=Ollama(model="llama3"))
     # edu_gen = EduChainContentGenerator(llm=ChatOpenAI(model="gpt-3.5-turbo", api_key="YOUR_OPENAI_API_KEY"))
-    
+
     edu_gen = EduChainContentGenerator(llm=llm_model) #  Using mock generator if no LLM configured
 
     print("\n--- Testing MCQ Generation ---")
@@ -211,4 +926,4 @@ if __name__ == "__main__":
 
     print("\n--- Testing Flashcard Generation (Bonus) ---")
     flashcards = edu_gen.generate_flashcards("Linear Algebra Concepts", 2)
-    print(json.dumps(flashcards, indent=2))
\ No newline at end of file
+    print(json.dumps(flashcards, indent=2))
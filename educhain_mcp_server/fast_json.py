@@ -0,0 +1,48 @@
+import hashlib
+import json
+from typing import Any
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+try:  # orjson is optional; without it responses fall back to the stdlib encoder.
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Encodes content as compact UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that renders with orjson when available. Used for generated tool payloads."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class PrecomputedJSON:
+    """
+    A JSON document encoded once, served as the same bytes on every request with a strong
+    ETag, so clients that poll it get 304 Not Modified instead of the full body.
+    """
+
+    def __init__(self, content: Any, max_age_seconds: int = 300):
+        self.body = dumps(content)
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.headers = {"ETag": self.etag, "Cache-Control": f"public, max-age={max_age_seconds}"}
+
+    def not_modified(self, request: Request) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if not if_none_match:
+            return False
+        return if_none_match.strip() == "*" or self.etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+    def response(self, request: Request) -> Response:
+        if self.not_modified(request):
+            return Response(status_code=304, headers=self.headers)
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
@@ -0,0 +1,328 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Optional
+
+from admission import AdmissionController, AdmissionRejected
+from shared_state import SharedStateStore
+
+# Job states. Queued and running jobs are picked up again when the server restarts.
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+# Finished with fewer items than asked for: the LLM stopped producing new ones. Never padded with mock content.
+JOB_PARTIAL = "partial"
+UNFINISHED_STATES = (JOB_QUEUED, JOB_RUNNING)
+
+# Tools a job can run, mapped to the generator method that produces one further chunk.
+JOB_TOOLS = {
+    "generate_mcqs": "agenerate_more_mcqs",
+    "generate_flashcards": "agenerate_more_flashcards",
+}
+
+DEFAULT_CHUNK_SIZE = 10
+# Extra requests for the rest of a chunk the LLM returned short before the job stops as partial
+DEFAULT_CHUNK_RETRIES = 2
+MAX_JOB_ITEMS = 1000
+DEFAULT_JOB_WORKERS = 2
+MAX_RESULTS_PAGE = 100
+
+
+class JobStore:
+    """
+    SQLite persistence for generation jobs and the chunks of items they have produced.
+    Chunks are stored as they complete, so a restarted job continues where it stopped.
+    Calls block on SQLite, so JobManager runs them with asyncio.to_thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, tool TEXT NOT NULL, topic TEXT NOT NULL, total INTEGER NOT NULL,"
+            " chunk_size INTEGER NOT NULL, status TEXT NOT NULL, error TEXT,"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_chunks ("
+            " job_id TEXT NOT NULL, chunk_index INTEGER NOT NULL, items TEXT NOT NULL, item_count INTEGER NOT NULL,"
+            " PRIMARY KEY (job_id, chunk_index))"
+        )
+        self._conn.commit()
+
+    def create(self, tool: str, topic: str, total: int, chunk_size: int) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, tool, topic, total, chunk_size, status, error, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, NULL, ?, ?)",
+                (job_id, tool, topic, total, chunk_size, JOB_QUEUED, now, now),
+            )
+            self._conn.commit()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT j.id, j.tool, j.topic, j.total, j.chunk_size, j.status, j.error, j.created_at, j.updated_at,"
+                " COUNT(c.chunk_index), COALESCE(SUM(c.item_count), 0)"
+                " FROM jobs j LEFT JOIN job_chunks c ON c.job_id = j.id WHERE j.id = ? GROUP BY j.id",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("job_id", "tool", "topic", "total", "chunk_size", "status", "error", "created_at", "updated_at", "chunks_done", "items_done")
+        return dict(zip(keys, row))
+
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def unfinished(self) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id FROM jobs WHERE status IN ({', '.join('?' for _ in UNFINISHED_STATES)}) ORDER BY created_at",
+                UNFINISHED_STATES,
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def save_chunk(self, job_id: str, chunk_index: int, items: list[dict]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_chunks (job_id, chunk_index, items, item_count) VALUES (?, ?, ?, ?)",
+                (job_id, chunk_index, json.dumps(items), len(items)),
+            )
+            self._conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+            self._conn.commit()
+
+    def chunks(self, job_id: str) -> dict[int, list[dict]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_index, items FROM job_chunks WHERE job_id = ? ORDER BY chunk_index", (job_id,)
+            ).fetchall()
+        return {chunk_index: json.loads(items) for chunk_index, items in rows}
+
+    def items(self, job_id: str, offset: int, limit: int) -> list[dict]:
+        """Returns up to limit items starting at offset, in generation order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT items, item_count FROM job_chunks WHERE job_id = ? ORDER BY chunk_index", (job_id,)
+            ).fetchall()
+        page: list[dict] = []
+        position = 0
+        for items, item_count in rows:
+            if position + item_count > offset:
+                chunk = json.loads(items)
+                page.extend(chunk[max(0, offset - position):])
+                if len(page) >= limit:
+                    break
+            position += item_count
+        return page[:limit]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobManager:
+    """
+    Runs bulk generation jobs on a pool of background workers.
+
+    A job asks for `total` MCQs or flashcards on one topic and is generated in chunks of
+    `chunk_size`. Each chunk passes the items generated so far to the generator so they aren't
+    repeated, which is why a job's chunks run in order; the worker pool runs jobs in parallel.
+    Every finished chunk is persisted, so jobs resume after a restart without regenerating
+    completed chunks. When an AdmissionController is given, each chunk takes a generation slot
+    like any interactive request, so bulk jobs can't starve the tool endpoints.
+
+    Jobs never contain mock content. A chunk the LLM returns short is asked for again, up to
+    `chunk_retries` times; if it is still short, the job stops with status "partial" and reports
+    the shortfall (or "failed", if it has no items at all).
+
+    When several server processes share the job database, pass their SharedStateStore: a job
+    then runs under a cross-process lock, so jobs resumed by every worker at startup run once,
+    and a cancellation made through any worker stops the job wherever it runs.
+    """
+
+    def __init__(self, store: JobStore, generator: Any, workers: int = DEFAULT_JOB_WORKERS,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, admission: Optional[AdmissionController] = None,
+                 shared: Optional[SharedStateStore] = None, chunk_retries: int = DEFAULT_CHUNK_RETRIES):
+        self.store = store
+        self.generator = generator
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.admission = admission
+        self.shared = shared
+        self.chunk_retries = chunk_retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._cancelled: set[str] = set()
+
+    def start(self) -> None:
+        """Starts the workers and re-queues jobs that were unfinished when the server last stopped."""
+        self._queue = asyncio.Queue()
+        for job_id in self.store.unfinished():
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        if self._queue.qsize():
+            logging.info(f"Resuming {self._queue.qsize()} unfinished generation job(s)")
+
+    async def stop(self) -> None:
+        """Stops the workers. Running jobs keep their state and resume on the next start()."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, tool: str, topic: str, total: int) -> dict:
+        if tool not in JOB_TOOLS:
+            raise ValueError(f"Unsupported job tool '{tool}' (expected one of: {', '.join(JOB_TOOLS)})")
+        job_id = await asyncio.to_thread(self.store.create, tool, topic, total, self.chunk_size)
+        if self._queue is not None:
+            self._queue.put_nowait(job_id)
+        return await self.status(job_id)  # type: ignore
+
+    async def cancel(self, job_id: str) -> Optional[dict]:
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None:
+            return None
+        if job["status"] in UNFINISHED_STATES:
+            self._cancelled.add(job_id)
+            await asyncio.to_thread(self.store.set_status, job_id, JOB_CANCELLED)
+        return await self.status(job_id)
+
+    async def status(self, job_id: str) -> Optional[dict]:
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None:
+            return None
+        job["chunks_total"] = -(-job["total"] // job["chunk_size"])
+        job["progress"] = round(job["items_done"] / job["total"], 4) if job["total"] else 1.0
+        job["shortfall"] = job["total"] - job["items_done"] if job["status"] == JOB_PARTIAL else 0
+        return job
+
+    async def results(self, job_id: str, offset: int = 0, limit: int = MAX_RESULTS_PAGE) -> Optional[dict]:
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None:
+            return None
+        items = await asyncio.to_thread(self.store.items, job_id, offset, min(limit, MAX_RESULTS_PAGE))
+        next_offset = offset + len(items)
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "offset": offset,
+            "items": items,
+            "next_offset": next_offset if next_offset < job["items_done"] or job["status"] in UNFINISHED_STATES else None,
+            "items_done": job["items_done"],
+            "total": job["total"],
+        }
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Generation job {job_id} failed: {e}")
+                await asyncio.to_thread(self.store.set_status, job_id, JOB_FAILED, str(e))
+
+    async def _run(self, job_id: str) -> None:
+        if self.shared is None:
+            await self._run_job(job_id)
+            return
+        lock_key = f"job:{job_id}"
+        if not await self.shared.atry_lock(lock_key):
+            logging.info(f"Generation job {job_id} is already running in another worker")
+            return
+        try:
+            await self._run_job(job_id)
+        finally:
+            await self.shared.aunlock(lock_key)
+
+    async def _is_cancelled(self, job_id: str) -> bool:
+        if job_id in self._cancelled:
+            self._cancelled.discard(job_id)
+            return True
+        if self.shared is None:
+            return False
+        # Another worker may have cancelled it; the job database is the source of truth.
+        job = await asyncio.to_thread(self.store.get, job_id)
+        return job is None or job["status"] == JOB_CANCELLED
+
+    async def _run_job(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or job["status"] not in UNFINISHED_STATES:
+            self._cancelled.discard(job_id)
+            return
+        await asyncio.to_thread(self.store.set_status, job_id, JOB_RUNNING)
+        generate_more = getattr(self.generator, JOB_TOOLS[job["tool"]])
+        done = await asyncio.to_thread(self.store.chunks, job_id)
+        items = [item for chunk_index in sorted(done) for item in done[chunk_index]]
+        chunk_index = len(done)
+        logging.info(f"Running generation job {job_id}: {job['total']} {job['tool']} items on '{job['topic']}' ({len(items)} already done)")
+
+        while len(items) < job["total"]:
+            if await self._is_cancelled(job_id):
+                return
+            if self.shared is not None:
+                await self.shared.aextend_lock(f"job:{job_id}")
+            count = min(job["chunk_size"], job["total"] - len(items))
+            chunk: list[dict] = []
+            for _ in range(self.chunk_retries + 1):
+                chunk += await self._generate_chunk(generate_more, job["topic"], count - len(chunk), items + chunk)
+                if len(chunk) >= count:
+                    break
+            chunk = chunk[:count]
+            if chunk:
+                await asyncio.to_thread(self.store.save_chunk, job_id, chunk_index, chunk)
+                items.extend(chunk)
+                chunk_index += 1
+            if len(chunk) < count:
+                await self._stop_short(job_id, job, len(items))
+                return
+
+        if await self._is_cancelled(job_id):
+            return
+        await asyncio.to_thread(self.store.set_status, job_id, JOB_COMPLETED)
+
+    async def _stop_short(self, job_id: str, job: dict, items_done: int) -> None:
+        if await self._is_cancelled(job_id):
+            return
+        if not items_done:
+            raise RuntimeError("The LLM returned no usable items")
+        error = f"The LLM stopped producing new items: generated {items_done} of {job['total']}"
+        logging.warning(f"Generation job {job_id}: {error}")
+        await asyncio.to_thread(self.store.set_status, job_id, JOB_PARTIAL, error)
+
+    async def _generate_chunk(self, generate_more, topic: str, count: int, existing: list[dict]) -> list[dict]:
+        if self.admission is None:
+            return await generate_more(topic, count, existing, pad=False)
+        while True:
+            try:
+                async with self.admission.slot(count):
+                    return await generate_more(topic, count, existing, pad=False)
+            except AdmissionRejected as e:
+                # The server is saturated by interactive traffic; back off and retry the chunk.
+                await asyncio.sleep(e.retry_after)
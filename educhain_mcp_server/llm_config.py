@@ -0,0 +1,20 @@
+import json
+from typing import Optional
+
+# Kept apart from llm_pool so deciding whether any LLM is configured doesn't import LangChain.
+
+
+def load_backend_config(path: str) -> Optional[dict]:
+    """
+    Reads the LLM backend config (llm_backends.json). Returns None if the file is missing,
+    disabled, or lists no backends, in which case the server keeps using mock content.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    if not config.get("enabled", True) or not config.get("backends"):
+        return None
+    return config
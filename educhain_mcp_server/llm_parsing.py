@@ -0,0 +1,278 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Optional
+
+# A validator returns the (possibly normalized) item, or None if it doesn't match the schema.
+Validator = Callable[[Any], Optional[dict]]
+
+OPTION_KEYS = ("A", "B", "C", "D")
+_DECODER = json.JSONDecoder()
+_STRUCTURAL = re.compile(r'[\[\]{}"]')
+# Rest of a JSON string after its opening quote, up to and including the closing quote.
+_STRING_TAIL = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+
+LESSON_PLAN_SECTIONS = ("objective", "materials", "introduction", "main_activities", "assessment", "conclusion")
+
+
+class JSONArrayStreamParser:
+    """
+    Incrementally extracts the elements of a JSON array from streamed LLM output.
+    Text before the opening '[' (prose, markdown fences) is skipped, and each object in the
+    array is decoded as soon as its closing brace arrives, so callers can forward items while
+    the model is still generating. Only the text of the element currently being built is kept.
+    """
+
+    def __init__(self):
+        self.malformed = 0
+        self.complete = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._elements_in_array = 0
+        self._pending: list[str] = []
+
+    def feed(self, chunk: str) -> list[Any]:
+        """Consumes the next chunk of text and returns the elements completed by it."""
+        completed: list[Any] = []
+        element_start = 0 if self._pending else -1
+        depth = self._depth
+        in_string = self._in_string
+        escape = self._escape
+        position = 0
+        length = len(chunk)
+
+        # Jump between structural characters with C-level regex scans instead of visiting every character.
+        while position < length:
+            if in_string:
+                if escape:
+                    escape = False
+                    position += 1
+                    continue
+                match = _STRING_TAIL.match(chunk, position)
+                if match is None:
+                    # The string continues into the next chunk; remember a dangling backslash.
+                    tail = chunk[position:]
+                    escape = (len(tail) - len(tail.rstrip("\\"))) % 2 == 1
+                    break
+                in_string = False
+                position = match.end()
+                continue
+
+            if depth == 0:
+                # Outside any array: only an opening bracket matters, quotes in prose are ignored.
+                index = chunk.find("[", position)
+                if index == -1:
+                    break
+                depth = 1
+                self._elements_in_array = 0
+                position = index + 1
+                continue
+
+            match = _STRUCTURAL.search(chunk, position)
+            if match is None:
+                break
+            index = match.start()
+            char = chunk[index]
+            position = index + 1
+            if char == '"':
+                in_string = True
+            elif char == "{" or char == "[":
+                if depth == 1:
+                    # Fast path: decode a whole element in C when it is complete and well-formed.
+                    try:
+                        value, end = _DECODER.raw_decode(chunk, index)
+                    except json.JSONDecodeError:
+                        element_start = index
+                    else:
+                        completed.append(value)
+                        self._elements_in_array += 1
+                        position = end
+                        continue
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 1 and element_start != -1:
+                    self._pending.append(chunk[element_start : index + 1])
+                    self._decode_pending(completed)
+                    self._elements_in_array += 1
+                    element_start = -1
+                elif depth == 0:
+                    if self._elements_in_array:
+                        self.complete = True
+                    self._pending = []
+                    element_start = -1
+
+        if element_start != -1:
+            self._pending.append(chunk[element_start:])
+
+        self._depth = depth
+        self._in_string = in_string
+        self._escape = escape
+        return completed
+
+    def _decode_pending(self, completed: list[Any]) -> None:
+        text = "".join(self._pending)
+        self._pending = []
+        try:
+            completed.append(json.loads(text))
+        except json.JSONDecodeError:
+            self.malformed += 1
+
+
+@dataclass
+class ParseResult:
+    """Outcome of parsing one LLM response: the valid items plus what had to be dropped."""
+    items: list = field(default_factory=list)
+    malformed: int = 0
+    invalid: int = 0
+    complete: bool = False
+
+    @property
+    def dropped(self) -> int:
+        return self.malformed + self.invalid
+
+    @property
+    def salvaged(self) -> int:
+        """Valid items recovered from a response that was truncated or contained bad items."""
+        return len(self.items) if (self.dropped or not self.complete) else 0
+
+
+def parse_items(text: str, validator: Validator) -> ParseResult:
+    """
+    Scans an LLM response once and returns every array element that decodes and validates.
+    Works on fenced, prose-wrapped and truncated output; one malformed item no longer
+    discards the others.
+    """
+    parser = JSONArrayStreamParser()
+    result = ParseResult()
+    for element in parser.feed(text):
+        item = validator(element)
+        if item is None:
+            result.invalid += 1
+        else:
+            result.items.append(item)
+    result.malformed = parser.malformed
+    result.complete = parser.complete
+    return result
+
+
+def _iter_object_spans(text: str) -> Iterator[tuple[int, int]]:
+    """Yields (start, end) spans of balanced top-level JSON objects in text."""
+    depth = 0
+    start = -1
+    in_string = False
+    escape = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"' and depth:
+            in_string = True
+        elif char == "{":
+            if depth == 0:
+                start = index
+            depth += 1
+        elif char == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                yield start, index + 1
+
+
+def parse_object(text: str, validator: Validator) -> ParseResult:
+    """
+    Returns the first balanced top-level JSON object in an LLM response that decodes and validates.
+    """
+    result = ParseResult()
+    for start, end in _iter_object_spans(text):
+        try:
+            candidate = json.loads(text[start:end])
+        except json.JSONDecodeError:
+            result.malformed += 1
+            continue
+        item = validator(candidate)
+        if item is None:
+            result.invalid += 1
+            continue
+        result.items.append(item)
+        result.complete = True
+        break
+    return result
+
+
+def _non_empty_str(value: Any) -> bool:
+    return isinstance(value, str) and bool(value.strip())
+
+
+def _number_as_str(value: Any) -> Any:
+    """Numeric answers and options (e.g. {"A": 3}) are kept as their text; other values pass through."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return value
+
+
+def validate_mcq(item: Any) -> Optional[dict]:
+    """
+    Checks an MCQ against the expected schema. Options given as a list are keyed A-D, numeric
+    options and answers become strings, and a correct answer given as "b", "B) ..." or the
+    option text is normalized to its letter.
+    """
+    if not isinstance(item, dict) or not _non_empty_str(item.get("question")):
+        return None
+
+    options = item.get("options")
+    if isinstance(options, list) and len(options) == len(OPTION_KEYS):
+        options = dict(zip(OPTION_KEYS, options))
+    if isinstance(options, dict):
+        options = {str(key).strip().upper(): _number_as_str(value) for key, value in options.items()}
+    if not isinstance(options, dict) or set(options) != set(OPTION_KEYS):
+        return None
+    if not all(_non_empty_str(value) for value in options.values()):
+        return None
+
+    answer = _number_as_str(item.get("correct_answer"))
+    if not _non_empty_str(answer):
+        return None
+    answer = answer.strip()
+    letter = answer[0].upper()
+    if letter in options and (len(answer) == 1 or answer[1] in ").: "):
+        answer = letter
+    else:
+        matching = [key for key, value in options.items() if value.strip() == answer]
+        if not matching:
+            return None
+        answer = matching[0]
+
+    return {"question": item["question"], "options": options, "correct_answer": answer}
+
+
+def validate_flashcard(item: Any) -> Optional[dict]:
+    """Checks a flashcard has non-empty 'front' and 'back' strings."""
+    if not isinstance(item, dict):
+        return None
+    if not _non_empty_str(item.get("front")) or not _non_empty_str(item.get("back")):
+        return None
+    return {"front": item["front"], "back": item["back"]}
+
+
+def validate_lesson_plan(item: Any) -> Optional[dict]:
+    """
+    Checks a lesson plan is an object with at least one recognizable section
+    (section names are matched case-insensitively, spaces and underscores alike).
+    A plan wrapped in a single outer key such as {"lesson_plan": {...}} is unwrapped.
+    """
+    if not isinstance(item, dict) or not item:
+        return None
+    if len(item) == 1:
+        inner = next(iter(item.values()))
+        if isinstance(inner, dict):
+            return validate_lesson_plan(inner)
+    sections = {str(key).strip().lower().replace(" ", "_") for key in item}
+    if not sections.intersection(LESSON_PLAN_SECTIONS):
+        return None
+    return item
@@ -0,0 +1,501 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from langchain_core.runnables import Runnable
+
+# Message types produced by ChatPromptTemplate, mapped to chat API roles.
+_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+class PoolExhaustedError(RuntimeError):
+    """Raised when no backend frees up a slot within the pool's acquire timeout."""
+
+
+def _to_messages(prompt: Any) -> list[dict]:
+    """Converts a prompt value, message list or plain string into chat API messages."""
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    messages = prompt.to_messages() if hasattr(prompt, "to_messages") else prompt
+    return [{"role": _ROLES.get(message.type, "user"), "content": message.content} for message in messages]
+
+
+class LLMBackend:
+    """
+    One model endpoint in the pool. Subclasses implement the calls; the base class keeps the
+    load and health bookkeeping the pool routes on.
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 4):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.latency_ewma: Optional[float] = None
+        self.calls = 0
+        self.failures = 0
+
+    def complete(self, messages: list[dict]) -> str:
+        raise NotImplementedError
+
+    async def acomplete(self, messages: list[dict]) -> str:
+        raise NotImplementedError
+
+    def stream(self, messages: list[dict]) -> Iterator[str]:
+        yield self.complete(messages)
+
+    async def astream(self, messages: list[dict]) -> AsyncIterator[str]:
+        yield await self.acomplete(messages)
+
+    def health_check(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "outstanding": self.outstanding,
+            "max_concurrency": self.max_concurrency,
+            "calls": self.calls,
+            "failures": self.failures,
+            "ejected": self.ejected_until > time.monotonic(),
+            "latency_ewma_seconds": round(self.latency_ewma, 4) if self.latency_ewma is not None else None,
+        }
+
+
+class OllamaBackend(LLMBackend):
+    """
+    Ollama server backend. The sync and async clients each hold one httpx connection pool,
+    so keep-alive connections are reused across requests.
+    """
+
+    def __init__(self, name: str, model: str, base_url: str = "http://127.0.0.1:11434", max_concurrency: int = 4,
+                 timeout_seconds: float = 120.0, keep_alive: Optional[str] = "10m", options: Optional[dict] = None):
+        super().__init__(name, max_concurrency)
+        import ollama
+
+        self.model = model
+        self.base_url = base_url
+        self.keep_alive = keep_alive
+        self.options = options
+        self._timeout = timeout_seconds
+        self._client = ollama.Client(host=base_url, timeout=timeout_seconds)
+        self._async_client: Optional[Any] = None
+
+    def _aclient(self):
+        if self._async_client is None:
+            import ollama
+
+            self._async_client = ollama.AsyncClient(host=self.base_url, timeout=self._timeout)
+        return self._async_client
+
+    def complete(self, messages: list[dict]) -> str:
+        response = self._client.chat(model=self.model, messages=messages, options=self.options, keep_alive=self.keep_alive)
+        return response.message.content or ""
+
+    async def acomplete(self, messages: list[dict]) -> str:
+        response = await self._aclient().chat(model=self.model, messages=messages, options=self.options, keep_alive=self.keep_alive)
+        return response.message.content or ""
+
+    def stream(self, messages: list[dict]) -> Iterator[str]:
+        for part in self._client.chat(model=self.model, messages=messages, options=self.options, keep_alive=self.keep_alive, stream=True):
+            if part.message.content:
+                yield part.message.content
+
+    async def astream(self, messages: list[dict]) -> AsyncIterator[str]:
+        parts = await self._aclient().chat(model=self.model, messages=messages, options=self.options, keep_alive=self.keep_alive, stream=True)
+        async for part in parts:
+            if part.message.content:
+                yield part.message.content
+
+    def health_check(self) -> bool:
+        self._client.list()
+        return True
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    OpenAI (or OpenAI-compatible, e.g. vLLM) chat completions backend with pooled HTTP connections.
+    """
+
+    def __init__(self, name: str, model: str, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 max_concurrency: int = 8, timeout_seconds: float = 120.0):
+        super().__init__(name, max_concurrency)
+        import openai
+
+        self.model = model
+        self._client = openai.OpenAI(base_url=base_url, api_key=api_key, timeout=timeout_seconds, max_retries=0)
+        self._async_client = openai.AsyncOpenAI(base_url=base_url, api_key=api_key, timeout=timeout_seconds, max_retries=0)
+
+    def complete(self, messages: list[dict]) -> str:
+        response = self._client.chat.completions.create(model=self.model, messages=messages)
+        return response.choices[0].message.content or ""
+
+    async def acomplete(self, messages: list[dict]) -> str:
+        response = await self._async_client.chat.completions.create(model=self.model, messages=messages)
+        return response.choices[0].message.content or ""
+
+    def stream(self, messages: list[dict]) -> Iterator[str]:
+        for chunk in self._client.chat.completions.create(model=self.model, messages=messages, stream=True):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def astream(self, messages: list[dict]) -> AsyncIterator[str]:
+        async for chunk in await self._async_client.chat.completions.create(model=self.model, messages=messages, stream=True):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def health_check(self) -> bool:
+        self._client.models.list()
+        return True
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class StubBackend(LLMBackend):
+    """
+    Local stand-in backend that returns a canned response after a configurable delay.
+    Used to exercise routing, ejection and load behaviour without a model server.
+    `responses` maps a phrase to the reply for prompts containing it (e.g. "flashcards" to a
+    flashcard array), so one stub can serve every tool; other prompts get `response`.
+    """
+
+    def __init__(self, name: str, response: str = "[]", delay_seconds: float = 0.0, max_concurrency: int = 4,
+                 failure_rate: float = 0.0, chunk_size: int = 64, responses: Optional[dict[str, str]] = None):
+        super().__init__(name, max_concurrency)
+        self.response = response
+        self.responses = {phrase.lower(): reply for phrase, reply in (responses or {}).items()}
+        self.delay_seconds = delay_seconds
+        self.failure_rate = failure_rate
+        self.chunk_size = chunk_size
+        self.healthy = True
+
+    def _maybe_fail(self) -> None:
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise RuntimeError(f"Stub backend '{self.name}' failed")
+
+    def _reply(self, messages: list[dict]) -> str:
+        if self.responses and messages:
+            prompt = messages[-1]["content"].lower()
+            for phrase, reply in self.responses.items():
+                if phrase in prompt:
+                    return reply
+        return self.response
+
+    def _chunks(self, messages: list[dict]) -> list[str]:
+        reply = self._reply(messages)
+        return [reply[i : i + self.chunk_size] for i in range(0, len(reply), self.chunk_size)] or [""]
+
+    def complete(self, messages: list[dict]) -> str:
+        time.sleep(self.delay_seconds)
+        self._maybe_fail()
+        return self._reply(messages)
+
+    async def acomplete(self, messages: list[dict]) -> str:
+        await asyncio.sleep(self.delay_seconds)
+        self._maybe_fail()
+        return self._reply(messages)
+
+    def stream(self, messages: list[dict]) -> Iterator[str]:
+        chunks = self._chunks(messages)
+        for chunk in chunks:
+            time.sleep(self.delay_seconds / len(chunks))
+            self._maybe_fail()
+            yield chunk
+
+    async def astream(self, messages: list[dict]) -> AsyncIterator[str]:
+        chunks = self._chunks(messages)
+        for chunk in chunks:
+            await asyncio.sleep(self.delay_seconds / len(chunks))
+            self._maybe_fail()
+            yield chunk
+
+    def health_check(self) -> bool:
+        return self.healthy
+
+
+BACKEND_TYPES = {
+    "ollama": OllamaBackend,
+    "openai": OpenAICompatibleBackend,
+    "stub": StubBackend,
+}
+
+
+class LLMBackendPool(Runnable):
+    """
+    Spreads LLM calls over several model endpoints using least-outstanding-requests routing.
+    Each backend has its own concurrency limit; backends that fail or answer too slowly
+    `eject_after_failures` times in a row are taken out of rotation for `eject_seconds`,
+    and a background health check brings them back once they respond again.
+
+    The pool is a LangChain Runnable, so it drops into `prompt | llm | StrOutputParser()`
+    wherever a single model would.
+    """
+
+    def __init__(self, backends: list[LLMBackend], eject_after_failures: int = 3, eject_seconds: float = 30.0,
+                 slow_call_seconds: float = 60.0, health_check_interval_seconds: float = 15.0,
+                 acquire_timeout_seconds: float = 30.0, max_attempts: int = 2):
+        if not backends:
+            raise ValueError("LLMBackendPool needs at least one backend.")
+        self.backends = backends
+        self.eject_after_failures = eject_after_failures
+        self.eject_seconds = eject_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.health_check_interval_seconds = health_check_interval_seconds
+        self.acquire_timeout_seconds = acquire_timeout_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        # Async callers waiting for a slot. Slots are freed from worker threads as well as event
+        # loops, so each waiter parks on a future that _release resolves thread-safely.
+        self._async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._stop_health_checks = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+
+    # Routing
+
+    def _try_acquire(self, exclude: tuple = ()) -> Optional[LLMBackend]:
+        """Reserves a slot on the least loaded available backend, or returns None if all are full."""
+        now = time.monotonic()
+        candidates = [backend for backend in self.backends if backend not in exclude] or list(self.backends)
+        healthy = [backend for backend in candidates if backend.ejected_until <= now]
+        # Fail open: if every backend is ejected, keep serving from them rather than refusing all traffic.
+        available = [backend for backend in (healthy or candidates) if backend.outstanding < backend.max_concurrency]
+        if not available:
+            return None
+        chosen = min(available, key=lambda backend: (backend.outstanding / backend.max_concurrency, backend.latency_ewma or 0.0))
+        chosen.outstanding += 1
+        return chosen
+
+    def _acquire(self, exclude: tuple = ()) -> LLMBackend:
+        deadline = time.monotonic() + self.acquire_timeout_seconds
+        with self._slot_freed:
+            while True:
+                backend = self._try_acquire(exclude)
+                if backend is not None:
+                    return backend
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhaustedError("All LLM backends are at their concurrency limit.")
+                self._slot_freed.wait(remaining)
+
+    async def _aacquire(self, exclude: tuple = ()) -> LLMBackend:
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + self.acquire_timeout_seconds
+        while True:
+            with self._lock:
+                backend = self._try_acquire(exclude)
+                if backend is not None:
+                    return backend
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhaustedError("All LLM backends are at their concurrency limit.")
+                waiter = (loop, loop.create_future())
+                self._async_waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter[1], remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+
+    @staticmethod
+    def _wake(future: asyncio.Future) -> None:
+        if not future.done():
+            future.set_result(None)
+
+    def _release(self, backend: LLMBackend, started: float, error: Optional[BaseException], abandoned: bool = False) -> None:
+        """
+        Frees the backend's slot and records the call's outcome. An abandoned call (cancelled
+        by its caller) only frees the slot: it says nothing about the backend's health or speed.
+        """
+        elapsed = time.monotonic() - started
+        with self._slot_freed:
+            backend.outstanding -= 1
+            # Every async waiter retries: the freed backend may be excluded for some of them.
+            waiters, self._async_waiters = self._async_waiters, []
+            for loop, future in waiters:
+                try:
+                    loop.call_soon_threadsafe(self._wake, future)
+                except RuntimeError:
+                    pass  # that waiter's event loop has closed
+            self._slot_freed.notify()
+            if abandoned:
+                return
+            backend.calls += 1
+            backend.latency_ewma = elapsed if backend.latency_ewma is None else 0.8 * backend.latency_ewma + 0.2 * elapsed
+            if error is not None or elapsed > self.slow_call_seconds:
+                if error is not None:
+                    backend.failures += 1
+                backend.consecutive_failures += 1
+                if backend.consecutive_failures >= self.eject_after_failures:
+                    backend.ejected_until = time.monotonic() + self.eject_seconds
+                    logging.warning(f"Ejecting LLM backend '{backend.name}' for {self.eject_seconds}s after {backend.consecutive_failures} failed or slow calls")
+            else:
+                backend.consecutive_failures = 0
+
+    # Runnable interface
+
+    def invoke(self, input: Any, config: Optional[dict] = None, **kwargs: Any) -> str:
+        messages = _to_messages(input)
+        tried: tuple = ()
+        for attempt in range(self.max_attempts):
+            backend = self._acquire(tried)
+            started = time.monotonic()
+            error: Optional[BaseException] = None
+            abandoned = True
+            try:
+                result = backend.complete(messages)
+                abandoned = False
+                return result
+            except Exception as e:
+                error, abandoned = e, False
+                tried += (backend,)
+                if attempt + 1 >= self.max_attempts:
+                    raise
+                logging.warning(f"LLM backend '{backend.name}' failed ({e}); retrying on another backend")
+            finally:
+                # Also runs when the caller is cancelled mid-call, so the slot is never leaked.
+                self._release(backend, started, error, abandoned)
+        raise PoolExhaustedError("No LLM backend attempts were made.")
+
+    async def ainvoke(self, input: Any, config: Optional[dict] = None, **kwargs: Any) -> str:
+        messages = _to_messages(input)
+        tried: tuple = ()
+        for attempt in range(self.max_attempts):
+            backend = await self._aacquire(tried)
+            started = time.monotonic()
+            error: Optional[BaseException] = None
+            abandoned = True
+            try:
+                result = await backend.acomplete(messages)
+                abandoned = False
+                return result
+            except Exception as e:
+                error, abandoned = e, False
+                tried += (backend,)
+                if attempt + 1 >= self.max_attempts:
+                    raise
+                logging.warning(f"LLM backend '{backend.name}' failed ({e}); retrying on another backend")
+            finally:
+                # Also runs when the caller is cancelled mid-call, so the slot is never leaked.
+                self._release(backend, started, error, abandoned)
+        raise PoolExhaustedError("No LLM backend attempts were made.")
+
+    def stream(self, input: Any, config: Optional[dict] = None, **kwargs: Any) -> Iterator[str]:
+        backend = self._acquire()
+        started = time.monotonic()
+        error: Optional[BaseException] = None
+        abandoned = False
+        try:
+            yield from backend.stream(_to_messages(input))
+        except Exception as e:
+            error = e
+            raise
+        except asyncio.CancelledError:
+            abandoned = True
+            raise
+        finally:
+            self._release(backend, started, error, abandoned)
+
+    async def astream(self, input: Any, config: Optional[dict] = None, **kwargs: Any) -> AsyncIterator[str]:
+        backend = await self._aacquire()
+        started = time.monotonic()
+        error: Optional[BaseException] = None
+        abandoned = False
+        try:
+            async for chunk in backend.astream(_to_messages(input)):
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        except asyncio.CancelledError:
+            abandoned = True
+            raise
+        finally:
+            self._release(backend, started, error, abandoned)
+
+    async def awarm_up(self, prompt: str) -> None:
+        """Sends one cheap request to every backend so each has its model loaded."""
+        messages = _to_messages(prompt)
+
+        async def warm(backend: LLMBackend) -> None:
+            try:
+                await backend.acomplete(messages)
+                logging.info(f"LLM backend '{backend.name}' warmed up")
+            except Exception as e:
+                logging.warning(f"Warm-up request to LLM backend '{backend.name}' failed: {e}")
+
+        await asyncio.gather(*(warm(backend) for backend in self.backends))
+
+    # Health checks
+
+    def run_health_checks(self) -> None:
+        """
+        Probes every backend once. Unreachable backends are (re-)ejected; ejected backends whose
+        ejection window has passed are returned to rotation once they answer.
+        """
+        for backend in self.backends:
+            try:
+                healthy = backend.health_check()
+            except Exception as e:
+                logging.warning(f"Health check failed for LLM backend '{backend.name}': {e}")
+                healthy = False
+            with self._lock:
+                if not healthy:
+                    backend.ejected_until = time.monotonic() + self.eject_seconds
+                elif backend.ejected_until and backend.ejected_until <= time.monotonic():
+                    logging.info(f"LLM backend '{backend.name}' passed its health check; returning it to rotation")
+                    backend.ejected_until = 0.0
+                    backend.consecutive_failures = 0
+
+    def start_health_checks(self) -> None:
+        if self._health_thread is not None or self.health_check_interval_seconds <= 0:
+            return
+
+        def loop() -> None:
+            while not self._stop_health_checks.wait(self.health_check_interval_seconds):
+                self.run_health_checks()
+
+        self._health_thread = threading.Thread(target=loop, name="llm-pool-health", daemon=True)
+        self._health_thread.start()
+
+    def close(self) -> None:
+        self._stop_health_checks.set()
+        for backend in self.backends:
+            backend.close()
+
+    def stats(self) -> list[dict]:
+        with self._lock:
+            return [backend.stats() for backend in self.backends]
+
+
+def build_backend(config: dict) -> LLMBackend:
+    settings = dict(config)
+    backend_type = settings.pop("type", "ollama")
+    if backend_type not in BACKEND_TYPES:
+        raise ValueError(f"Unknown LLM backend type '{backend_type}' (expected one of: {', '.join(BACKEND_TYPES)})")
+    return BACKEND_TYPES[backend_type](**settings)
+
+
+def build_backend_pool(config: dict) -> LLMBackendPool:
+    """Builds an LLMBackendPool from a backend config, as read by llm_config.load_backend_config."""
+    backends = [build_backend(backend_config) for backend_config in config["backends"]]
+    return LLMBackendPool(
+        backends,
+        eject_after_failures=config.get("eject_after_failures", 3),
+        eject_seconds=config.get("eject_seconds", 30.0),
+        slow_call_seconds=config.get("slow_call_seconds", 60.0),
+        health_check_interval_seconds=config.get("health_check_interval_seconds", 15.0),
+        acquire_timeout_seconds=config.get("acquire_timeout_seconds", 30.0),
+        max_attempts=config.get("max_attempts", 2),
+    )
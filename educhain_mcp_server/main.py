@@ -1,10 +1,31 @@
 from fastapi import FastAPI, Request, HTTPException, status
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
-from typing import List, Dict, Union
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+import asyncio
+import hashlib
 import json
 import logging
-from educhain_utils import EduChainContentGenerator # Our simulated educhain functions
+import os
+import time
+from educhain_utils import EduChainContentGenerator, FLASHCARD_TEMPLATE_HASH, LESSON_PLAN_TEMPLATE_HASH, MCQ_TEMPLATE_HASH # Our simulated educhain functions
+from admission import AdmissionController, AdmissionLease, AdmissionRejected, RateLimiter
+from request_coalescing import RequestCoalescer, coalescing_key
+from fast_json import FastJSONResponse, PrecomputedJSON, dumps
+from llm_config import load_backend_config
+from jobs import DEFAULT_CHUNK_RETRIES, DEFAULT_CHUNK_SIZE, DEFAULT_JOB_WORKERS, JOB_TOOLS, MAX_RESULTS_PAGE, JobManager, JobStore
+from mcp_protocol import INVALID_REQUEST, LESSON_PLAN_COST, PARSE_ERROR, McpDispatcher, error_response, is_request, tool_call_generations
+from mcp_registry import (
+    MCP_RESOURCES, MCP_TOOLS, GenerateFlashcardsBatchRequest, GenerateFlashcardsRequest,
+    GenerateMCQsBatchRequest, GenerateMCQsRequest, ResourceDefinition, SubmitJobRequest, ToolDefinition,
+)
+from observability import (
+    ADMISSION_REJECTIONS, COALESCED_REQUESTS, METRICS_CONTENT_TYPE,
+    STAGE_QUEUE_WAIT, STAGE_SERIALIZATION, observe_stage, render_metrics, timed_stage,
+)
+from question_bank import DEFAULT_MIN_BANK_MULTIPLE, QuestionBank
+from response_cache import LRUTTLCache, ResponseCache, SQLiteCache
+from shared_state import SharedStateStore
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -14,101 +35,292 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# LLM backend pool, configured by llm_backends.json next to claude_desktop_config.json
+# (or the file named by EDUCHAIN_BACKENDS_CONFIG). Without enabled backends the server serves mock content.
+BACKENDS_CONFIG_PATH = os.getenv("EDUCHAIN_BACKENDS_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_backends.json"))
+
+def load_llm_pool(path: str):
+    """
+    Builds the backend pool if the config enables any backends. llm_pool (and LangChain with it)
+    is only imported in that case, so a mock-only server starts without the LLM stack.
+    """
+    config = load_backend_config(path)
+    if config is None:
+        return None
+    from llm_pool import build_backend_pool
+    return build_backend_pool(config)
+
+llm_pool = load_llm_pool(BACKENDS_CONFIG_PATH)
+
+# Response cache: in-process LRU plus an optional SQLite tier (set EDUCHAIN_CACHE_DB to enable it)
+response_cache = ResponseCache(
+    memory=LRUTTLCache(
+        max_entries=int(os.getenv("EDUCHAIN_CACHE_MAX_ENTRIES", "1024")),
+        max_bytes=int(os.getenv("EDUCHAIN_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        ttl_seconds=float(os.getenv("EDUCHAIN_CACHE_TTL_SECONDS", "3600")),
+    ),
+    disk=SQLiteCache(os.environ["EDUCHAIN_CACHE_DB"]) if os.getenv("EDUCHAIN_CACHE_DB") else None,
+)
+
+# Server state (question bank, jobs) lives in EDUCHAIN_STATE_DIR, outside the source tree. run_server.sh
+# points it at a directory all workers share.
+STATE_DIR = os.getenv("EDUCHAIN_STATE_DIR", os.path.join(os.path.expanduser("~"), ".educhain_mcp_server"))
+os.makedirs(STATE_DIR, exist_ok=True)
+
+# Question bank: generated MCQs/flashcards are banked per topic (near-duplicates removed) and served as
+# random, non-repeating subsets once a topic has enough. While it is on, MCQs and flashcards bypass the
+# response cache, which would serve everyone the same items. Set EDUCHAIN_QUESTION_BANK=0 to disable it.
+question_bank = QuestionBank(
+    path=os.getenv("EDUCHAIN_QUESTION_BANK_DB", os.path.join(STATE_DIR, "educhain_question_bank.db")),
+    min_bank_multiple=int(os.getenv("EDUCHAIN_QUESTION_BANK_MIN_MULTIPLE", str(DEFAULT_MIN_BANK_MULTIPLE))),
+) if os.getenv("EDUCHAIN_QUESTION_BANK", "1") == "1" else None
+
 # Initialize EduChain content generator
 # You can pass an LLM instance here if you've configured it in educhain_utils.py
 # edu_generator = EduChainContentGenerator(llm=...)
-edu_generator = EduChainContentGenerator() 
-
-class ToolDefinition(BaseModel):
-    """Schema for defining an MCP tool."""
-    name: str = Field(..., description="The unique name of the tool.")
-    description: str = Field(..., description="A brief description of what the tool does.")
-    parameters: Dict = Field(..., description="JSON schema for the tool's input parameters.")
-    endpoint: str = Field(..., description="The API endpoint to call this tool.")
-    method: str = Field("POST", description="The HTTP method for the tool's endpoint (e.g., GET, POST).")
-
-class ResourceDefinition(BaseModel):
-    """Schema for defining an MCP resource."""
-    name: str = Field(..., description="The unique name of the resource.")
-    description: str = Field(..., description="A brief description of the resource.")
-    endpoint: str = Field(..., description="The API endpoint to access this resource.")
-    method: str = Field("GET", description="The HTTP method for the resource's endpoint (e.g., GET, POST).")
-    parameters: Dict = Field(None, description="Optional JSON schema for resource query parameters.")  # type: ignore
+edu_generator = EduChainContentGenerator(llm=llm_pool, cache=response_cache, bank=question_bank)
+
+# Multi-worker mode (see run_server.sh): workers share generation locks, rate-limit buckets and job
+# ownership through the SQLite file named by EDUCHAIN_SHARED_STATE_DB, and generated results through
+# the response cache's EDUCHAIN_CACHE_DB tier. Admission limits stay per worker.
+shared_state = SharedStateStore(os.environ["EDUCHAIN_SHARED_STATE_DB"]) if os.getenv("EDUCHAIN_SHARED_STATE_DB") else None
+
+# Concurrent identical requests share a single in-flight generation. Across workers too, when the
+# workers share state and a cache tier through which the leader's result reaches the others.
+coalescer = RequestCoalescer(shared=shared_state if response_cache.disk is not None else None)
+
+# Admission control: at most EDUCHAIN_MAX_CONCURRENT_GENERATIONS generations run at once, a bounded
+# queue (smallest jobs first) sits in front of them and anything beyond it is shed with 503.
+admission = AdmissionController(
+    max_concurrent=int(os.getenv("EDUCHAIN_MAX_CONCURRENT_GENERATIONS", "32")),
+    max_queue=int(os.getenv("EDUCHAIN_MAX_QUEUED_GENERATIONS", "256")),
+    queue_timeout_seconds=float(os.getenv("EDUCHAIN_QUEUE_TIMEOUT_SECONDS", "30")),
+)
+
+# Per-client rate limit (by X-API-Key, else client IP); set EDUCHAIN_RATE_LIMIT_PER_MINUTE=0 to disable it.
+# Only keys listed in EDUCHAIN_API_KEYS (comma-separated) get their own bucket: an unlisted key is limited
+# by client IP, so rotating the header can't be used to dodge the limit. Batches cost one token per topic.
+RATE_LIMIT_PER_MINUTE = float(os.getenv("EDUCHAIN_RATE_LIMIT_PER_MINUTE", "120"))
+rate_limiter = RateLimiter(
+    requests_per_minute=RATE_LIMIT_PER_MINUTE,
+    burst=float(os.getenv("EDUCHAIN_RATE_LIMIT_BURST", "30")),
+    shared=shared_state,
+) if RATE_LIMIT_PER_MINUTE > 0 else None
+
+# Bulk generation jobs, persisted in SQLite so they survive restarts (EDUCHAIN_JOBS_DB sets the file)
+JOBS_DB_PATH = os.getenv("EDUCHAIN_JOBS_DB", os.path.join(STATE_DIR, "educhain_jobs.db"))
+job_manager = JobManager(
+    JobStore(JOBS_DB_PATH),
+    edu_generator,
+    workers=int(os.getenv("EDUCHAIN_JOB_WORKERS", str(DEFAULT_JOB_WORKERS))),
+    chunk_size=int(os.getenv("EDUCHAIN_JOB_CHUNK_SIZE", str(DEFAULT_CHUNK_SIZE))),
+    admission=admission,
+    shared=shared_state,
+    chunk_retries=int(os.getenv("EDUCHAIN_JOB_CHUNK_RETRIES", str(DEFAULT_CHUNK_RETRIES))),
+)
+
+# MCP JSON-RPC over stdio (mcp_stdio.py) and, unless EDUCHAIN_MCP_HTTP=0, over HTTP at /mcp
+mcp_dispatcher = McpDispatcher(edu_generator, job_manager, admission, coalescer)
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+API_KEY_HASHES = {hash_api_key(key.strip()) for key in os.getenv("EDUCHAIN_API_KEYS", "").split(",") if key.strip()}
+
+def client_key(http_request: Request) -> str:
+    api_key = http_request.headers.get("x-api-key")
+    if api_key:
+        key_hash = hash_api_key(api_key)
+        if key_hash in API_KEY_HASHES:
+            return f"key:{key_hash}"
+    return f"ip:{http_request.client.host if http_request.client else 'unknown'}"
+
+async def check_rate_limit(http_request: Request, cost: int = 1) -> None:
+    if rate_limiter is not None:
+        await rate_limiter.acheck(client_key(http_request), cost)
+
+async def admitted(tool: str, cost: int, generate: Callable[[], Awaitable], slots: int = 1):
+    """
+    Runs a generation once admission control grants it a slot (one per topic, for batches).
+    """
+    async with admission.slot(cost, slots) as lease:
+        observe_stage(tool, STAGE_QUEUE_WAIT, lease.queue_wait)
+        return await generate()
+
+async def admitted_lease(tool: str, cost: int) -> AdmissionLease:
+    lease = await admission.lease(cost)
+    observe_stage(tool, STAGE_QUEUE_WAIT, lease.queue_wait)
+    return lease
+
+async def coalesced(tool: str, key: str, factory: Callable[[], Awaitable]):
+    """
+    Runs factory through the coalescer, counting whether this caller led or joined the generation.
+    """
+    COALESCED_REQUESTS.labels(tool, "follower" if coalescer.is_in_flight(key) else "leader").inc()
+    return await coalescer.run(key, factory)
+
+def json_response(tool: str, content: dict) -> FastJSONResponse:
+    with timed_stage(tool, STAGE_SERIALIZATION):
+        return FastJSONResponse(content=content, status_code=status.HTTP_200_OK)
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    logging.warning(f"Rejected {request.url.path} with {exc.status_code}: {exc.detail}")
+    ADMISSION_REJECTIONS.labels(str(exc.status_code)).inc()
+    return JSONResponse(
+        content={"detail": exc.detail},
+        status_code=exc.status_code,
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.on_event("startup")
+async def start_backend_health_checks():
+    if llm_pool is not None:
+        logging.info(f"Using {len(llm_pool.backends)} LLM backend(s) from {BACKENDS_CONFIG_PATH}")
+        llm_pool.start_health_checks()
+    # Set EDUCHAIN_WARM_UP=1 to load the model(s) with a cheap request before serving traffic
+    if os.getenv("EDUCHAIN_WARM_UP", "0") == "1":
+        await edu_generator.awarm_up()
+    job_manager.start()
+
+@app.on_event("shutdown")
+async def shutdown_generator():
+    await job_manager.stop()
+    job_manager.store.close()
+    if shared_state is not None:
+        shared_state.close()
+    edu_generator.close()
+    if llm_pool is not None:
+        llm_pool.close()
+
+# MCP discovery documents. They never change while the server runs, so they are built and
+# encoded once and served as the same bytes (with an ETag) to every poll.
+MCP_TOOLS_DOCUMENT = PrecomputedJSON([tool.model_dump() for tool in MCP_TOOLS])
+MCP_RESOURCES_DOCUMENT = PrecomputedJSON([resource.model_dump() for resource in MCP_RESOURCES])
 
 @app.get("/.well-known/mcp/tools", response_model=List[ToolDefinition])
-async def get_mcp_tools():
+async def get_mcp_tools(http_request: Request):
     """
     Exposes the list of available MCP tools.
     """
     logging.info("Request received for /mcp/tools")
-    tools = [
-        ToolDefinition(
-            name="generate_mcqs",
-            description="Generates multiple-choice questions for a given topic.",
-            parameters={
-                "type": "object",
-                "properties": {
-                    "topic": {"type": "string", "description": "The educational topic for the MCQs."},
-                    "num_questions": {"type": "integer", "description": "Number of MCQs to generate (default: 5).", "default": 5}
-                },
-                "required": ["topic"]
-            },
-            endpoint="/tools/generate_mcqs"
-        ), # type: ignore
-        ToolDefinition(
-            name="generate_flashcards",
-            description="Generates flashcards (front/back) for a given topic. (Bonus)",
-            parameters={
-                "type": "object",
-                "properties": {
-                    "topic": {"type": "string", "description": "The educational topic for the flashcards."},
-                    "num_cards": {"type": "integer", "description": "Number of flashcards to generate (default: 5).", "default": 5}
-                },
-                "required": ["topic"]
-            },
-            endpoint="/tools/generate_flashcards"
-        ) # type: ignore
-    ]
-    return tools
+    return MCP_TOOLS_DOCUMENT.response(http_request)
 
 @app.get("/.well-known/mcp/resources", response_model=List[ResourceDefinition])
-async def get_mcp_resources():
+async def get_mcp_resources(http_request: Request):
     """
     Exposes the list of available MCP resources.
     """
     logging.info("Request received for /mcp/resources")
-    resources = [
-        ResourceDefinition(
-            name="lesson_plan",
-            description="Returns a lesson plan for a user-specified subject.",
-            endpoint="/resources/lesson_plan",
-            method="GET", 
-            parameters={
-                "type": "object",
-                "properties": {
-                    "subject": {"type": "string", "description": "The subject for which to generate a lesson plan."}
-                },
-                "required": ["subject"]
-            }
-        )
-    ]
-    return resources
+    return MCP_RESOURCES_DOCUMENT.response(http_request)
+
+async def handle_mcp_messages(body, notify=None):
+    if isinstance(body, list):
+        responses = await asyncio.gather(*(mcp_dispatcher.handle(message, notify) for message in body))
+        return [response for response in responses if response is not None] or None
+    return await mcp_dispatcher.handle(body, notify)
+
+def mcp_event(message) -> bytes:
+    return b"event: message\ndata: " + dumps(message) + b"\n\n"
+
+if os.getenv("EDUCHAIN_MCP_HTTP", "1") == "1":
+    @app.post("/mcp")
+    async def mcp_endpoint(http_request: Request):
+        """
+        MCP streamable HTTP transport: one JSON-RPC message (or batch) per POST. With
+        Accept: text/event-stream the reply is an SSE stream carrying progress notifications
+        followed by the response; otherwise it is a single JSON response.
+        """
+        try:
+            body = json.loads(await http_request.body())
+        except ValueError as e:
+            return FastJSONResponse(content=error_response(None, PARSE_ERROR, f"Parse error: {e}"), status_code=status.HTTP_400_BAD_REQUEST)
+        messages = body if isinstance(body, list) else [body]
+        if not messages:
+            return FastJSONResponse(content=error_response(None, INVALID_REQUEST, "Empty batch."), status_code=status.HTTP_400_BAD_REQUEST)
+        if not any(is_request(message) for message in messages):
+            await handle_mcp_messages(body)
+            return Response(status_code=status.HTTP_202_ACCEPTED)
+        generations = sum(tool_call_generations(message) for message in messages)
+        if generations:
+            await check_rate_limit(http_request, generations)
+        if "text/event-stream" not in http_request.headers.get("accept", ""):
+            return FastJSONResponse(content=await handle_mcp_messages(body), status_code=status.HTTP_200_OK)
+
+        events: asyncio.Queue = asyncio.Queue()
+        async def run():
+            try:
+                await events.put(await handle_mcp_messages(body, events.put))
+            finally:
+                await events.put(None)
+        async def stream():
+            task = asyncio.ensure_future(run())
+            try:
+                while (message := await events.get()) is not None:
+                    yield mcp_event(message)
+            finally:
+                task.cancel()  # the client went away; stop generating
+        return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    @app.get("/mcp")
+    async def mcp_get_endpoint():
+        """This server sends nothing unprompted, so it offers no standalone SSE stream."""
+        return Response(status_code=status.HTTP_405_METHOD_NOT_ALLOWED, headers={"Allow": "POST"})
 
 # API ENDPOINTS FOR TOOLS
 
-class GenerateMCQsRequest(BaseModel):
-    topic: str
-    num_questions: int = 5
+def streaming_items_response(tool: str, items: AsyncIterator[dict], http_request: Request, lease: Optional[AdmissionLease] = None) -> StreamingResponse:
+    """
+    Wraps a stream of generated items as SSE if the client asked for text/event-stream, else NDJSON.
+    The admission lease, if any, is held until the stream ends or the client disconnects.
+    """
+    background = BackgroundTask(lease.release) if lease is not None else None
+    if "text/event-stream" in http_request.headers.get("accept", ""):
+        def encode(item: dict) -> bytes:
+            return b"data: " + dumps(item) + b"\n\n"
+        trailer = b"event: end\ndata: {}\n\n"
+        media_type, headers = "text/event-stream", {"Cache-Control": "no-cache"}
+    else:
+        def encode(item: dict) -> bytes:
+            return dumps(item) + b"\n"
+        trailer = b""
+        media_type, headers = "application/x-ndjson", None
+
+    async def encoded_items():
+        serialization_seconds = 0.0
+        try:
+            async for item in items:
+                started = time.perf_counter()
+                line = encode(item)
+                serialization_seconds += time.perf_counter() - started
+                yield line
+            if trailer:
+                yield trailer
+        finally:
+            observe_stage(tool, STAGE_SERIALIZATION, serialization_seconds)
+            if lease is not None:
+                lease.release()
+    return StreamingResponse(encoded_items(), media_type=media_type, headers=headers, background=background)
 
 @app.post("/tools/generate_mcqs")
-async def generate_mcqs_endpoint(request: GenerateMCQsRequest):
+async def generate_mcqs_endpoint(request: GenerateMCQsRequest, http_request: Request):
     """
     API endpoint to generate multiple-choice questions using EduChain.
     """
     logging.info(f"Received request to generate MCQs for topic: {request.topic}, num_questions: {request.num_questions}")
+    await check_rate_limit(http_request)
+    if request.stream:
+        lease = await admitted_lease("generate_mcqs", request.num_questions)
+        return streaming_items_response("generate_mcqs", edu_generator.astream_mcqs(request.topic, request.num_questions), http_request, lease)
     try:
-        mcqs = edu_generator.generate_mcqs(request.topic, request.num_questions) # type: ignore
-        return JSONResponse(content={"mcqs": mcqs}, status_code=status.HTTP_200_OK)
+        mcqs = await coalesced(
+            "generate_mcqs",
+            coalescing_key("generate_mcqs", request.topic, MCQ_TEMPLATE_HASH, request.num_questions),
+            lambda: admitted("generate_mcqs", request.num_questions, lambda: edu_generator.agenerate_mcqs(request.topic, request.num_questions))
+        )
+        return json_response("generate_mcqs", {"mcqs": mcqs})
+    except AdmissionRejected:
+        raise
     except Exception as e:
         logging.error(f"Error generating MCQs: {e}")
         raise HTTPException(
@@ -116,19 +328,25 @@ async def generate_mcqs_endpoint(request: GenerateMCQsRequest):
             detail=f"Failed to generate MCQs: {str(e)}"
         )
 
-class GenerateFlashcardsRequest(BaseModel):
-    topic: str
-    num_cards: int = 5
-
 @app.post("/tools/generate_flashcards")
-async def generate_flashcards_endpoint(request: GenerateFlashcardsRequest):
+async def generate_flashcards_endpoint(request: GenerateFlashcardsRequest, http_request: Request):
     """
     API endpoint to generate flashcards using EduChain (Bonus).
     """
     logging.info(f"Received request to generate flashcards for topic: {request.topic}, num_cards: {request.num_cards}")
+    await check_rate_limit(http_request)
+    if request.stream:
+        lease = await admitted_lease("generate_flashcards", request.num_cards)
+        return streaming_items_response("generate_flashcards", edu_generator.astream_flashcards(request.topic, request.num_cards), http_request, lease)
     try:
-        flashcards = edu_generator.generate_flashcards(request.topic, request.num_cards) # type: ignore
-        return JSONResponse(content={"flashcards": flashcards}, status_code=status.HTTP_200_OK)
+        flashcards = await coalesced(
+            "generate_flashcards",
+            coalescing_key("generate_flashcards", request.topic, FLASHCARD_TEMPLATE_HASH, request.num_cards),
+            lambda: admitted("generate_flashcards", request.num_cards, lambda: edu_generator.agenerate_flashcards(request.topic, request.num_cards))
+        )
+        return json_response("generate_flashcards", {"flashcards": flashcards})
+    except AdmissionRejected:
+        raise
     except Exception as e:
         logging.error(f"Error generating flashcards: {e}")
         raise HTTPException(
@@ -136,10 +354,58 @@ async def generate_flashcards_endpoint(request: GenerateFlashcardsRequest):
             detail=f"Failed to generate flashcards: {str(e)}"
         )
 
+@app.post("/tools/generate_mcqs_batch")
+async def generate_mcqs_batch_endpoint(request: GenerateMCQsBatchRequest, http_request: Request):
+    """
+    API endpoint to generate MCQs for many topics at once. Failures are reported per topic.
+    """
+    logging.info(f"Received batch request to generate MCQs for {len(request.topics)} topics, num_questions: {request.num_questions}")
+    await check_rate_limit(http_request, len(request.topics))
+    try:
+        results = await admitted(
+            "generate_mcqs_batch",
+            len(request.topics) * request.num_questions,
+            lambda: edu_generator.agenerate_mcqs_batch(request.topics, request.num_questions, request.max_concurrency),
+            slots=len(request.topics),
+        )
+        return json_response("generate_mcqs_batch", {"results": results})
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        logging.error(f"Error generating MCQ batch: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate MCQ batch: {str(e)}"
+        )
+
+@app.post("/tools/generate_flashcards_batch")
+async def generate_flashcards_batch_endpoint(request: GenerateFlashcardsBatchRequest, http_request: Request):
+    """
+    API endpoint to generate flashcards for many topics at once. Failures are reported per topic.
+    """
+    logging.info(f"Received batch request to generate flashcards for {len(request.topics)} topics, num_cards: {request.num_cards}")
+    await check_rate_limit(http_request, len(request.topics))
+    try:
+        results = await admitted(
+            "generate_flashcards_batch",
+            len(request.topics) * request.num_cards,
+            lambda: edu_generator.agenerate_flashcards_batch(request.topics, request.num_cards, request.max_concurrency),
+            slots=len(request.topics),
+        )
+        return json_response("generate_flashcards_batch", {"results": results})
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        logging.error(f"Error generating flashcard batch: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate flashcard batch: {str(e)}"
+        )
+
 #  API ENDPOINTS FOR RESOURCES
 
 @app.get("/resources/lesson_plan")
-async def get_lesson_plan_endpoint(subject: str):
+async def get_lesson_plan_endpoint(subject: str, http_request: Request):
     """
     API endpoint to retrieve a lesson plan for a given subject using EduChain.
     """
@@ -149,9 +415,16 @@ async def get_lesson_plan_endpoint(subject: str):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Subject parameter is required for lesson plan."
         )
+    await check_rate_limit(http_request)
     try:
-        lesson_plan = edu_generator.generate_lesson_plan(subject) # type: ignore
-        return JSONResponse(content={"lesson_plan": lesson_plan}, status_code=status.HTTP_200_OK)
+        lesson_plan = await coalesced(
+            "generate_lesson_plan",
+            coalescing_key("generate_lesson_plan", subject, LESSON_PLAN_TEMPLATE_HASH),
+            lambda: admitted("generate_lesson_plan", LESSON_PLAN_COST, lambda: edu_generator.agenerate_lesson_plan(subject))
+        )
+        return json_response("generate_lesson_plan", {"lesson_plan": lesson_plan})
+    except AdmissionRejected:
+        raise
     except Exception as e:
         logging.error(f"Error generating lesson plan: {e}")
         raise HTTPException(
@@ -159,6 +432,89 @@ async def get_lesson_plan_endpoint(subject: str):
             detail=f"Failed to generate lesson plan: {str(e)}"
         )
 
+#  API ENDPOINTS FOR GENERATION JOBS
+
+def job_not_found(job_id: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job '{job_id}' not found.")
+
+@app.post("/jobs")
+async def submit_job_endpoint(request: SubmitJobRequest, http_request: Request):
+    """
+    API endpoint to start a background generation job. Responds 202 with the job's ID and status.
+    """
+    logging.info(f"Received job request: {request.count} {request.tool} items on topic: {request.topic}")
+    await check_rate_limit(http_request)
+    if request.tool not in JOB_TOOLS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported tool '{request.tool}'. Expected one of: {', '.join(JOB_TOOLS)}."
+        )
+    if not request.topic.strip():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Topic must be a non-empty string.")
+    job = await job_manager.submit(request.tool, request.topic, request.count)
+    return FastJSONResponse(content=job, status_code=status.HTTP_202_ACCEPTED)
+
+@app.get("/jobs/{job_id}")
+async def get_job_endpoint(job_id: str):
+    """
+    API endpoint to poll a generation job's status and progress.
+    """
+    job = await job_manager.status(job_id)
+    if job is None:
+        raise job_not_found(job_id)
+    return FastJSONResponse(content=job, status_code=status.HTTP_200_OK)
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results_endpoint(job_id: str, offset: int = 0, limit: int = MAX_RESULTS_PAGE):
+    """
+    API endpoint to page through the items a job has generated so far.
+    """
+    if offset < 0 or limit < 1:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="offset must be >= 0 and limit >= 1.")
+    results = await job_manager.results(job_id, offset, limit)
+    if results is None:
+        raise job_not_found(job_id)
+    return FastJSONResponse(content=results, status_code=status.HTTP_200_OK)
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job_endpoint(job_id: str):
+    """
+    API endpoint to cancel a queued or running generation job.
+    """
+    job = await job_manager.cancel(job_id)
+    if job is None:
+        raise job_not_found(job_id)
+    return FastJSONResponse(content=job, status_code=status.HTTP_200_OK)
+
+@app.get("/stats")
+async def get_stats():
+    """
+    Reports response cache hit/miss counters, how many requests were coalesced, admission
+    control and rate limiting counters, job queue, question bank size/hit/dedup rates,
+    cross-worker shared state and LLM backend load. Under run_server.sh these are the
+    counters of the worker that answered, except the shared_state section; /metrics
+    aggregates across workers.
+    """
+    return {
+        "cache": response_cache.stats(),
+        "coalescing": coalescer.stats(),
+        "admission": admission.stats(),
+        "rate_limit": rate_limiter.stats() if rate_limiter is not None else None,
+        "jobs": job_manager.stats(),
+        "question_bank": question_bank.stats() if question_bank is not None else None,
+        "shared_state": shared_state.stats() if shared_state is not None else None,
+        "backends": llm_pool.stats() if llm_pool is not None else [],
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus scrape endpoint: per-stage latency histograms by tool plus mock-fallback,
+    parse-failure, cache, coalescing and admission counters, summed over every worker
+    when PROMETHEUS_MULTIPROC_DIR is set (as run_server.sh does).
+    """
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 @app.get("/")
 async def root():
     return {"message": "EduChain MCP Server is running!"}
\ No newline at end of file
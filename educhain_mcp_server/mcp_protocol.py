@@ -0,0 +1,291 @@
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+from pydantic import ValidationError
+
+from admission import AdmissionController, AdmissionRejected
+from educhain_utils import FLASHCARD_TEMPLATE_HASH, LESSON_PLAN_TEMPLATE_HASH, MCQ_TEMPLATE_HASH
+from fast_json import dumps
+from jobs import MAX_RESULTS_PAGE, JobManager
+from mcp_registry import TOOL_ARGUMENTS, mcp_resource_templates, mcp_tool_descriptors, parse_resource_uri
+from observability import ADMISSION_REJECTIONS, COALESCED_REQUESTS, STAGE_QUEUE_WAIT, observe_stage
+from request_coalescing import RequestCoalescer, coalescing_key
+
+# MCP protocol revisions this server speaks, newest first. A client asking for another revision gets the newest.
+SUPPORTED_PROTOCOL_VERSIONS = ("2025-06-18", "2025-03-26", "2024-11-05")
+
+SERVER_INFO = {"name": "educhain-mcp-server", "version": "1.0.0"}
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+RESOURCE_NOT_FOUND = -32002
+
+# Sends a JSON-RPC notification to the client
+Notify = Callable[[dict], Awaitable[None]]
+# Reports progress of a tool call: (done, total, message)
+Progress = Callable[[int, int, str], Awaitable[None]]
+
+# Admission cost of a lesson plan, in the same units as num_questions/num_cards
+LESSON_PLAN_COST = 5
+
+
+class McpError(Exception):
+    """A JSON-RPC error to return to the client instead of a result."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class ToolError(Exception):
+    """A tool call that failed; reported to the client as a result with isError set."""
+
+
+def is_request(message: Any) -> bool:
+    return isinstance(message, dict) and "method" in message and "id" in message
+
+
+def error_response(request_id: Any, code: int, message: str) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def progress_token(message: dict) -> Any:
+    params = message.get("params")
+    if not isinstance(params, dict) or not isinstance(params.get("_meta"), dict):
+        return None
+    return params["_meta"].get("progressToken")
+
+
+def tool_call_generations(message: Any) -> int:
+    """Number of generations a message asks for: one per topic for batch tool calls, else one."""
+    if not is_request(message) or message.get("method") != "tools/call":
+        return 0
+    params = message.get("params")
+    arguments = params.get("arguments") if isinstance(params, dict) else None
+    topics = arguments.get("topics") if isinstance(arguments, dict) else None
+    return len(topics) if isinstance(topics, list) and topics else 1
+
+
+class McpDispatcher:
+    """
+    Handles MCP JSON-RPC messages by calling the EduChainContentGenerator directly.
+
+    The dispatcher is transport-agnostic: mcp_stdio.py feeds it lines from stdin and main.py
+    feeds it POST bodies on /mcp. Calls are independent coroutines, so a transport can run
+    many at once and answer them in whatever order they finish. Generations go through the
+    same admission control and request coalescing as the HTTP tool endpoints.
+    """
+
+    def __init__(self, generator: Any, job_manager: JobManager, admission: AdmissionController, coalescer: RequestCoalescer):
+        self.generator = generator
+        self.job_manager = job_manager
+        self.admission = admission
+        self.coalescer = coalescer
+        self._tool_descriptors = mcp_tool_descriptors()
+        self._resource_templates = mcp_resource_templates()
+        self._methods: dict[str, Callable[[dict, Optional[Progress]], Awaitable[dict]]] = {
+            "initialize": self._initialize,
+            "ping": self._ping,
+            "tools/list": self._list_tools,
+            "tools/call": self._call_tool,
+            "resources/list": self._list_resources,
+            "resources/templates/list": self._list_resource_templates,
+            "resources/read": self._read_resource,
+        }
+
+    async def handle(self, message: Any, notify: Optional[Notify] = None) -> Optional[dict]:
+        """
+        Handles one JSON-RPC message. Returns the response for a request, or None for
+        notifications and responses. notify, if given, receives progress notifications.
+        """
+        if not isinstance(message, dict) or message.get("jsonrpc") != "2.0":
+            return error_response(message.get("id") if isinstance(message, dict) else None, INVALID_REQUEST, "Invalid JSON-RPC message.")
+        if "method" not in message:
+            return None  # a response to a request we never send
+        if "id" not in message:
+            return None  # notifications (initialized, cancelled, ...) need no answer
+        request_id = message["id"]
+        method = self._methods.get(message["method"])
+        if method is None:
+            return error_response(request_id, METHOD_NOT_FOUND, f"Method not found: {message['method']}")
+        params = message.get("params") or {}
+        if not isinstance(params, dict):
+            return error_response(request_id, INVALID_PARAMS, "params must be an object.")
+
+        progress = None
+        token = progress_token(message)
+        if token is not None and notify is not None:
+            async def progress(done: int, total: int, text: str) -> None:
+                await notify({
+                    "jsonrpc": "2.0",
+                    "method": "notifications/progress",
+                    "params": {"progressToken": token, "progress": done, "total": total, "message": text},
+                })
+        try:
+            result = await method(params, progress)
+        except McpError as e:
+            return error_response(request_id, e.code, e.message)
+        except Exception as e:
+            logging.error(f"Error handling MCP {message['method']}: {e}")
+            return error_response(request_id, INTERNAL_ERROR, str(e))
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    async def _initialize(self, params: dict, progress: Optional[Progress]) -> dict:
+        requested = params.get("protocolVersion")
+        return {
+            "protocolVersion": requested if requested in SUPPORTED_PROTOCOL_VERSIONS else SUPPORTED_PROTOCOL_VERSIONS[0],
+            "capabilities": {"tools": {"listChanged": False}, "resources": {"listChanged": False}},
+            "serverInfo": SERVER_INFO,
+        }
+
+    async def _ping(self, params: dict, progress: Optional[Progress]) -> dict:
+        return {}
+
+    async def _list_tools(self, params: dict, progress: Optional[Progress]) -> dict:
+        return {"tools": self._tool_descriptors}
+
+    async def _list_resources(self, params: dict, progress: Optional[Progress]) -> dict:
+        # Every resource takes parameters, so they are all offered as templates.
+        return {"resources": []}
+
+    async def _list_resource_templates(self, params: dict, progress: Optional[Progress]) -> dict:
+        return {"resourceTemplates": self._resource_templates}
+
+    async def _call_tool(self, params: dict, progress: Optional[Progress]) -> dict:
+        name = params.get("name")
+        model = TOOL_ARGUMENTS.get(name)  # type: ignore
+        if model is None:
+            raise McpError(INVALID_PARAMS, f"Unknown tool: {name}")
+        try:
+            arguments = model.model_validate(params.get("arguments") or {})
+        except ValidationError as e:
+            raise McpError(INVALID_PARAMS, f"Invalid arguments for {name}: {e}")
+        logging.info(f"MCP tool call: {name}")
+        try:
+            content = await getattr(self, f"_tool_{name}")(arguments, progress)
+        except AdmissionRejected as e:
+            ADMISSION_REJECTIONS.labels(str(e.status_code)).inc()
+            return self._tool_error(f"{e.detail} Retry after {e.retry_after} seconds.")
+        except ToolError as e:
+            return self._tool_error(str(e))
+        except Exception as e:
+            logging.error(f"Error running MCP tool {name}: {e}")
+            return self._tool_error(f"Failed to run {name}: {e}")
+        return {"content": [{"type": "text", "text": dumps(content).decode("utf-8")}], "structuredContent": content, "isError": False}
+
+    @staticmethod
+    def _tool_error(text: str) -> dict:
+        return {"content": [{"type": "text", "text": text}], "isError": True}
+
+    async def _read_resource(self, params: dict, progress: Optional[Progress]) -> dict:
+        uri = params.get("uri")
+        resource = parse_resource_uri(uri) if isinstance(uri, str) else None
+        if resource is None:
+            raise McpError(RESOURCE_NOT_FOUND, f"Resource not found: {uri}")
+        name, arguments = resource
+        if name == "lesson_plan":
+            content = {"lesson_plan": await self._generate(
+                "generate_lesson_plan",
+                coalescing_key("generate_lesson_plan", arguments["subject"], LESSON_PLAN_TEMPLATE_HASH),
+                LESSON_PLAN_COST,
+                lambda: self.generator.agenerate_lesson_plan(arguments["subject"]),
+            )}
+        elif name == "job_status":
+            content = await self.job_manager.status(arguments["job_id"])
+        else:
+            try:
+                offset = int(arguments.get("offset", 0))
+                limit = int(arguments.get("limit", MAX_RESULTS_PAGE))
+            except ValueError:
+                raise McpError(INVALID_PARAMS, "offset and limit must be integers.")
+            if offset < 0 or limit < 1:
+                raise McpError(INVALID_PARAMS, "offset must be >= 0 and limit >= 1.")
+            content = await self.job_manager.results(arguments["job_id"], offset, limit)
+        if content is None:
+            raise McpError(RESOURCE_NOT_FOUND, f"Job '{arguments['job_id']}' not found.")
+        return {"contents": [{"uri": uri, "mimeType": "application/json", "text": dumps(content).decode("utf-8")}]}
+
+    async def _generate(self, tool: str, key: str, cost: int, generate: Callable[[], Awaitable]):
+        """Runs a generation through the coalescer and, for the leader, an admission slot."""
+        async def admitted():
+            async with self.admission.slot(cost) as lease:
+                observe_stage(tool, STAGE_QUEUE_WAIT, lease.queue_wait)
+                return await generate()
+        COALESCED_REQUESTS.labels(tool, "follower" if self.coalescer.is_in_flight(key) else "leader").inc()
+        return await self.coalescer.run(key, admitted)
+
+    async def _generate_items(self, tool: str, topic: str, count: int, template_hash: str,
+                              generate: Callable[[str, int], Awaitable[list[dict]]],
+                              stream: Callable[[str, int], Any], progress: Optional[Progress]) -> list[dict]:
+        """
+        Generates MCQs or flashcards. When the client asked for progress, the items are streamed
+        from the LLM and a notification is sent as each one arrives.
+        """
+        if progress is None:
+            return await self._generate(tool, coalescing_key(tool, topic, template_hash, count), count, lambda: generate(topic, count))
+        items: list[dict] = []
+        async with self.admission.slot(count) as lease:
+            observe_stage(tool, STAGE_QUEUE_WAIT, lease.queue_wait)
+            await progress(0, count, f"Generating {count} items on '{topic}'")
+            async for item in stream(topic, count):
+                items.append(item)
+                await progress(len(items), count, f"Generated {len(items)} of {count}")
+        return items
+
+    async def _tool_generate_mcqs(self, arguments, progress: Optional[Progress]) -> dict:
+        mcqs = await self._generate_items(
+            "generate_mcqs", arguments.topic, arguments.num_questions, MCQ_TEMPLATE_HASH,
+            self.generator.agenerate_mcqs, self.generator.astream_mcqs, progress,
+        )
+        return {"mcqs": mcqs}
+
+    async def _tool_generate_flashcards(self, arguments, progress: Optional[Progress]) -> dict:
+        flashcards = await self._generate_items(
+            "generate_flashcards", arguments.topic, arguments.num_cards, FLASHCARD_TEMPLATE_HASH,
+            self.generator.agenerate_flashcards, self.generator.astream_flashcards, progress,
+        )
+        return {"flashcards": flashcards}
+
+    async def _run_batch(self, tool: str, topics: list[str], count: int, generate: Callable[[], Awaitable[list[dict]]],
+                         progress: Optional[Progress]) -> dict:
+        async with self.admission.slot(len(topics) * count, slots=len(topics)) as lease:
+            observe_stage(tool, STAGE_QUEUE_WAIT, lease.queue_wait)
+            if progress is not None:
+                await progress(0, len(topics), f"Generating {len(topics)} topics")
+            results = await generate()
+        if progress is not None:
+            await progress(len(topics), len(topics), f"Generated {len(topics)} topics")
+        return {"results": results}
+
+    async def _tool_generate_mcqs_batch(self, arguments, progress: Optional[Progress]) -> dict:
+        return await self._run_batch(
+            "generate_mcqs_batch", arguments.topics, arguments.num_questions,
+            lambda: self.generator.agenerate_mcqs_batch(arguments.topics, arguments.num_questions, arguments.max_concurrency),
+            progress,
+        )
+
+    async def _tool_generate_flashcards_batch(self, arguments, progress: Optional[Progress]) -> dict:
+        return await self._run_batch(
+            "generate_flashcards_batch", arguments.topics, arguments.num_cards,
+            lambda: self.generator.agenerate_flashcards_batch(arguments.topics, arguments.num_cards, arguments.max_concurrency),
+            progress,
+        )
+
+    async def _tool_submit_generation_job(self, arguments, progress: Optional[Progress]) -> dict:
+        if not arguments.topic.strip():
+            raise ToolError("Topic must be a non-empty string.")
+        try:
+            return await self.job_manager.submit(arguments.tool, arguments.topic, arguments.count)
+        except ValueError as e:
+            raise ToolError(str(e))
+
+    async def _tool_cancel_generation_job(self, arguments, progress: Optional[Progress]) -> dict:
+        job = await self.job_manager.cancel(arguments.job_id)
+        if job is None:
+            raise ToolError(f"Job '{arguments.job_id}' not found.")
+        return job
@@ -0,0 +1,249 @@
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from pydantic import BaseModel, Field
+
+from educhain_utils import DEFAULT_BATCH_CONCURRENCY, MAX_BATCH_CONCURRENCY
+from jobs import JOB_TOOLS, MAX_JOB_ITEMS, MAX_RESULTS_PAGE
+
+# Upper bound on the number of topics accepted by a single batch request
+MAX_BATCH_TOPICS = 100
+# Upper bound on the MCQs/flashcards per topic in one request; larger sets go through generation jobs
+MAX_ITEMS_PER_REQUEST = 50
+
+class ToolDefinition(BaseModel):
+    """Schema for defining an MCP tool."""
+    name: str = Field(..., description="The unique name of the tool.")
+    description: str = Field(..., description="A brief description of what the tool does.")
+    parameters: Dict = Field(..., description="JSON schema for the tool's input parameters.")
+    endpoint: str = Field(..., description="The API endpoint to call this tool.")
+    method: str = Field("POST", description="The HTTP method for the tool's endpoint (e.g., GET, POST).")
+
+class ResourceDefinition(BaseModel):
+    """Schema for defining an MCP resource."""
+    name: str = Field(..., description="The unique name of the resource.")
+    description: str = Field(..., description="A brief description of the resource.")
+    endpoint: str = Field(..., description="The API endpoint to access this resource.")
+    method: str = Field("GET", description="The HTTP method for the resource's endpoint (e.g., GET, POST).")
+    parameters: Dict = Field(None, description="Optional JSON schema for resource query parameters.")  # type: ignore
+
+# The tools and resources this server offers. The HTTP discovery documents and the MCP
+# JSON-RPC transports (stdio and /mcp) are all built from these lists.
+MCP_TOOLS: List[ToolDefinition] = [
+    ToolDefinition(
+        name="generate_mcqs",
+        description="Generates multiple-choice questions for a given topic.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "topic": {"type": "string", "description": "The educational topic for the MCQs."},
+                "num_questions": {"type": "integer", "minimum": 1, "maximum": MAX_ITEMS_PER_REQUEST, "description": "Number of MCQs to generate (default: 5).", "default": 5},
+                "stream": {"type": "boolean", "description": "Stream each MCQ as soon as it is generated (NDJSON, or SSE with Accept: text/event-stream).", "default": False}
+            },
+            "required": ["topic"]
+        },
+        endpoint="/tools/generate_mcqs"
+    ), # type: ignore
+    ToolDefinition(
+        name="generate_flashcards",
+        description="Generates flashcards (front/back) for a given topic. (Bonus)",
+        parameters={
+            "type": "object",
+            "properties": {
+                "topic": {"type": "string", "description": "The educational topic for the flashcards."},
+                "num_cards": {"type": "integer", "minimum": 1, "maximum": MAX_ITEMS_PER_REQUEST, "description": "Number of flashcards to generate (default: 5).", "default": 5},
+                "stream": {"type": "boolean", "description": "Stream each flashcard as soon as it is generated (NDJSON, or SSE with Accept: text/event-stream).", "default": False}
+            },
+            "required": ["topic"]
+        },
+        endpoint="/tools/generate_flashcards"
+    ), # type: ignore
+    ToolDefinition(
+        name="generate_mcqs_batch",
+        description="Generates multiple-choice questions for a list of topics in one call, with per-topic results and errors.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "topics": {"type": "array", "items": {"type": "string"}, "maxItems": MAX_BATCH_TOPICS, "description": "The educational topics to generate MCQs for."},
+                "num_questions": {"type": "integer", "minimum": 1, "maximum": MAX_ITEMS_PER_REQUEST, "description": "Number of MCQs per topic (default: 5).", "default": 5},
+                "max_concurrency": {"type": "integer", "description": f"Maximum topics generated concurrently (default: {DEFAULT_BATCH_CONCURRENCY}, max: {MAX_BATCH_CONCURRENCY}).", "default": DEFAULT_BATCH_CONCURRENCY}
+            },
+            "required": ["topics"]
+        },
+        endpoint="/tools/generate_mcqs_batch"
+    ), # type: ignore
+    ToolDefinition(
+        name="generate_flashcards_batch",
+        description="Generates flashcards for a list of topics in one call, with per-topic results and errors.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "topics": {"type": "array", "items": {"type": "string"}, "maxItems": MAX_BATCH_TOPICS, "description": "The educational topics to generate flashcards for."},
+                "num_cards": {"type": "integer", "minimum": 1, "maximum": MAX_ITEMS_PER_REQUEST, "description": "Number of flashcards per topic (default: 5).", "default": 5},
+                "max_concurrency": {"type": "integer", "description": f"Maximum topics generated concurrently (default: {DEFAULT_BATCH_CONCURRENCY}, max: {MAX_BATCH_CONCURRENCY}).", "default": DEFAULT_BATCH_CONCURRENCY}
+            },
+            "required": ["topics"]
+        },
+        endpoint="/tools/generate_flashcards_batch"
+    ), # type: ignore
+    ToolDefinition(
+        name="submit_generation_job",
+        description="Starts a background job that generates a large set of MCQs or flashcards on a topic (e.g. a 500-question exam bank). Returns a job ID; poll the job_status resource and page through job_results.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "tool": {"type": "string", "enum": list(JOB_TOOLS), "description": "What to generate."},
+                "topic": {"type": "string", "description": "The educational topic."},
+                "count": {"type": "integer", "minimum": 1, "maximum": MAX_JOB_ITEMS, "description": "Total number of items to generate."}
+            },
+            "required": ["tool", "topic", "count"]
+        },
+        endpoint="/jobs"
+    ), # type: ignore
+    ToolDefinition(
+        name="cancel_generation_job",
+        description="Cancels a queued or running generation job. Items already generated stay available.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "job_id": {"type": "string", "description": "The job ID returned by submit_generation_job."}
+            },
+            "required": ["job_id"]
+        },
+        endpoint="/jobs/{job_id}",
+        method="DELETE"
+    ) # type: ignore
+]
+
+MCP_RESOURCES: List[ResourceDefinition] = [
+    ResourceDefinition(
+        name="lesson_plan",
+        description="Returns a lesson plan for a user-specified subject.",
+        endpoint="/resources/lesson_plan",
+        method="GET", 
+        parameters={
+            "type": "object",
+            "properties": {
+                "subject": {"type": "string", "description": "The subject for which to generate a lesson plan."}
+            },
+            "required": ["subject"]
+        }
+    ),
+    ResourceDefinition(
+        name="job_status",
+        description="Status and progress of a generation job. A job the LLM couldn't finish ends as \"partial\", with the missing item count in shortfall.",
+        endpoint="/jobs/{job_id}",
+        method="GET",
+        parameters={
+            "type": "object",
+            "properties": {
+                "job_id": {"type": "string", "description": "The job ID returned by submit_generation_job."}
+            },
+            "required": ["job_id"]
+        }
+    ),
+    ResourceDefinition(
+        name="job_results",
+        description="Pages through the items a generation job has produced so far, in order. Keep requesting next_offset until it is null.",
+        endpoint="/jobs/{job_id}/results",
+        method="GET",
+        parameters={
+            "type": "object",
+            "properties": {
+                "job_id": {"type": "string", "description": "The job ID returned by submit_generation_job."},
+                "offset": {"type": "integer", "description": "Index of the first item to return (default: 0).", "default": 0},
+                "limit": {"type": "integer", "description": f"Maximum items to return (default and max: {MAX_RESULTS_PAGE}).", "default": MAX_RESULTS_PAGE}
+            },
+            "required": ["job_id"]
+        }
+    )
+]
+
+# Tool arguments. The HTTP endpoints take these as request bodies; the MCP transports validate
+# tools/call arguments against the same models.
+
+class GenerateMCQsRequest(BaseModel):
+    topic: str
+    num_questions: int = Field(5, ge=1, le=MAX_ITEMS_PER_REQUEST)
+    stream: bool = False
+
+class GenerateFlashcardsRequest(BaseModel):
+    topic: str
+    num_cards: int = Field(5, ge=1, le=MAX_ITEMS_PER_REQUEST)
+    stream: bool = False
+
+class GenerateMCQsBatchRequest(BaseModel):
+    topics: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_TOPICS)
+    num_questions: int = Field(5, ge=1, le=MAX_ITEMS_PER_REQUEST)
+    max_concurrency: int = Field(DEFAULT_BATCH_CONCURRENCY, ge=1, le=MAX_BATCH_CONCURRENCY)
+
+class GenerateFlashcardsBatchRequest(BaseModel):
+    topics: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_TOPICS)
+    num_cards: int = Field(5, ge=1, le=MAX_ITEMS_PER_REQUEST)
+    max_concurrency: int = Field(DEFAULT_BATCH_CONCURRENCY, ge=1, le=MAX_BATCH_CONCURRENCY)
+
+class SubmitJobRequest(BaseModel):
+    tool: str
+    topic: str
+    count: int = Field(..., ge=1, le=MAX_JOB_ITEMS)
+
+class CancelJobRequest(BaseModel):
+    job_id: str
+
+TOOL_ARGUMENTS: Dict[str, type[BaseModel]] = {
+    "generate_mcqs": GenerateMCQsRequest,
+    "generate_flashcards": GenerateFlashcardsRequest,
+    "generate_mcqs_batch": GenerateMCQsBatchRequest,
+    "generate_flashcards_batch": GenerateFlashcardsBatchRequest,
+    "submit_generation_job": SubmitJobRequest,
+    "cancel_generation_job": CancelJobRequest,
+}
+
+# MCP resource URI templates (RFC 6570). Query parameters other than those in the path are optional.
+RESOURCE_URI_SCHEME = "educhain"
+RESOURCE_URI_TEMPLATES = {
+    "lesson_plan": "educhain://lesson_plan/{subject}",
+    "job_status": "educhain://jobs/{job_id}",
+    "job_results": "educhain://jobs/{job_id}/results{?offset,limit}",
+}
+
+def mcp_tool_descriptors() -> list[dict]:
+    """
+    The tools in MCP tools/list form. Over MCP, progress notifications take the place of the
+    HTTP `stream` flag, so it is left out of the input schemas.
+    """
+    descriptors = []
+    for tool in MCP_TOOLS:
+        schema = dict(tool.parameters)
+        schema["properties"] = {name: prop for name, prop in schema.get("properties", {}).items() if name != "stream"}
+        descriptors.append({"name": tool.name, "description": tool.description, "inputSchema": schema})
+    return descriptors
+
+def mcp_resource_templates() -> list[dict]:
+    """The resources in MCP resources/templates/list form."""
+    return [
+        {
+            "uriTemplate": RESOURCE_URI_TEMPLATES[resource.name],
+            "name": resource.name,
+            "description": resource.description,
+            "mimeType": "application/json",
+        }
+        for resource in MCP_RESOURCES
+    ]
+
+def parse_resource_uri(uri: str) -> Optional[tuple[str, dict]]:
+    """
+    Maps a resource URI back to (resource name, parameters), or None if it names no resource.
+    """
+    parts = urlsplit(uri)
+    if parts.scheme != RESOURCE_URI_SCHEME:
+        return None
+    segments = [unquote(segment) for segment in parts.path.strip("/").split("/")] if parts.path.strip("/") else []
+    query = {name: values[-1] for name, values in parse_qs(parts.query).items()}
+    if parts.netloc == "lesson_plan" and len(segments) == 1 and segments[0]:
+        return "lesson_plan", {"subject": segments[0]}
+    if parts.netloc == "jobs" and len(segments) == 1:
+        return "job_status", {"job_id": segments[0]}
+    if parts.netloc == "jobs" and len(segments) == 2 and segments[1] == "results":
+        return "job_results", {"job_id": segments[0], **query}
+    return None
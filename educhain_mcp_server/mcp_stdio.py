@@ -0,0 +1,124 @@
+"""
+MCP server over stdio: newline-delimited JSON-RPC on stdin/stdout, as launched by Claude Desktop
+(see the mcpServers entry in claude_desktop_config.json).
+
+Requests are pipelined: each one runs as its own task and its response is written as soon as it
+is ready, so a slow generation doesn't hold up a tools/list or a second call. Tool calls that
+carry a progressToken get notifications/progress as items are generated, and
+notifications/cancelled stops the named request. Logs (and any print output) go to stderr.
+
+Usage:
+    python mcp_stdio.py
+"""
+import asyncio
+import json
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Optional
+
+from fast_json import dumps
+from mcp_protocol import INVALID_REQUEST, PARSE_ERROR, McpDispatcher, error_response, is_request
+
+
+class StdioTransport:
+    """Reads JSON-RPC messages line by line and runs each request concurrently on the dispatcher."""
+
+    def __init__(self, dispatcher: McpDispatcher, reader: BinaryIO, writer: BinaryIO):
+        self.dispatcher = dispatcher
+        self.reader = reader
+        self.writer = writer
+        self._write_lock = asyncio.Lock()
+        self._tasks: dict[Any, asyncio.Task] = {}
+        # Blocking reads run on a dedicated thread; stdin pipes can't be awaited portably (e.g. on Windows).
+        self._read_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mcp-stdin")
+
+    async def send(self, message: Any) -> None:
+        line = dumps(message) + b"\n"
+        async with self._write_lock:
+            self.writer.write(line)
+            self.writer.flush()
+
+    async def serve(self) -> None:
+        """Serves until stdin closes, then waits for the requests still running."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await loop.run_in_executor(self._read_executor, self.reader.readline)
+                if not line:
+                    break
+                if line.strip():
+                    await self._receive(line)
+            if self._tasks:
+                await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        finally:
+            self._read_executor.shutdown(wait=False)
+
+    async def _receive(self, line: bytes) -> None:
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            await self.send(error_response(None, PARSE_ERROR, f"Parse error: {e}"))
+            return
+        if isinstance(message, list):
+            # JSON-RPC batch (protocol revision 2025-03-26): answered as one array once all of it is done.
+            if not message:
+                await self.send(error_response(None, INVALID_REQUEST, "Empty batch."))
+                return
+            self._start(object(), self._handle_batch(message))
+            return
+        if isinstance(message, dict) and message.get("method") == "notifications/cancelled":
+            self._cancel((message.get("params") or {}).get("requestId"))
+            return
+        if is_request(message):
+            self._start(message["id"], self._handle(message))
+            return
+        response = await self.dispatcher.handle(message, self.send)
+        if response is not None:
+            await self.send(response)
+
+    def _start(self, request_id: Any, coroutine) -> None:
+        task = asyncio.ensure_future(coroutine)
+        key = (type(request_id).__name__, request_id) if isinstance(request_id, (str, int)) else request_id
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+
+    def _cancel(self, request_id: Any) -> None:
+        if isinstance(request_id, (str, int)):
+            task = self._tasks.get((type(request_id).__name__, request_id))
+            if task is not None:
+                logging.info(f"Cancelling MCP request {request_id}")
+                task.cancel()
+
+    async def _handle(self, message: dict) -> None:
+        try:
+            response = await self.dispatcher.handle(message, self.send)
+        except asyncio.CancelledError:
+            return  # a cancelled request gets no response
+        if response is not None:
+            await self.send(response)
+
+    async def _handle_batch(self, messages: list) -> None:
+        responses = await asyncio.gather(*(self.dispatcher.handle(message, self.send) for message in messages))
+        responses = [response for response in responses if response is not None]
+        if responses:
+            await self.send(responses)
+
+
+async def serve_stdio(reader: Optional[BinaryIO] = None, writer: Optional[BinaryIO] = None) -> None:
+    # stdout carries the protocol, so anything else that prints must go to stderr.
+    writer = writer or sys.stdout.buffer
+    reader = reader or sys.stdin.buffer
+    sys.stdout = sys.stderr
+
+    import main as server
+    await server.start_backend_health_checks()
+    try:
+        await StdioTransport(server.mcp_dispatcher, reader, writer).serve()
+    finally:
+        await server.shutdown_generator()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stderr)
+    asyncio.run(serve_stdio())
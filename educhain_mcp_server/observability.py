@@ -0,0 +1,119 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+try:  # OpenTelemetry is optional; spans are no-ops without it (or without a configured SDK).
+    from opentelemetry import trace as _otel_trace
+    _tracer = _otel_trace.get_tracer("educhain_mcp_server")
+except ImportError:
+    _tracer = None
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# Pipeline stages timed per request, labelled by tool.
+STAGE_QUEUE_WAIT = "queue_wait"
+STAGE_PROMPT_BUILD = "prompt_build"
+STAGE_LLM_CALL = "llm_call"
+STAGE_TTFT = "ttft"
+STAGE_PARSE = "parse"
+STAGE_SERIALIZATION = "serialization"
+
+# Spans sub-millisecond prompt formatting up to multi-minute local-model generations.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+STAGE_SECONDS = Histogram(
+    "educhain_stage_seconds", "Time spent in each request stage.",
+    ["tool", "stage"], buckets=LATENCY_BUCKETS,
+)
+GENERATION_SECONDS = Histogram(
+    "educhain_generation_seconds", "End-to-end time of a generate_* call, including cache lookups and top-up.",
+    ["tool"], buckets=LATENCY_BUCKETS,
+)
+MOCK_FALLBACKS = Counter(
+    "educhain_mock_fallbacks_total", "Responses served wholly or partly from mock content.",
+    ["tool", "reason"],
+)
+PARSE_FAILURES = Counter(
+    "educhain_parse_failures_total", "LLM responses that contained no usable item.",
+    ["tool"],
+)
+DROPPED_ITEMS = Counter(
+    "educhain_dropped_items_total", "Malformed or invalid items dropped while parsing LLM output.",
+    ["tool"],
+)
+CACHE_LOOKUPS = Counter(
+    "educhain_cache_lookups_total", "Response cache lookups by result (hit or miss).",
+    ["tool", "result"],
+)
+BANK_LOOKUPS = Counter(
+    "educhain_bank_lookups_total", "Question bank lookups by result (hit: served from the bank, miss: bank too small).",
+    ["tool", "result"],
+)
+COALESCED_REQUESTS = Counter(
+    "educhain_coalesced_requests_total", "Requests by coalescing role (leader runs the generation, follower shares it).",
+    ["tool", "role"],
+)
+ADMISSION_REJECTIONS = Counter(
+    "educhain_admission_rejections_total", "Requests shed by admission control (503) or rate limiting (429).",
+    ["status"],
+)
+
+
+def observe_stage(tool: str, stage: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(tool, stage).observe(seconds)
+
+
+@contextmanager
+def timed_stage(tool: str, stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(tool, stage).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def traced(name: str, current: bool = True, **attributes: Any) -> Iterator[Optional[Any]]:
+    """
+    Wraps a block in an OpenTelemetry span if OpenTelemetry is installed. Pass current=False
+    inside async generators, where the span must not stay attached to the context across yields.
+    """
+    if _tracer is None:
+        yield None
+        return
+    if current:
+        with _tracer.start_as_current_span(name, attributes=attributes) as span:
+            yield span
+    else:
+        span = _tracer.start_span(name, attributes=attributes)
+        try:
+            yield span
+        finally:
+            span.end()
+
+
+@contextmanager
+def generation_span(tool: str, current: bool = True, **attributes: Any) -> Iterator[Optional[Any]]:
+    """Times a whole generate_* call into GENERATION_SECONDS and wraps it in a span."""
+    started = time.perf_counter()
+    try:
+        with traced(f"educhain.{tool}", current=current, tool=tool, **attributes) as span:
+            yield span
+    finally:
+        GENERATION_SECONDS.labels(tool).observe(time.perf_counter() - started)
+
+
+def render_metrics() -> bytes:
+    """
+    Returns every metric in the Prometheus text exposition format. Under a multi-worker launcher
+    (run_server.sh sets PROMETHEUS_MULTIPROC_DIR) each worker writes its samples to that
+    directory and this sums them across workers, so any worker answers for the whole server.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
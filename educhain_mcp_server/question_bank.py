@@ -0,0 +1,230 @@
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Optional
+
+from response_cache import normalize_subject
+
+# MinHash parameters: NUM_PERMUTATIONS hash functions, split into LSH_BANDS bands for candidate lookup.
+# Items whose estimated Jaccard similarity reaches DUPLICATE_THRESHOLD count as near-duplicates.
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+SHINGLE_SIZE = 5
+DUPLICATE_THRESHOLD = 0.8
+
+# A topic is served from the bank once it holds this many times the requested count,
+# so consecutive quizzes draw from a pool rather than repeating the same few items.
+DEFAULT_MIN_BANK_MULTIPLE = 3
+# After this many additions in a row bring nothing new (the LLM keeps repeating itself), the topic
+# counts as saturated and is served from whatever it holds instead of asking the LLM again.
+MAX_STALLED_GROWTHS = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_permutation_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_permutation_rng.randrange(1, _MERSENNE_PRIME), _permutation_rng.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(NUM_PERMUTATIONS)]
+_ROWS_PER_BAND = NUM_PERMUTATIONS // LSH_BANDS
+
+
+def _shingles(text: str) -> set[int]:
+    normalized = " ".join(text.lower().split())
+    if len(normalized) <= SHINGLE_SIZE:
+        pieces = {normalized}
+    else:
+        pieces = {normalized[i : i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+    return {int.from_bytes(hashlib.blake2b(piece.encode("utf-8"), digest_size=8).digest(), "little") for piece in pieces}
+
+
+def minhash_signature(text: str) -> tuple[int, ...]:
+    """MinHash signature of a text's character shingles; equal positions estimate Jaccard similarity."""
+    shingles = _shingles(text)
+    return tuple(min((a * shingle + b) % _MERSENNE_PRIME for shingle in shingles) for a, b in _PERMUTATIONS)
+
+
+def estimated_similarity(first: tuple[int, ...], second: tuple[int, ...]) -> float:
+    return sum(1 for x, y in zip(first, second) if x == y) / NUM_PERMUTATIONS
+
+
+def _bands(signature: tuple[int, ...]) -> list[tuple[int, tuple[int, ...]]]:
+    return [(band, signature[band * _ROWS_PER_BAND : (band + 1) * _ROWS_PER_BAND]) for band in range(LSH_BANDS)]
+
+
+class TopicBank:
+    """Items for one (tool, topic), their signatures, an LSH index and the shuffled deck samples are dealt from."""
+
+    def __init__(self):
+        self.items: list[dict] = []
+        self.signatures: list[tuple[int, ...]] = []
+        self.buckets: dict[tuple[int, tuple[int, ...]], list[int]] = {}
+        self.deck: list[int] = []
+        self.discard: list[int] = []  # dealt items, oldest first
+        self.stalled_growths = 0
+
+    @property
+    def saturated(self) -> bool:
+        return self.stalled_growths >= MAX_STALLED_GROWTHS
+
+    def find_duplicate(self, signature: tuple[int, ...]) -> bool:
+        candidates = {index for band in _bands(signature) for index in self.buckets.get(band, ())}
+        return any(estimated_similarity(signature, self.signatures[index]) >= DUPLICATE_THRESHOLD for index in candidates)
+
+    def add(self, item: dict, signature: tuple[int, ...], dealt: bool = False) -> None:
+        index = len(self.items)
+        self.items.append(item)
+        self.signatures.append(signature)
+        for band in _bands(signature):
+            self.buckets.setdefault(band, []).append(index)
+        if dealt:
+            self.discard.append(index)  # already served; it rejoins the deck at the next refill
+            return
+        # Shuffle the new item into the part of the deck not yet dealt.
+        self.deck.append(index)
+        swap = random.randrange(len(self.deck))
+        self.deck[swap], self.deck[-1] = self.deck[-1], self.deck[swap]
+
+    def deal(self, count: int) -> list[dict]:
+        """
+        Deals count distinct items; items repeat only after every item in the bank has been dealt.
+        On a refill, the most recently dealt items go to the bottom of the new deck, so a deal
+        doesn't repeat the one before it unless the bank is too small to avoid it.
+        """
+        if count <= 0:
+            return []
+        if len(self.deck) < count:
+            recent, older = self.discard[-count:], self.discard[:-count]
+            random.shuffle(recent)
+            random.shuffle(older)
+            self.deck = recent + older + self.deck
+            self.discard = []
+        dealt = self.deck[-count:]
+        del self.deck[-count:]
+        self.discard.extend(dealt)
+        return [self.items[index] for index in dealt]
+
+
+class QuestionBank:
+    """
+    Persistent, per-topic bank of generated MCQs and flashcards.
+
+    Real LLM output is added as it is generated; near-duplicates (by MinHash over the question
+    or card front) are rejected. Once a topic holds enough items, requests are served as random,
+    non-repeating subsets straight from memory. With a path, the bank is persisted in SQLite and
+    reloaded on startup; without one it lives only in memory.
+
+    Several processes may share one bank file. Each serves from its own in-memory copy: rows
+    written by the others are only picked up, deduplicated, the next time it loads the file.
+    """
+
+    def __init__(self, path: Optional[str] = None, min_bank_multiple: int = DEFAULT_MIN_BANK_MULTIPLE):
+        self.path = path
+        self.min_bank_multiple = max(1, min_bank_multiple)
+        self.hits = 0
+        self.misses = 0
+        self.offered = 0
+        self.duplicates = 0
+        self._banks: dict[tuple[str, str], TopicBank] = {}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS question_bank ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, tool TEXT NOT NULL, topic TEXT NOT NULL,"
+                " item TEXT NOT NULL, signature BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            # Files written before the unique index existed may hold exact duplicates; keep the oldest.
+            self._conn.execute(
+                "DELETE FROM question_bank WHERE id NOT IN (SELECT MIN(id) FROM question_bank GROUP BY tool, topic, item)"
+            )
+            self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS question_bank_item ON question_bank (tool, topic, item)")
+            self._conn.commit()
+            self._load()
+
+    def _load(self) -> None:
+        """Loads the persisted items, skipping near-duplicates (e.g. the same question banked by two workers)."""
+        assert self._conn is not None
+        for tool, topic, item, signature in self._conn.execute("SELECT tool, topic, item, signature FROM question_bank ORDER BY id"):
+            bank = self._banks.setdefault((tool, topic), TopicBank())
+            signature = tuple(array("Q", signature))
+            if bank.find_duplicate(signature):
+                continue
+            bank.add(json.loads(item), signature)
+
+    def add(self, tool: str, topic: str, items: list[dict], key_field: str, served: int = 0) -> int:
+        """
+        Adds the items that aren't near-duplicates of ones already banked. Returns how many were added.
+        The first `served` items are being returned to a caller right now, so they count as dealt.
+        """
+        key = (tool, normalize_subject(topic))
+        signed = [(item, minhash_signature(str(item.get(key_field, "")))) for item in items]
+        rows = []
+        with self._lock:
+            bank = self._banks.setdefault(key, TopicBank())
+            for position, (item, signature) in enumerate(signed):
+                self.offered += 1
+                if bank.find_duplicate(signature):
+                    self.duplicates += 1
+                    continue
+                bank.add(item, signature, dealt=position < served)
+                rows.append((tool, key[1], json.dumps(item), array("Q", signature).tobytes(), time.time()))
+            bank.stalled_growths = 0 if rows else bank.stalled_growths + 1
+            if rows and self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO question_bank (tool, topic, item, signature, created_at) VALUES (?, ?, ?, ?, ?)", rows
+                )
+                self._conn.commit()
+        return len(rows)
+
+    def sample(self, tool: str, topic: str, count: int, min_bank_multiple: Optional[int] = None) -> Optional[list[dict]]:
+        """
+        Returns count random items not recently served, or None if the topic's bank is too small.
+        Passing min_bank_multiple overrides the bank's threshold and leaves the hit/miss counters alone.
+        """
+        if count <= 0:
+            return []
+        multiple = self.min_bank_multiple if min_bank_multiple is None else min_bank_multiple
+        with self._lock:
+            bank = self._banks.get((tool, normalize_subject(topic)))
+            if bank is not None and bank.saturated:
+                multiple = 1
+            if bank is None or len(bank.items) < count * multiple:
+                if min_bank_multiple is None:
+                    self.misses += 1
+                return None
+            if min_bank_multiple is None:
+                self.hits += 1
+            return bank.deal(count)
+
+    def items(self, tool: str, topic: str) -> list[dict]:
+        with self._lock:
+            bank = self._banks.get((tool, normalize_subject(topic)))
+            return list(bank.items) if bank is not None else []
+
+    def stats(self) -> dict:
+        with self._lock:
+            sizes: dict[str, int] = {}
+            for (tool, _), bank in self._banks.items():
+                sizes[tool] = sizes.get(tool, 0) + len(bank.items)
+            lookups = self.hits + self.misses
+            return {
+                "topics": len(self._banks),
+                "saturated_topics": sum(1 for bank in self._banks.values() if bank.saturated),
+                "items": sizes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "offered": self.offered,
+                "duplicates_rejected": self.duplicates,
+                "dedup_rate": round(self.duplicates / self.offered, 4) if self.offered else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
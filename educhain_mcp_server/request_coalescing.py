@@ -0,0 +1,63 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+from response_cache import make_cache_key
+from shared_state import SharedStateStore
+
+
+def coalescing_key(tool: str, subject: str, template_hash: str, count: Optional[int] = None) -> str:
+    return f"{make_cache_key(tool, subject, template_hash)}:{count}"
+
+
+class RequestCoalescer:
+    """
+    Single-flight coalescing for identical in-flight generation requests.
+    The first caller for a key starts the generation; callers that arrive while it is
+    still running await the same task and share its result instead of hitting the LLM again.
+    With a SharedStateStore, the leader also takes a cross-process lock on the key, so a leader
+    in another worker waits for this one and then finds its result in the shared cache.
+    """
+
+    def __init__(self, shared: Optional[SharedStateStore] = None):
+        self.shared = shared
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.deduplicated = 0
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(self._lead(key, factory))
+            self._inflight[key] = task
+            task.add_done_callback(lambda finished, key=key: self._finish(key, finished))
+        else:
+            self.deduplicated += 1
+        # Shield the shared task so one client disconnecting doesn't cancel it for everyone else.
+        return await asyncio.shield(task)
+
+    async def _lead(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        if self.shared is None:
+            return await factory()
+        async with self.shared.single_flight(key):
+            return await factory()
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Mark the exception retrieved even if every waiter went away.
+
+    def is_in_flight(self, key: str) -> bool:
+        return key in self._inflight
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> dict:
+        return {
+            "leaders": self.leaders,
+            "deduplicated": self.deduplicated,
+            "in_flight": self.in_flight,
+        }
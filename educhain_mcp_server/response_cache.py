@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+def normalize_subject(subject: str) -> str:
+    """Lower-cases a topic/subject and collapses whitespace so trivially different inputs share a key."""
+    return " ".join(subject.lower().split())
+
+
+def prompt_template_hash(prompt_messages: list[tuple[str, str]]) -> str:
+    """Short, stable hash of a prompt template. Editing a prompt invalidates its cached responses."""
+    return hashlib.sha256(json.dumps(prompt_messages).encode("utf-8")).hexdigest()[:16]
+
+
+def make_cache_key(tool: str, subject: str, template_hash: str) -> str:
+    """
+    Builds the content-addressed key for a generation request.
+    The requested item count is deliberately not part of the key: list entries record
+    how many items they hold, so a larger cached entry can serve smaller requests.
+    """
+    return f"{tool}:{template_hash}:{normalize_subject(subject)}"
+
+
+class LRUTTLCache:
+    """
+    In-process LRU cache with per-entry TTL and eviction by entry count and total payload size.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple[float, Any, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, size = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._total_bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[2]
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value, size)
+            self._total_bytes += size
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+
+class SQLiteCache:
+    """
+    On-disk cache tier backed by SQLite, so cached generations survive restarts.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600.0):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl_seconds),
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Two-tier cache for generated MCQs, flashcards and lesson plans: an in-process LRU
+    in front of an optional SQLite tier. Disk hits are promoted into memory.
+    """
+
+    def __init__(self, memory: Optional[LRUTTLCache] = None, disk: Optional[SQLiteCache] = None):
+        self.memory = memory if memory is not None else LRUTTLCache()
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.slice_hits = 0
+
+    def get(self, tool: str, subject: str, template_hash: str, count: Optional[int] = None) -> Optional[Any]:
+        """
+        Returns the cached payload for a request, or None on a miss.
+        For list payloads, `count` items are returned if at least that many are cached.
+        """
+        key = make_cache_key(tool, subject, template_hash)
+        value = self.memory.get(key)
+        from_disk = False
+        if value is None and self.disk is not None:
+            encoded = self.disk.get(key)
+            if encoded is not None:
+                value = json.loads(encoded)
+                self.memory.set(key, value, len(encoded))
+                from_disk = True
+
+        if value is None or (count is not None and len(value) < count):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        if from_disk:
+            self.disk_hits += 1
+        else:
+            self.memory_hits += 1
+        if count is not None and len(value) > count:
+            self.slice_hits += 1
+            return value[:count]
+        return value
+
+    def set(self, tool: str, subject: str, template_hash: str, value: Any) -> None:
+        key = make_cache_key(tool, subject, template_hash)
+        encoded = json.dumps(value)
+        self.memory.set(key, value, len(encoded))
+        if self.disk is not None:
+            self.disk.set(key, encoded)
+
+    async def aget(self, tool: str, subject: str, template_hash: str, count: Optional[int] = None) -> Optional[Any]:
+        """Async variant of get: a memory miss that has to go to the SQLite tier runs on a thread."""
+        if self.disk is None or self.memory.get(make_cache_key(tool, subject, template_hash)) is not None:
+            return self.get(tool, subject, template_hash, count)
+        return await asyncio.to_thread(self.get, tool, subject, template_hash, count)
+
+    async def aset(self, tool: str, subject: str, template_hash: str, value: Any) -> None:
+        """Async variant of set: the SQLite write runs on a thread."""
+        if self.disk is None:
+            self.set(tool, subject, template_hash, value)
+        else:
+            await asyncio.to_thread(self.set, tool, subject, template_hash, value)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "slice_hits": self.slice_hits,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.total_bytes,
+            "evictions": self.memory.evictions,
+            "disk_enabled": self.disk is not None,
+        }
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
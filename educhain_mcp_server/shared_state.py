@@ -0,0 +1,166 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+# How long a generation lock is held before other processes may take it over, in case its
+# owner died mid-generation. Owners release it as soon as they finish.
+DEFAULT_LOCK_TTL_SECONDS = 120.0
+# Followers poll a lock held by another process at this interval, backing off to the maximum.
+LOCK_POLL_SECONDS = 0.02
+MAX_LOCK_POLL_SECONDS = 0.2
+# Token buckets that have refilled completely are deleted every this many takes.
+PRUNE_EVERY_TAKES = 1000
+# How long a write waits for another process's write transaction before failing. Writes are tiny,
+# so a longer wait means something is wrong rather than busy.
+BUSY_TIMEOUT_SECONDS = 1.0
+
+
+class SharedStateStore:
+    """
+    State shared by every worker process of a multi-worker server, kept in one SQLite file
+    (put it on /dev/shm to keep it in memory): cross-process generation locks, so identical
+    requests landing on different workers reach the LLM once, and rate-limit token buckets,
+    so a client's limit holds across workers. Generated results are shared through the
+    response cache's SQLite tier (EDUCHAIN_CACHE_DB), which the launcher points at a common file.
+
+    Every call is a blocking SQLite transaction; async code uses the a-prefixed variants, which
+    run it on a thread so the event loop never waits on another process's write.
+    """
+
+    def __init__(self, path: str, lock_ttl_seconds: float = DEFAULT_LOCK_TTL_SECONDS):
+        self.path = path
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lock_waits = 0
+        self._takes = 0
+        self._lock = threading.Lock()
+        # Autocommit mode; write transactions are opened explicitly with BEGIN IMMEDIATE.
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_buckets ("
+            " key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL, full_at REAL NOT NULL)"
+        )
+
+    def try_lock(self, key: str) -> bool:
+        """Takes the named lock for this process unless another live owner holds it."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM locks WHERE key = ? AND expires_at <= ?", (key, now))
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO locks (key, owner, expires_at) VALUES (?, ?, ?)",
+                    (key, self.owner, now + self.lock_ttl_seconds),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return cursor.rowcount == 1
+
+    def extend_lock(self, key: str) -> None:
+        """Pushes back the expiry of a lock this process holds, for work that outlasts the TTL."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE locks SET expires_at = ? WHERE key = ? AND owner = ?",
+                (time.time() + self.lock_ttl_seconds, key, self.owner),
+            )
+
+    def unlock(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM locks WHERE key = ? AND owner = ?", (key, self.owner))
+
+    def is_locked(self, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM locks WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone()
+        return row is not None
+
+    async def atry_lock(self, key: str) -> bool:
+        return await asyncio.to_thread(self.try_lock, key)
+
+    async def aextend_lock(self, key: str) -> None:
+        await asyncio.to_thread(self.extend_lock, key)
+
+    async def aunlock(self, key: str) -> None:
+        await asyncio.to_thread(self.unlock, key)
+
+    async def ais_locked(self, key: str) -> bool:
+        return await asyncio.to_thread(self.is_locked, key)
+
+    @asynccontextmanager
+    async def single_flight(self, key: str) -> AsyncIterator[bool]:
+        """
+        Holds the named lock for the duration of the block. If another process holds it, first
+        waits for that process to finish (or for the lock to expire) and then runs the block
+        without it; the block yields False in that case, so the caller knows to expect the
+        other process's result in the shared cache.
+        """
+        if await self.atry_lock(key):
+            try:
+                yield True
+            finally:
+                await self.aunlock(key)
+            return
+        self.lock_waits += 1
+        poll = LOCK_POLL_SECONDS
+        deadline = time.monotonic() + self.lock_ttl_seconds
+        while await self.ais_locked(key) and time.monotonic() < deadline:
+            await asyncio.sleep(poll)
+            poll = min(poll * 2, MAX_LOCK_POLL_SECONDS)
+        yield False
+
+    def take(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> float:
+        """
+        Token-bucket take shared across processes. Returns 0 if the tokens were taken, else
+        the seconds until enough have refilled (nothing is taken in that case).
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT tokens, updated_at FROM token_buckets WHERE key = ?", (key,)).fetchone()
+                tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+                wait_seconds = 0.0
+                if tokens >= cost:
+                    tokens -= cost
+                else:
+                    wait_seconds = (cost - tokens) / rate
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO token_buckets (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?)",
+                    (key, tokens, now, now + (capacity - tokens) / rate),
+                )
+                self._takes += 1
+                if self._takes % PRUNE_EVERY_TAKES == 0:
+                    self._conn.execute("DELETE FROM token_buckets WHERE full_at <= ?", (now,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return wait_seconds
+
+    async def atake(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> float:
+        return await asyncio.to_thread(self.take, key, rate, capacity, cost)
+
+    def client_count(self) -> int:
+        """Number of token buckets not yet pruned, i.e. clients seen recently by any worker."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM token_buckets").fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            locks = self._conn.execute("SELECT COUNT(*) FROM locks WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+        return {"path": self.path, "owner": self.owner, "locks_held": locks, "lock_waits": self.lock_waits, "clients": self.client_count()}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
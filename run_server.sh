@@ -0,0 +1,53 @@
+#!/usr/bin/env bash
+# Runs the EduChain MCP server with several uvicorn worker processes.
+#
+# The workers share one response cache (EDUCHAIN_CACHE_DB) and one state store
+# (EDUCHAIN_SHARED_STATE_DB: cross-process generation locks, rate-limit buckets and job
+# ownership), so an identical request reaching two workers is generated once and a client's
+# rate limit holds across workers. Both files go on /dev/shm when it exists, i.e. in memory.
+#
+# The question bank and the job database (EDUCHAIN_QUESTION_BANK_DB, EDUCHAIN_JOBS_DB) default to the
+# same directory. Every worker writes to that one bank file, but serves from its own in-memory copy,
+# loaded at startup: items banked by another worker reach this one on its next restart.
+#
+# Admission limits (EDUCHAIN_MAX_CONCURRENT_GENERATIONS, ...) and each backend's max_concurrency
+# in llm_backends.json apply per worker, so size them for one worker's share of the LLM.
+#
+# /metrics covers every worker: each one writes its Prometheus samples to PROMETHEUS_MULTIPROC_DIR
+# (the previous run's *.db sample files are removed at startup) and the endpoint sums them. /stats answers for the worker that served the
+# request, apart from its shared_state section.
+#
+# Usage:
+#   ./run_server.sh [workers]        # default: EDUCHAIN_WORKERS, else the number of CPU cores
+# Environment: EDUCHAIN_HOST (127.0.0.1), EDUCHAIN_PORT (8000), EDUCHAIN_STATE_DIR, plus every
+# EDUCHAIN_* setting read by main.py.
+set -euo pipefail
+
+SERVER_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/educhain_mcp_server" && pwd)"
+PYTHON="${PYTHON:-python}"
+
+WORKERS="${1:-${EDUCHAIN_WORKERS:-$("$PYTHON" -c 'import os; print(os.cpu_count() or 1)')}}"
+HOST="${EDUCHAIN_HOST:-127.0.0.1}"
+PORT="${EDUCHAIN_PORT:-8000}"
+
+if [ -z "${EDUCHAIN_STATE_DIR:-}" ]; then
+    if [ -d /dev/shm ] && [ -w /dev/shm ]; then
+        EDUCHAIN_STATE_DIR="/dev/shm/educhain-${PORT}"
+    else
+        EDUCHAIN_STATE_DIR="$HOME/.educhain_mcp_server"
+    fi
+fi
+mkdir -p "$EDUCHAIN_STATE_DIR"
+export EDUCHAIN_STATE_DIR
+
+export EDUCHAIN_CACHE_DB="${EDUCHAIN_CACHE_DB:-$EDUCHAIN_STATE_DIR/educhain_cache.db}"
+export EDUCHAIN_SHARED_STATE_DB="${EDUCHAIN_SHARED_STATE_DB:-$EDUCHAIN_STATE_DIR/educhain_shared_state.db}"
+# Samples left by a previous run would be summed into this one's, so remove them. Only the sample
+# files (*.db) go: the directory may be the caller's and hold other files.
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-$EDUCHAIN_STATE_DIR/metrics}"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+find "$PROMETHEUS_MULTIPROC_DIR" -maxdepth 1 -type f -name '*.db' -delete
+
+echo "Starting $WORKERS worker(s) on http://$HOST:$PORT (shared state in $EDUCHAIN_STATE_DIR)"
+cd "$SERVER_DIR"
+exec "$PYTHON" -m uvicorn main:app --host "$HOST" --port "$PORT" --workers "$WORKERS"
@@ -0,0 +1,49 @@
+import os
+import sys
+
+# The server is a flat set of modules run from its own directory; import them the same way.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "educhain_mcp_server"))
+
+import json
+
+import pytest
+
+STUB_MCQS = [{"question": f"Stub question {i}?", "options": {"A": "a", "B": "b", "C": "c", "D": "d"}, "correct_answer": "A"}
+             for i in range(20)]
+STUB_FLASHCARDS = [{"front": f"Stub term {i}", "back": f"Stub definition {i}"} for i in range(20)]
+
+
+@pytest.fixture(scope="session")
+def server(tmp_path_factory):
+    """
+    The FastAPI app (main.py) behind a TestClient, answering from a stub LLM backend with its
+    state in a temporary directory. Yields (main module, client); started once per session.
+    """
+    from fastapi.testclient import TestClient
+
+    state_dir = tmp_path_factory.mktemp("state")
+    config_path = state_dir / "llm_backends.json"
+    config_path.write_text(json.dumps({
+        "enabled": True,
+        "health_check_interval_seconds": 0,
+        "backends": [{"name": "stub", "type": "stub", "chunk_size": 32,
+                      "responses": {"multiple-choice": json.dumps(STUB_MCQS), "flashcards": json.dumps(STUB_FLASHCARDS)}}],
+    }))
+    settings = {
+        "EDUCHAIN_STATE_DIR": str(state_dir),
+        "EDUCHAIN_BACKENDS_CONFIG": str(config_path),
+        "EDUCHAIN_QUESTION_BANK": "0",
+        "EDUCHAIN_RATE_LIMIT_PER_MINUTE": "0",
+    }
+    previous = {name: os.environ.get(name) for name in settings}
+    os.environ.update(settings)
+    try:
+        import main
+        with TestClient(main.app) as client:
+            yield main, client
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
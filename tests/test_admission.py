@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected, RateLimiter
+
+
+def test_timed_out_waiters_do_not_fill_the_queue():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=3, queue_timeout_seconds=0.01)
+        await controller.acquire()
+        timeouts = await asyncio.gather(*(controller.acquire() for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(error, AdmissionRejected) for error in timeouts)
+        assert controller.stats()["queued"] == 0
+
+        # The next request queues instead of being shed, and gets the slot on release.
+        waiter = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == 1
+        controller.release()
+        await waiter
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 1 and stats["queued"] == 0 and stats["shed"] == 3
+
+
+def test_full_queue_is_shed_with_retry_after():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout_seconds=5)
+        await controller.acquire()
+        waiter = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        waiter.cancel()
+        return rejected.value
+
+    rejection = asyncio.run(scenario())
+    assert rejection.status_code == 503
+    assert rejection.retry_after >= 1
+
+
+def test_rate_limiter_rejects_beyond_burst():
+    limiter = RateLimiter(requests_per_minute=60, burst=2)
+    limiter.check("client")
+    limiter.check("client")
+    with pytest.raises(AdmissionRejected) as rejected:
+        limiter.check("client")
+    assert rejected.value.status_code == 429
+    limiter.check("other-client")
+    assert limiter.stats() == {"clients": 2, "rejected": 1}
+
+
+def test_rate_limiter_charges_per_generation():
+    limiter = RateLimiter(requests_per_minute=60, burst=4)
+    limiter.check("client", cost=3)
+    with pytest.raises(AdmissionRejected):
+        limiter.check("client", cost=3)
+    # A cost beyond the burst is capped rather than never admitted.
+    limiter.check("other-client", cost=10)
+
+
+def test_batches_take_one_slot_per_topic():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=4, max_queue=4, queue_timeout_seconds=5)
+        batch = await controller.lease(cost=30, slots=3)
+        single = await controller.lease()
+        assert controller.stats()["active"] == 4
+
+        # A second batch waits for enough slots, and holds back requests queued behind it.
+        waiting_batch = asyncio.ensure_future(controller.lease(cost=20, slots=2))
+        await asyncio.sleep(0)
+        waiting_single = asyncio.ensure_future(controller.lease(cost=50))
+        await asyncio.sleep(0)
+        single.release()
+        await asyncio.sleep(0)
+        assert not waiting_batch.done() and not waiting_single.done()
+
+        batch.release()
+        second_batch = await waiting_batch
+        await waiting_single
+        assert controller.stats()["active"] == 3
+        second_batch.release()
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 1 and stats["queued"] == 0
+
+
+def test_batch_slots_are_capped_at_the_concurrency_limit():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=2)
+        lease = await controller.lease(slots=16)
+        assert controller.stats()["active"] == 2
+        lease.release()
+        return controller.stats()["active"]
+
+    assert asyncio.run(scenario()) == 0
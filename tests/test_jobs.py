@@ -0,0 +1,173 @@
+import asyncio
+import json
+import threading
+
+from educhain_utils import EduChainContentGenerator
+from jobs import JOB_COMPLETED, JOB_FAILED, JOB_PARTIAL, JobManager, JobStore
+from llm_pool import LLMBackendPool, StubBackend
+
+
+class CountingGenerator:
+    """
+    Produces numbered MCQ stand-ins, continuing from the items a job already has. Each call
+    returns at most per_call items, and none once `available` have been produced.
+    """
+
+    def __init__(self, per_call: int = 1000, available: int = 1000):
+        self.per_call = per_call
+        self.available = available
+        self.calls = 0
+
+    async def agenerate_more_mcqs(self, topic: str, num_questions: int, existing: list[dict], pad: bool = True) -> list[dict]:
+        assert pad is False
+        self.calls += 1
+        count = max(0, min(num_questions, self.per_call, self.available - len(existing)))
+        return [{"question": f"{topic} {len(existing) + i}"} for i in range(count)]
+
+
+class LoopCheckingStore(JobStore):
+    """Records every store call made on the event loop's thread."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.loop_thread: int = 0
+        self.calls_on_loop: list[str] = []
+
+    def _check(self, name: str) -> None:
+        if threading.get_ident() == self.loop_thread:
+            self.calls_on_loop.append(name)
+
+    def get(self, job_id):
+        self._check("get")
+        return super().get(job_id)
+
+    def set_status(self, job_id, status, error=None):
+        self._check("set_status")
+        super().set_status(job_id, status, error)
+
+    def save_chunk(self, job_id, chunk_index, items):
+        self._check("save_chunk")
+        super().save_chunk(job_id, chunk_index, items)
+
+    def items(self, job_id, offset, limit):
+        self._check("items")
+        return super().items(job_id, offset, limit)
+
+
+async def wait_for_status(manager: JobManager, job_id: str, status: str) -> dict:
+    for _ in range(200):
+        job = await manager.status(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job never reached {status}: {job}")
+
+
+def run_job(tmp_path, generator: CountingGenerator, total: int, status: str) -> tuple[dict, dict]:
+    manager = JobManager(JobStore(str(tmp_path / "jobs.db")), generator, workers=1, chunk_size=4, chunk_retries=2)
+
+    async def scenario():
+        manager.start()
+        job = await manager.submit("generate_mcqs", "Physics", total)
+        job = await wait_for_status(manager, job["job_id"], status)
+        results = await manager.results(job["job_id"])
+        await manager.stop()
+        return job, results
+
+    return asyncio.run(scenario())
+
+
+def test_short_chunks_are_requested_again(tmp_path):
+    job, results = run_job(tmp_path, CountingGenerator(per_call=3), total=10, status=JOB_COMPLETED)
+    assert [item["question"] for item in results["items"]] == [f"Physics {i}" for i in range(10)]
+    assert job["shortfall"] == 0
+
+
+def test_job_the_llm_cannot_finish_is_partial_without_mock_items(tmp_path):
+    job, results = run_job(tmp_path, CountingGenerator(available=6), total=10, status=JOB_PARTIAL)
+    assert [item["question"] for item in results["items"]] == [f"Physics {i}" for i in range(6)]
+    assert (job["items_done"], job["shortfall"]) == (6, 4)
+    assert "6 of 10" in job["error"]
+
+
+def test_job_without_any_items_fails(tmp_path):
+    generator = CountingGenerator(available=0)
+    job, results = run_job(tmp_path, generator, total=10, status=JOB_FAILED)
+    assert results["items"] == [] and job["shortfall"] == 0
+    assert generator.calls == 3
+
+
+def test_unfinished_jobs_resume_after_a_restart(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    job_id = store.create("generate_mcqs", "Physics", 10, 4)
+    store.set_status(job_id, "running")
+    store.save_chunk(job_id, 0, [{"question": f"Physics {i}"} for i in range(4)])
+    store.close()
+
+    generator = CountingGenerator()
+    manager = JobManager(JobStore(path), generator, workers=1, chunk_size=4)
+
+    async def scenario():
+        manager.start()
+        job = await wait_for_status(manager, job_id, JOB_COMPLETED)
+        results = await manager.results(job_id)
+        await manager.stop()
+        return job, results
+
+    job, results = asyncio.run(scenario())
+    assert [item["question"] for item in results["items"]] == [f"Physics {i}" for i in range(10)]
+    assert job["chunks_done"] == 3 and generator.calls == 2
+
+
+def test_cancelled_job_stops_and_keeps_its_items(tmp_path):
+    class SlowGenerator(CountingGenerator):
+        async def agenerate_more_mcqs(self, topic, num_questions, existing, pad=True):
+            await asyncio.sleep(0.05)
+            return await super().agenerate_more_mcqs(topic, num_questions, existing, pad)
+
+    generator = SlowGenerator()
+    manager = JobManager(JobStore(str(tmp_path / "jobs.db")), generator, workers=1, chunk_size=2)
+
+    async def scenario():
+        manager.start()
+        job = await manager.submit("generate_mcqs", "Physics", 100)
+        await asyncio.sleep(0.08)
+        cancelled = await manager.cancel(job["job_id"])
+        await asyncio.sleep(0.15)
+        final = await manager.status(job["job_id"])
+        await manager.stop()
+        return cancelled, final
+
+    cancelled, final = asyncio.run(scenario())
+    assert cancelled["status"] == final["status"] == "cancelled"
+    assert 0 < final["items_done"] <= 4 and generator.calls <= 2
+
+
+def test_job_store_calls_run_off_the_event_loop(tmp_path):
+    store = LoopCheckingStore(str(tmp_path / "jobs.db"))
+    manager = JobManager(store, CountingGenerator(), workers=1, chunk_size=4)
+
+    async def scenario():
+        store.loop_thread = threading.get_ident()
+        manager.start()
+        job = await manager.submit("generate_mcqs", "Physics", 10)
+        await wait_for_status(manager, job["job_id"], JOB_COMPLETED)
+        results = await manager.results(job["job_id"])
+        await manager.stop()
+        return results
+
+    results = asyncio.run(scenario())
+    assert [item["question"] for item in results["items"]] == [f"Physics {i}" for i in range(10)]
+    assert store.calls_on_loop == []
+
+
+def test_unpadded_generation_leaves_out_what_the_llm_could_not_provide():
+    mcq = {"question": "What is the unit of force?", "options": {"A": "N", "B": "J", "C": "W", "D": "Pa"}, "correct_answer": "A"}
+    # The LLM only ever repeats the question the job already has.
+    backend = StubBackend("repeating", response=json.dumps([mcq]))
+    generator = EduChainContentGenerator(llm=LLMBackendPool([backend], health_check_interval_seconds=0), top_up_retries=0)
+
+    assert asyncio.run(generator.agenerate_more_mcqs("Physics", 3, [mcq], pad=False)) == []
+    padded = asyncio.run(generator.agenerate_more_mcqs("Physics", 3, [mcq]))
+    assert len(padded) == 3 and mcq not in padded
@@ -0,0 +1,33 @@
+import json
+
+from llm_parsing import parse_items, validate_flashcard, validate_mcq
+
+MCQ = {"question": "What is 2 + 2?", "options": {"A": "3", "B": "4", "C": "5", "D": "6"}, "correct_answer": "B"}
+
+
+def test_validate_mcq_normalizes_options_and_answer():
+    item = validate_mcq({"question": "Pick one", "options": ["red", "green", "blue", "pink"], "correct_answer": "c) blue"})
+    assert item == {"question": "Pick one", "options": {"A": "red", "B": "green", "C": "blue", "D": "pink"}, "correct_answer": "C"}
+
+    assert validate_mcq(dict(MCQ, correct_answer="4"))["correct_answer"] == "B"
+
+
+def test_validate_mcq_accepts_numeric_options_and_answer():
+    item = validate_mcq({"question": "2 + 1?", "options": {"A": 3, "B": 4, "C": 5.5, "D": 6}, "correct_answer": 3})
+    assert item["options"] == {"A": "3", "B": "4", "C": "5.5", "D": "6"}
+    assert item["correct_answer"] == "A"
+
+
+def test_validate_mcq_rejects_incomplete_items():
+    assert validate_mcq(dict(MCQ, question="  ")) is None
+    assert validate_mcq(dict(MCQ, options={"A": "1", "B": "2", "C": "3"})) is None
+    assert validate_mcq(dict(MCQ, options={"A": True, "B": "2", "C": "3", "D": "4"})) is None
+    assert validate_mcq(dict(MCQ, correct_answer="E")) is None
+
+
+def test_parse_items_salvages_valid_items_around_bad_ones():
+    card = {"front": "Term", "back": "Definition"}
+    text = "Here you go:\n```json\n[" + json.dumps(card) + ', {"front": ""}, ' + json.dumps(card) + ', {"front": "cut'
+    result = parse_items(text, validate_flashcard)
+    assert result.items == [card, card]
+    assert result.invalid == 1
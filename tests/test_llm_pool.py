@@ -0,0 +1,189 @@
+import asyncio
+import time
+
+import pytest
+
+from llm_pool import LLMBackendPool, PoolExhaustedError, StubBackend
+
+
+def make_pool(*backends: StubBackend, **settings) -> LLMBackendPool:
+    settings.setdefault("health_check_interval_seconds", 0)
+    return LLMBackendPool(list(backends), **settings)
+
+
+async def invoke_concurrently(pool: LLMBackendPool, requests: int) -> list[str]:
+    return await asyncio.gather(*(pool.ainvoke("Hello") for _ in range(requests)))
+
+
+def test_least_outstanding_routing_spreads_concurrent_calls():
+    first = StubBackend("first", response="ok", delay_seconds=0.05, max_concurrency=4)
+    second = StubBackend("second", response="ok", delay_seconds=0.05, max_concurrency=4)
+    pool = make_pool(first, second)
+
+    assert asyncio.run(invoke_concurrently(pool, 4)) == ["ok"] * 4
+    assert (first.calls, second.calls) == (2, 2)
+
+
+def test_routing_weighs_load_by_backend_capacity():
+    small = StubBackend("small", response="ok", delay_seconds=0.05, max_concurrency=1)
+    large = StubBackend("large", response="ok", delay_seconds=0.05, max_concurrency=3)
+    pool = make_pool(small, large)
+
+    asyncio.run(invoke_concurrently(pool, 4))
+    assert (small.calls, large.calls) == (1, 3)
+
+
+def test_routing_prefers_the_less_loaded_backend():
+    busy = StubBackend("busy", max_concurrency=4)
+    idle = StubBackend("idle", max_concurrency=4)
+    busy.outstanding = 2
+    pool = make_pool(busy, idle)
+
+    assert pool._try_acquire() is idle
+    assert pool._try_acquire() is idle
+    # Tied on load: either may take the next one, but both are now at two outstanding.
+    pool._try_acquire()
+    assert sorted(backend.outstanding for backend in pool.backends) == [2, 3]
+
+
+def test_failing_backend_is_ejected_and_calls_retry_elsewhere():
+    broken = StubBackend("broken", response="bad", failure_rate=1.0)
+    healthy = StubBackend("healthy", response="ok")
+    pool = make_pool(broken, healthy, eject_after_failures=2, eject_seconds=60)
+    # Make the broken backend win every tie until it is ejected.
+    healthy.latency_ewma = 1.0
+
+    results = [pool.invoke("Hello") for _ in range(5)]
+
+    assert results == ["ok"] * 5
+    assert broken.calls == 2 and broken.failures == 2
+    assert broken.ejected_until > time.monotonic()
+    assert healthy.calls == 5
+    assert pool.stats()[0]["ejected"] is True
+
+
+def test_slow_calls_count_towards_ejection():
+    slow = StubBackend("slow", response="ok", delay_seconds=0.02)
+    pool = make_pool(slow, eject_after_failures=2, slow_call_seconds=0.01)
+
+    pool.invoke("Hello")
+    assert slow.ejected_until == 0.0
+    pool.invoke("Hello")
+    assert slow.ejected_until > time.monotonic()
+    assert slow.failures == 0
+
+
+def test_success_resets_the_failure_streak():
+    flaky = StubBackend("flaky", response="ok")
+    pool = make_pool(flaky, eject_after_failures=2, max_attempts=1)
+
+    flaky.failure_rate = 1.0
+    with pytest.raises(RuntimeError):
+        pool.invoke("Hello")
+    flaky.failure_rate = 0.0
+    pool.invoke("Hello")
+    flaky.failure_rate = 1.0
+    with pytest.raises(RuntimeError):
+        pool.invoke("Hello")
+
+    assert flaky.consecutive_failures == 1
+    assert flaky.ejected_until == 0.0
+
+
+def test_pool_fails_open_when_every_backend_is_ejected():
+    only = StubBackend("only", response="ok")
+    only.ejected_until = time.monotonic() + 60
+    pool = make_pool(only)
+
+    assert pool.invoke("Hello") == "ok"
+
+
+def test_health_check_returns_recovered_backend_to_rotation():
+    backend = StubBackend("backend", response="ok")
+    pool = make_pool(backend, eject_seconds=0.01)
+    backend.ejected_until = time.monotonic() + 0.01
+    backend.consecutive_failures = 3
+
+    time.sleep(0.02)
+    pool.run_health_checks()
+
+    assert backend.ejected_until == 0.0
+    assert backend.consecutive_failures == 0
+
+
+def test_health_check_ejects_unreachable_backend():
+    backend = StubBackend("backend")
+    backend.healthy = False
+    pool = make_pool(backend, eject_seconds=60)
+
+    pool.run_health_checks()
+
+    assert backend.ejected_until > time.monotonic()
+
+
+def test_cancelled_calls_release_their_slots():
+    backend = StubBackend("backend", response="ok", delay_seconds=1.0, max_concurrency=2)
+    pool = make_pool(backend, acquire_timeout_seconds=0.2)
+
+    async def scenario():
+        calls = [asyncio.ensure_future(pool.ainvoke("Hello")) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert backend.outstanding == 2
+        for call in calls:
+            call.cancel()
+        await asyncio.gather(*calls, return_exceptions=True)
+        assert backend.outstanding == 0
+        backend.delay_seconds = 0
+        return await pool.ainvoke("Hello")
+
+    assert asyncio.run(scenario()) == "ok"
+    # Cancellation says nothing about the backend's health.
+    assert backend.calls == 1 and backend.consecutive_failures == 0
+
+
+def test_cancelled_stream_releases_its_slot():
+    backend = StubBackend("backend", response="x" * 10, delay_seconds=1.0, chunk_size=1, max_concurrency=1)
+    pool = make_pool(backend)
+
+    async def consume():
+        async for _ in pool.astream("Hello"):
+            pass
+
+    async def scenario():
+        stream = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.01)
+        stream.cancel()
+        await asyncio.gather(stream, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert backend.outstanding == 0
+
+
+def test_waiting_callers_get_freed_slots_promptly():
+    backend = StubBackend("backend", response="ok", delay_seconds=0.05, max_concurrency=1)
+    pool = make_pool(backend)
+
+    async def scenario():
+        started = time.monotonic()
+        results = await invoke_concurrently(pool, 4)
+        return results, time.monotonic() - started
+
+    results, elapsed = asyncio.run(scenario())
+    assert results == ["ok"] * 4
+    assert elapsed < 0.4
+
+
+def test_exhausted_pool_times_out():
+    backend = StubBackend("backend", response="ok", delay_seconds=0.5, max_concurrency=1)
+    pool = make_pool(backend, acquire_timeout_seconds=0.05)
+
+    async def scenario():
+        busy = asyncio.ensure_future(pool.ainvoke("Hello"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(PoolExhaustedError):
+            await pool.ainvoke("Hello")
+        busy.cancel()
+        await asyncio.gather(busy, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert backend.outstanding == 0
@@ -0,0 +1,101 @@
+import asyncio
+import io
+import json
+
+from admission import AdmissionController
+from educhain_utils import EduChainContentGenerator
+from jobs import JobManager, JobStore
+from llm_pool import LLMBackendPool, StubBackend
+from mcp_protocol import METHOD_NOT_FOUND, McpDispatcher
+from mcp_stdio import StdioTransport
+from request_coalescing import RequestCoalescer
+
+from conftest import STUB_FLASHCARDS, STUB_MCQS
+
+
+def request(request_id, method: str, params: dict = None) -> dict:
+    message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+    if params is not None:
+        message["params"] = params
+    return message
+
+
+def tool_call(request_id, name: str, arguments: dict, progress_token=None) -> dict:
+    params = {"name": name, "arguments": arguments}
+    if progress_token is not None:
+        params["_meta"] = {"progressToken": progress_token}
+    return request(request_id, "tools/call", params)
+
+
+def make_dispatcher(tmp_path, delay_seconds: float = 0.0) -> McpDispatcher:
+    backend = StubBackend("stub", delay_seconds=delay_seconds, chunk_size=32, responses={
+        "multiple-choice": json.dumps(STUB_MCQS), "flashcards": json.dumps(STUB_FLASHCARDS)})
+    generator = EduChainContentGenerator(llm=LLMBackendPool([backend], health_check_interval_seconds=0))
+    return McpDispatcher(generator, JobManager(JobStore(str(tmp_path / "jobs.db")), generator),
+                         AdmissionController(), RequestCoalescer())
+
+
+def serve_stdio(dispatcher: McpDispatcher, *messages) -> list:
+    """Feeds the messages to a StdioTransport, one per line, and returns what it wrote, in order."""
+    reader = io.BytesIO(b"".join(json.dumps(message).encode("utf-8") + b"\n" for message in messages))
+    writer = io.BytesIO()
+    asyncio.run(StdioTransport(dispatcher, reader, writer).serve())
+    return [json.loads(line) for line in writer.getvalue().splitlines()]
+
+
+def test_stdio_answers_requests_as_they_finish(tmp_path):
+    written = serve_stdio(
+        make_dispatcher(tmp_path, delay_seconds=0.2),
+        tool_call(1, "generate_mcqs", {"topic": "Physics", "num_questions": 2}),
+        request(2, "ping"),
+        request(3, "no/such/method"),
+    )
+
+    assert [message["id"] for message in written] == [2, 3, 1]
+    assert written[0]["result"] == {}
+    assert written[1]["error"]["code"] == METHOD_NOT_FOUND
+    assert written[2]["result"]["structuredContent"] == {"mcqs": STUB_MCQS[:2]}
+
+
+def test_stdio_cancelled_request_gets_no_response(tmp_path):
+    written = serve_stdio(
+        make_dispatcher(tmp_path, delay_seconds=0.5),
+        tool_call(1, "generate_flashcards", {"topic": "Chemistry", "num_cards": 2}),
+        {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": 1}},
+        request(2, "ping"),
+    )
+
+    assert written == [{"jsonrpc": "2.0", "id": 2, "result": {}}]
+
+
+def test_stdio_batch_is_answered_as_one_array(tmp_path):
+    written = serve_stdio(make_dispatcher(tmp_path), [request("a", "ping"), {"jsonrpc": "2.0", "method": "notifications/initialized"},
+                                                      request("b", "tools/list")])
+
+    assert len(written) == 1
+    assert [response["id"] for response in written[0]] == ["a", "b"]
+    assert any(tool["name"] == "generate_mcqs_batch" for tool in written[0][1]["result"]["tools"])
+
+
+def test_stdio_progress_notifications_precede_the_result(tmp_path):
+    written = serve_stdio(make_dispatcher(tmp_path), tool_call(1, "generate_mcqs", {"topic": "Physics", "num_questions": 3}, "token"))
+
+    notifications, response = written[:-1], written[-1]
+    assert [note["params"]["progress"] for note in notifications] == [0, 1, 2, 3]
+    assert all(note["method"] == "notifications/progress" and note["params"]["progressToken"] == "token" for note in notifications)
+    assert response["id"] == 1 and len(response["result"]["structuredContent"]["mcqs"]) == 3
+
+
+def test_http_transport_answers_json_and_sse(server):
+    _, client = server
+    initialize = client.post("/mcp", json=request(1, "initialize", {"protocolVersion": "2025-03-26"}))
+    assert initialize.json()["result"]["protocolVersion"] == "2025-03-26"
+
+    assert client.post("/mcp", json={"jsonrpc": "2.0", "method": "notifications/initialized"}).status_code == 202
+
+    streamed = client.post("/mcp", json=tool_call(2, "generate_flashcards", {"topic": "Chemistry", "num_cards": 2}, "token"),
+                           headers={"Accept": "application/json, text/event-stream"})
+    assert streamed.headers["content-type"].startswith("text/event-stream")
+    events = [json.loads(event.split("data: ", 1)[1]) for event in streamed.text.split("\n\n") if event]
+    assert [event.get("method") for event in events[:-1]] == ["notifications/progress"] * 3
+    assert events[-1]["result"]["structuredContent"] == {"flashcards": STUB_FLASHCARDS[:2]}
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import sqlite3
+from array import array
+
+from educhain_utils import EduChainContentGenerator
+from llm_pool import LLMBackendPool, StubBackend
+from question_bank import QuestionBank, TopicBank, minhash_signature
+from response_cache import ResponseCache
+
+TOPICS = ["photosynthesis", "mitosis", "enzymes", "osmosis", "genetics", "evolution", "respiration", "ecology",
+          "proteins", "hormones", "neurons", "bacteria", "viruses", "fungi", "plants", "immunity"]
+
+
+class FreshMCQBackend(StubBackend):
+    """Answers every prompt with MCQs it hasn't produced before, like a sampling LLM would."""
+
+    def __init__(self):
+        super().__init__("fresh")
+        self.produced = 0
+
+    def _reply(self, messages: list[dict]) -> str:
+        mcqs = []
+        for _ in range(2):
+            topic = TOPICS[self.produced % len(TOPICS)]
+            mcqs.append({"question": f"Which statement about {topic} is true (variant {self.produced})?",
+                         "options": {"A": "one", "B": "two", "C": "three", "D": "four"}, "correct_answer": "A"})
+            self.produced += 1
+        return json.dumps(mcqs)
+
+
+def mcq(question: str) -> dict:
+    return {"question": question, "options": {"A": "a", "B": "b", "C": "c", "D": "d"}, "correct_answer": "A"}
+
+
+def questions(items: list[dict]) -> set[str]:
+    return {item["question"] for item in items}
+
+
+def test_deal_never_repeats_before_the_deck_is_exhausted():
+    bank = TopicBank()
+    for i in range(6):
+        bank.add({"n": i}, minhash_signature(f"item {i}"))
+
+    first, second, third = bank.deal(2), bank.deal(2), bank.deal(2)
+    assert len({item["n"] for item in first + second + third}) == 6
+    assert bank.deal(0) == [] and bank.deal(-2) == []
+
+
+def test_refill_does_not_repeat_the_previous_deal():
+    bank = TopicBank()
+    for i in range(5):
+        bank.add({"n": i}, minhash_signature(f"item {i}"))
+
+    previous = bank.deal(2)
+    for _ in range(50):
+        current = bank.deal(2)
+        assert not {item["n"] for item in previous} & {item["n"] for item in current}
+        previous = current
+
+
+def test_near_duplicates_are_rejected():
+    bank = QuestionBank()
+    added = bank.add("generate_mcqs", "Physics", [mcq("What is the unit of force?"), mcq("What is the unit of force ?"),
+                                                   mcq("Who formulated the laws of motion?")], "question")
+    assert added == 2
+    assert bank.stats()["duplicates_rejected"] == 1
+
+
+def test_sample_waits_for_enough_items():
+    bank = QuestionBank(min_bank_multiple=3)
+    bank.add("generate_mcqs", "Physics", [mcq(f"Distinct physics question number {i} about {TOPICS[i]}?") for i in range(5)], "question")
+    assert bank.sample("generate_mcqs", "Physics", 2) is None
+    assert len(bank.sample("generate_mcqs", "Physics", 1)) == 1
+    assert bank.sample("generate_mcqs", "physics ", 0) == []
+
+
+def test_served_items_are_dealt():
+    bank = QuestionBank(min_bank_multiple=1)
+    served = [mcq(f"Served question about {TOPICS[i]}?") for i in range(2)]
+    spare = [mcq(f"Spare question about {TOPICS[i + 5]}?") for i in range(2)]
+    bank.add("generate_mcqs", "Physics", served + spare, "question", served=2)
+
+    assert questions(bank.sample("generate_mcqs", "Physics", 2)) == questions(spare)
+
+
+def test_consecutive_requests_get_different_questions():
+    backend = FreshMCQBackend()
+    generator = EduChainContentGenerator(llm=LLMBackendPool([backend], health_check_interval_seconds=0),
+                                         cache=ResponseCache(), bank=QuestionBank(), top_up_retries=0)
+
+    async def scenario():
+        return [await generator.agenerate_mcqs("Biology", 2) for _ in range(5)]
+
+    quizzes = asyncio.run(scenario())
+    assert all(len(quiz) == 2 for quiz in quizzes)
+    for previous, current in zip(quizzes, quizzes[1:]):
+        assert not questions(previous) & questions(current)
+
+
+def test_shared_bank_file_is_deduplicated_on_load(tmp_path):
+    path = str(tmp_path / "bank.db")
+    items = [mcq(f"Persisted question about {topic}?") for topic in TOPICS[:3]]
+    # Two workers started together bank the same items into one file.
+    workers = [QuestionBank(path), QuestionBank(path)]
+    for worker in workers:
+        worker.add("generate_mcqs", "Physics", items, "question")
+        worker.close()
+
+    restarted = QuestionBank(path)
+    assert restarted.stats()["items"] == {"generate_mcqs": 3}
+    assert restarted._conn.execute("SELECT COUNT(*) FROM question_bank").fetchone()[0] == 3
+
+
+def test_duplicate_rows_from_older_files_are_removed(tmp_path):
+    path = str(tmp_path / "bank.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE question_bank (id INTEGER PRIMARY KEY AUTOINCREMENT, tool TEXT NOT NULL, topic TEXT NOT NULL,"
+                 " item TEXT NOT NULL, signature BLOB NOT NULL, created_at REAL NOT NULL)")
+    row = ("generate_mcqs", "physics", json.dumps(mcq("Old question?")), array("Q", minhash_signature("Old question?")).tobytes(), 0.0)
+    conn.executemany("INSERT INTO question_bank (tool, topic, item, signature, created_at) VALUES (?, ?, ?, ?, ?)", [row, row])
+    conn.commit()
+    conn.close()
+
+    bank = QuestionBank(path)
+    assert bank.stats()["items"] == {"generate_mcqs": 1}
+    assert bank._conn.execute("SELECT COUNT(*) FROM question_bank").fetchone()[0] == 1
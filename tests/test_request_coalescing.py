@@ -0,0 +1,43 @@
+import asyncio
+
+from request_coalescing import RequestCoalescer, coalescing_key
+
+
+def test_identical_concurrent_requests_share_one_generation():
+    calls = 0
+
+    async def generate():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return ["item"]
+
+    async def scenario():
+        coalescer = RequestCoalescer()
+        key = coalescing_key("generate_mcqs", "Physics", "hash", 5)
+        results = await asyncio.gather(*(coalescer.run(key, generate) for _ in range(5)))
+        return coalescer, results
+
+    coalescer, results = asyncio.run(scenario())
+    assert results == [["item"]] * 5
+    assert calls == 1
+    assert (coalescer.leaders, coalescer.deduplicated, coalescer.in_flight) == (1, 4, 0)
+
+
+def test_different_counts_are_not_coalesced():
+    assert coalescing_key("generate_mcqs", "Physics", "hash", 5) != coalescing_key("generate_mcqs", "Physics", "hash", 10)
+
+
+def test_failure_reaches_every_waiter_and_clears_the_key():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("LLM down")
+
+    async def scenario():
+        coalescer = RequestCoalescer()
+        outcomes = await asyncio.gather(*(coalescer.run("key", fail) for _ in range(3)), return_exceptions=True)
+        return coalescer, outcomes
+
+    coalescer, outcomes = asyncio.run(scenario())
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert not coalescer.is_in_flight("key")
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import time
+
+from educhain_utils import EduChainContentGenerator
+from llm_pool import LLMBackendPool, StubBackend
+from response_cache import LRUTTLCache, ResponseCache, SQLiteCache, make_cache_key
+
+
+def test_lru_evicts_least_recently_used_by_count_and_size():
+    cache = LRUTTLCache(max_entries=2, max_bytes=100)
+    cache.set("a", "A", 10)
+    cache.set("b", "B", 10)
+    cache.get("a")
+    cache.set("c", "C", 10)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("A", None, "C")
+
+    cache.set("big", "BIG", 85)
+    assert cache.get("a") is None and cache.get("big") == "BIG"
+    assert cache.total_bytes == 95 and cache.evictions == 2
+    cache.set("huge", "HUGE", 101)
+    assert cache.get("huge") is None
+
+
+def test_entries_expire_after_their_ttl(tmp_path):
+    memory = LRUTTLCache(ttl_seconds=0.01)
+    memory.set("key", "value", 5)
+    disk = SQLiteCache(str(tmp_path / "cache.db"), ttl_seconds=0.01)
+    disk.set("key", "value")
+    assert memory.get("key") == "value" and disk.get("key") == "value"
+
+    time.sleep(0.02)
+    assert memory.get("key") is None and len(memory) == 0 and memory.total_bytes == 0
+    assert disk.get("key") is None
+
+
+def test_larger_entries_serve_smaller_requests():
+    cache = ResponseCache()
+    cache.set("generate_mcqs", "  Organic   Chemistry", "hash", [1, 2, 3, 4, 5])
+
+    assert cache.get("generate_mcqs", "organic chemistry", "hash", 3) == [1, 2, 3]
+    assert cache.get("generate_mcqs", "organic chemistry", "hash", 6) is None
+    # A changed prompt template is a different key.
+    assert cache.get("generate_mcqs", "organic chemistry", "other-hash", 3) is None
+    assert make_cache_key("generate_mcqs", "Organic Chemistry", "hash") == "generate_mcqs:hash:organic chemistry"
+    assert (cache.hits, cache.misses, cache.slice_hits) == (1, 2, 1)
+
+
+def test_generator_serves_repeated_requests_from_the_cache():
+    mcqs = [{"question": f"Question {i}?", "options": {"A": "a", "B": "b", "C": "c", "D": "d"}, "correct_answer": "A"}
+            for i in range(5)]
+    backend = StubBackend("backend", response=json.dumps(mcqs))
+    generator = EduChainContentGenerator(llm=LLMBackendPool([backend], health_check_interval_seconds=0), cache=ResponseCache())
+
+    first = asyncio.run(generator.agenerate_mcqs("Physics", 5))
+    second = asyncio.run(generator.agenerate_mcqs("physics", 3))
+    assert first == mcqs and second == mcqs[:3]
+    assert backend.calls == 1
+
+
+def test_async_access_reads_and_writes_the_disk_tier(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer = ResponseCache(disk=SQLiteCache(path))
+    asyncio.run(writer.aset("generate_mcqs", "Physics", "hash", [1, 2, 3]))
+    writer.close()
+
+    reader = ResponseCache(memory=LRUTTLCache(), disk=SQLiteCache(path))
+    assert asyncio.run(reader.aget("generate_mcqs", "physics", "hash", 2)) == [1, 2]
+    assert asyncio.run(reader.aget("generate_mcqs", "physics", "hash", 3)) == [1, 2, 3]
+    assert (reader.disk_hits, reader.memory_hits) == (1, 1)
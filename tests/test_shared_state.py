@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+
+from admission import AdmissionRejected, RateLimiter
+from jobs import JOB_COMPLETED, JobManager, JobStore
+from request_coalescing import RequestCoalescer
+from shared_state import SharedStateStore
+
+
+def workers(tmp_path, count: int = 2, **settings) -> list[SharedStateStore]:
+    """One SharedStateStore per simulated worker process, all on the same file."""
+    path = str(tmp_path / "shared_state.db")
+    return [SharedStateStore(path, **settings) for _ in range(count)]
+
+
+def test_lock_is_exclusive_across_workers_until_released_or_expired(tmp_path):
+    first, second = workers(tmp_path, lock_ttl_seconds=0.05)
+
+    assert first.try_lock("generate:physics")
+    assert not second.try_lock("generate:physics")
+    second.unlock("generate:physics")  # not the owner: no effect
+    assert second.is_locked("generate:physics")
+
+    first.unlock("generate:physics")
+    assert second.try_lock("generate:physics")
+    # An owner that died mid-generation loses the lock once it expires.
+    time.sleep(0.06)
+    assert first.try_lock("generate:physics")
+
+
+def test_single_flight_follower_waits_for_the_leader(tmp_path):
+    first, second = workers(tmp_path)
+    events = []
+
+    async def run(store: SharedStateStore, name: str, delay: float):
+        await asyncio.sleep(delay)
+        async with store.single_flight("key") as leader:
+            events.append((name, "start", leader))
+            await asyncio.sleep(0.05)
+            events.append((name, "end", leader))
+
+    async def scenario():
+        await asyncio.gather(run(first, "first", 0), run(second, "second", 0.01))
+
+    asyncio.run(scenario())
+    assert events == [("first", "start", True), ("first", "end", True), ("second", "start", False), ("second", "end", False)]
+    assert second.lock_waits == 1 and not first.is_locked("key")
+
+
+def test_identical_requests_on_two_workers_generate_once(tmp_path):
+    first, second = workers(tmp_path)
+    shared_cache: dict = {}
+    generations = 0
+
+    async def generate():
+        nonlocal generations
+        if "key" in shared_cache:
+            return shared_cache["key"]
+        generations += 1
+        await asyncio.sleep(0.05)
+        shared_cache["key"] = ["item"]
+        return shared_cache["key"]
+
+    async def scenario():
+        return await asyncio.gather(RequestCoalescer(shared=first).run("key", generate),
+                                    RequestCoalescer(shared=second).run("key", generate))
+
+    assert asyncio.run(scenario()) == [["item"], ["item"]]
+    assert generations == 1
+
+
+def test_rate_limit_holds_across_workers(tmp_path):
+    first, second = workers(tmp_path)
+    limiters = [RateLimiter(requests_per_minute=60, burst=2, shared=store) for store in (first, second)]
+
+    limiters[0].check("ip:1.2.3.4")
+    asyncio.run(limiters[1].acheck("ip:1.2.3.4"))
+    with pytest.raises(AdmissionRejected):
+        limiters[0].check("ip:1.2.3.4")
+    assert limiters[1].stats()["clients"] == 1
+
+
+def test_job_resumed_by_every_worker_runs_once(tmp_path):
+    calls = []
+
+    class Generator:
+        async def agenerate_more_mcqs(self, topic, num_questions, existing, pad=True):
+            calls.append(len(existing))
+            await asyncio.sleep(0.01)
+            return [{"question": f"{topic} {len(existing) + i}"} for i in range(num_questions)]
+
+    jobs_path = str(tmp_path / "jobs.db")
+    store = JobStore(jobs_path)
+    job_id = store.create("generate_mcqs", "Physics", 12, 4)
+    managers = [JobManager(JobStore(jobs_path), Generator(), workers=1, chunk_size=4, shared=shared)
+                for shared in workers(tmp_path)]
+
+    async def scenario():
+        for manager in managers:
+            manager.start()
+        for _ in range(200):
+            job = await managers[1].status(job_id)
+            if job["status"] == JOB_COMPLETED:
+                break
+            await asyncio.sleep(0.01)
+        for manager in managers:
+            await manager.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job["status"] == JOB_COMPLETED and job["items_done"] == 12
+    assert calls == [0, 4, 8]
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import time
+
+from educhain_utils import EduChainContentGenerator
+from llm_parsing import JSONArrayStreamParser
+from llm_pool import LLMBackendPool, StubBackend
+
+TOP_UP_PHRASE = "Do not repeat any of these existing"
+
+
+def mcq(question: str) -> dict:
+    return {"question": question, "options": {"A": "a", "B": "b", "C": "c", "D": "d"}, "correct_answer": "A"}
+
+
+def make_generator(backend: StubBackend, **settings) -> EduChainContentGenerator:
+    return EduChainContentGenerator(llm=LLMBackendPool([backend], health_check_interval_seconds=0), **settings)
+
+
+async def collect(stream) -> list[tuple[float, dict]]:
+    started = time.monotonic()
+    return [(time.monotonic() - started, item) async for item in stream]
+
+
+def test_parser_yields_each_element_as_it_completes():
+    items = [{"front": "Braces {inside}", "back": "a \"quoted\" ]"}, {"front": "Second", "back": "card"}]
+    text = "Sure! Here they are:\n```json\n" + json.dumps(items) + "\n```"
+    parser = JSONArrayStreamParser()
+
+    completed_at = {}
+    for position, char in enumerate(text):
+        for element in parser.feed(char):
+            completed_at[element["front"]] = position
+    assert list(completed_at) == ["Braces {inside}", "Second"]
+    assert completed_at["Braces {inside}"] < text.index("Second")
+    assert parser.complete and parser.malformed == 0
+
+
+def test_items_are_yielded_before_the_stream_ends():
+    backend = StubBackend("backend", response=json.dumps([mcq(f"Question {i}?") for i in range(4)]),
+                          delay_seconds=0.4, chunk_size=20)
+    generator = make_generator(backend)
+
+    timed = asyncio.run(collect(generator.astream_mcqs("Physics", 4)))
+    assert [item["question"] for _, item in timed] == [f"Question {i}?" for i in range(4)]
+    assert timed[0][0] < timed[-1][0] / 2
+
+
+def test_short_stream_is_topped_up_then_mock_filled():
+    backend = StubBackend("backend", response=json.dumps([mcq("First?"), mcq("Second?")]),
+                          responses={TOP_UP_PHRASE: json.dumps([mcq("Third?")])}, chunk_size=16)
+    generator = make_generator(backend, top_up_retries=1)
+
+    items = [item for _, item in asyncio.run(collect(generator.astream_mcqs("Physics", 4)))]
+    assert [item["question"] for item in items[:3]] == ["First?", "Second?", "Third?"]
+    assert len(items) == 4 and items[3]["question"].startswith("What is a key concept in Physics")
+
+
+def test_stream_endpoint_sends_ndjson_and_releases_its_slot(server):
+    main, client = server
+    response = client.post("/tools/generate_flashcards", json={"topic": "Chemistry", "num_cards": 3, "stream": True})
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"front": f"Stub term {i}", "back": f"Stub definition {i}"} for i in range(3)]
+    assert main.admission.stats()["active"] == 0
+
+
+def test_stream_endpoint_sends_sse_when_asked(server):
+    _, client = server
+    response = client.post("/tools/generate_mcqs", json={"topic": "Biology", "num_questions": 2, "stream": True},
+                           headers={"Accept": "text/event-stream"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = response.text.split("\n\n")
+    assert [json.loads(event[len("data: "):])["question"] for event in events[:2]] == ["Stub question 0?", "Stub question 1?"]
+    assert events[2] == "event: end\ndata: {}"
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+from educhain_utils import MCQ_TEMPLATE_HASH, EduChainContentGenerator
+from llm_pool import LLMBackendPool, StubBackend
+from response_cache import ResponseCache
+
+TOP_UP_PHRASE = "Do not repeat any of these existing"
+
+
+def mcq(question: str) -> dict:
+    return {"question": question, "options": {"A": "a", "B": "b", "C": "c", "D": "d"}, "correct_answer": "A"}
+
+
+class ScriptedBackend(StubBackend):
+    """Answers each call with the next scripted batch of MCQs and records the prompts it got."""
+
+    def __init__(self, *batches: list[dict]):
+        super().__init__("scripted")
+        self.batches = list(batches)
+        self.prompts: list[str] = []
+
+    def _reply(self, messages: list[dict]) -> str:
+        self.prompts.append(messages[-1]["content"])
+        return json.dumps(self.batches.pop(0) if self.batches else [])
+
+
+def make_generator(backend: StubBackend, **settings) -> EduChainContentGenerator:
+    return EduChainContentGenerator(llm=LLMBackendPool([backend], health_check_interval_seconds=0), **settings)
+
+
+def questions(items: list[dict]) -> list[str]:
+    return [item["question"] for item in items]
+
+
+def test_top_up_asks_only_for_the_missing_items():
+    backend = ScriptedBackend([mcq("First?"), mcq("Second?")], [mcq("Third?"), mcq("Fourth?")])
+    generator = make_generator(backend, top_up_retries=2)
+
+    assert questions(asyncio.run(generator.agenerate_mcqs("Physics", 4))) == ["First?", "Second?", "Third?", "Fourth?"]
+    assert len(backend.prompts) == 2
+    top_up = backend.prompts[1]
+    assert TOP_UP_PHRASE in top_up and "Generate 2 more" in top_up
+    assert "- First?" in top_up and "- Second?" in top_up
+
+
+def test_repeated_items_in_a_top_up_are_dropped():
+    backend = ScriptedBackend([mcq("First?")], [mcq("First?"), mcq("Second?")], [mcq("Third?")])
+    generator = make_generator(backend, top_up_retries=2)
+
+    assert questions(generator.generate_mcqs("Physics", 3)) == ["First?", "Second?", "Third?"]
+    assert len(backend.prompts) == 3
+
+
+def test_only_the_gap_left_after_retries_is_mock_filled_and_nothing_mock_is_cached():
+    backend = ScriptedBackend([mcq("First?")], [], [])
+    cache = ResponseCache()
+    generator = make_generator(backend, top_up_retries=2, cache=cache)
+
+    items = asyncio.run(generator.agenerate_mcqs("Physics", 3))
+    assert questions(items)[0] == "First?"
+    assert all(question.startswith("What is a key concept in Physics") for question in questions(items)[1:])
+    assert len(backend.prompts) == 3
+    assert cache.get("generate_mcqs", "Physics", MCQ_TEMPLATE_HASH) == [mcq("First?")]